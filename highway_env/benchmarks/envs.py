@@ -0,0 +1,222 @@
+"""
+    Throughput benchmarks of the environments.
+
+    Measure the steps and resets per second, the step latency percentiles and the peak memory of every registered
+    environment, for several observation types and traffic densities. Results are written as JSON, and can be compared
+    with the results of another commit:
+
+        python -m highway_env.benchmarks.envs --output new.json --compare old.json
+"""
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Sequence
+
+import gym
+import numpy as np
+
+import highway_env
+
+ENVS = ["highway-v0", "merge-v0", "roundabout-v0", "intersection-v0", "parking-v0", "two-way-v0", "lane-keeping-v0",
+        "summon-v0"]
+
+OBSERVATIONS = {
+    "default": None,
+    "Kinematics": {"type": "Kinematics"},
+    "OccupancyGrid": {"type": "OccupancyGrid"},
+    "TimeToCollision": {"type": "TimeToCollision", "horizon": 10},
+    "GrayscaleObservation": {"type": "GrayscaleObservation", "weights": [0.2989, 0.5870, 0.1140], "stack_size": 4,
+                             "observation_shape": (84, 84), "headless": True}
+}
+
+UNSUPPORTED = {
+    "parking-v0": ["Kinematics", "OccupancyGrid", "TimeToCollision", "GrayscaleObservation"],
+    "summon-v0": ["Kinematics", "OccupancyGrid", "TimeToCollision", "GrayscaleObservation"],
+    "lane-keeping-v0": ["TimeToCollision"]
+}
+""" Observation types that an environment does not support, left out of the benchmark matrix """
+
+DENSITIES = [10, 50]
+
+METRICS = ["steps_per_sec", "resets_per_sec", "step_p50_ms", "step_p99_ms", "peak_memory_mb"]
+HIGHER_IS_BETTER = {"steps_per_sec": True, "resets_per_sec": True, "step_p50_ms": False, "step_p99_ms": False,
+                    "peak_memory_mb": False}
+
+
+def benchmark_env(env_id: str, observation: Optional[dict] = None, vehicles_count: Optional[int] = None,
+                  steps: int = 50, resets: int = 5, seed: int = 0) -> Dict[str, float]:
+    """
+        Measure the throughput of an environment configuration.
+
+    :param env_id: the environment id
+    :param observation: the observation configuration, or None for the environment default
+    :param vehicles_count: the traffic density, or None for the environment default
+    :param steps: the number of timed steps
+    :param resets: the number of timed resets
+    :param seed: the seed of the environment and of its sampled actions
+    :return: a dictionary of metrics, None if they could not be measured
+    """
+    config = {}
+    if observation is not None:
+        config["observation"] = observation
+    if vehicles_count is not None:
+        config["vehicles_count"] = vehicles_count
+
+    def make() -> gym.Env:
+        env = gym.make(env_id)
+        env.configure(config)
+        env.seed(seed)
+        reset(env)
+        return env
+
+    def reset(env: gym.Env) -> None:
+        env.reset()
+        env.action_space.seed(seed)  # The action space is created anew at each reset
+
+    env = make()
+    start = time.perf_counter()
+    for _ in range(resets):
+        reset(env)
+    reset_time = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(steps):
+        start = time.perf_counter()
+        _, _, done, _ = env.step(env.action_space.sample())
+        latencies.append(time.perf_counter() - start)
+        if done:
+            reset(env)
+    env.close()
+
+    # Memory is traced separately, since tracing slows down the execution, over the lifetime of a new environment
+    tracemalloc.start()
+    env = make()
+    for _ in range(min(steps, 10)):
+        env.step(env.action_space.sample())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    env.close()
+
+    return {
+        "steps_per_sec": len(latencies) / sum(latencies),
+        "resets_per_sec": resets / reset_time if reset_time > 0 else None,
+        "step_p50_ms": 1000 * float(np.percentile(latencies, 50)),
+        "step_p99_ms": 1000 * float(np.percentile(latencies, 99)),
+        "peak_memory_mb": peak / 2 ** 20
+    }
+
+
+def has_traffic_density(env_id: str) -> bool:
+    return "vehicles_count" in gym.make(env_id).unwrapped.default_config()
+
+
+def run(envs: Sequence[str] = ENVS, observations: Sequence[str] = tuple(OBSERVATIONS), densities: Sequence[int] =
+        DENSITIES, steps: int = 50, resets: int = 5, verbose: bool = True) -> dict:
+    """
+        Run the benchmark suite over environments, observation types and traffic densities.
+
+        Densities are only swept for environments with a vehicles_count configuration, and the UNSUPPORTED
+        observation types of an environment are skipped. Configurations that fail are reported with their error.
+
+    :param envs: the environment ids
+    :param observations: the observation types, among OBSERVATIONS
+    :param densities: the vehicles counts
+    :param steps: the number of timed steps per configuration
+    :param resets: the number of timed resets per configuration
+    :param verbose: whether to print the results as they are obtained
+    :return: the results, with metadata about the benchmark platform
+    """
+    results = []
+    for env_id in envs:
+        env_densities = densities if has_traffic_density(env_id) else [None]
+        for observation in observations:
+            if observation in UNSUPPORTED.get(env_id, []):
+                continue
+            for vehicles_count in env_densities:
+                result = {"env": env_id, "observation": observation, "vehicles_count": vehicles_count}
+                try:
+                    result.update(benchmark_env(env_id, OBSERVATIONS[observation], vehicles_count, steps, resets))
+                except Exception as e:
+                    result["error"] = "{}: {}".format(type(e).__name__, e)
+                results.append(result)
+                if verbose:
+                    print(format_result(result))
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "gym": gym.__version__,
+            "platform": platform.platform(),
+            "steps": steps,
+            "resets": resets
+        },
+        "results": results
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.1) -> List[str]:
+    """
+        Compare two benchmark results, and report the regressions.
+
+    :param baseline: the reference results
+    :param current: the new results
+    :param tolerance: the relative degradation of a metric above which it is reported
+    :return: the list of regressions
+    """
+    key = lambda r: (r["env"], r["observation"], r["vehicles_count"])
+    reference = {key(r): r for r in baseline["results"] if "error" not in r}
+    regressions = []
+    for result in current["results"]:
+        if "error" in result or key(result) not in reference:
+            continue
+        for metric in METRICS:
+            old, new = reference[key(result)][metric], result[metric]
+            if old is None or new is None:
+                continue
+            ratio = new / old if HIGHER_IS_BETTER[metric] else old / new
+            if ratio < 1 - tolerance:
+                regressions.append("{} {}: {:.4g} -> {:.4g} ({:+.1%})".format(
+                    format_key(result), metric, old, new, new / old - 1))
+    return regressions
+
+
+def format_key(result: dict) -> str:
+    return "{}[{}{}]".format(result["env"], result["observation"],
+                             ", {} vehicles".format(result["vehicles_count"]) if result["vehicles_count"] else "")
+
+
+def format_result(result: dict) -> str:
+    if "error" in result:
+        return "{}: {}".format(format_key(result), result["error"])
+    return "{}: {} steps/s, {} resets/s, p50 {} ms, p99 {} ms, peak {} MB".format(
+        format_key(result), *["{:.4g}".format(result[metric]) if result[metric] is not None else "n/a"
+                              for metric in METRICS])
+
+
+def main(args: Sequence[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the environments throughput.")
+    parser.add_argument("--envs", nargs="+", default=ENVS)
+    parser.add_argument("--observations", nargs="+", default=list(OBSERVATIONS), choices=list(OBSERVATIONS))
+    parser.add_argument("--densities", nargs="+", type=int, default=DENSITIES)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--resets", type=int, default=5)
+    parser.add_argument("--output", help="path of the JSON results")
+    parser.add_argument("--compare", help="path of reference JSON results, to report regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(args)
+
+    results = run(args.envs, args.observations, args.densities, args.steps, args.resets)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        print("\n".join(["Regressions:"] + regressions) if regressions else "No regression.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+    Micro-benchmarks of the geometric and behavioural kernels.
+
+    Each kernel is timed on synthetic scenes of increasing size (number of vehicles, lanes, queries or state
+    dimension), and the slope of its scaling curve in log-log scale is reported: a slope close to 1 is linear, and a
+    slope close to 2 is quadratic in the scene size.
+
+        python -m highway_env.benchmarks.kernels --sizes 8 16 32 64 --output kernels.json
+"""
+import argparse
+import copy
+import json
+import platform
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+from highway_env import utils
+from highway_env.envs.common.finite_mdp import compute_ttc_grid
+from highway_env.interval import LPV
+from highway_env.road.lane import AbstractLane, StraightLane, SineLane, CircularLane
+from highway_env.road.road import Road, RoadNetwork
+from highway_env.vehicle.behavior import IDMVehicle
+from highway_env.vehicle.controller import MDPVehicle
+
+SIZES = [8, 16, 32, 64, 128]
+
+SUPERLINEAR_SLOPE = 1.2
+""" Scaling slope above which a kernel is reported as superlinear """
+
+Kernel = Callable[..., object]
+""" A kernel call, optionally taking an input created by its setup attribute, for the kernels mutating their input """
+
+
+def make_road(vehicles_count: int, lanes_count: int = 4, seed: int = 0, ego_class: type = None) -> Road:
+    """
+        Create a straight road with regularly spaced IDM vehicles.
+
+    :param vehicles_count: the number of vehicles
+    :param lanes_count: the number of lanes
+    :param seed: the seed of the road random generator
+    :param ego_class: if not None, the class of the first vehicle
+    :return: the road
+    """
+    np_random = np.random.RandomState(seed)
+    road = Road(network=RoadNetwork.straight_road_network(lanes_count), np_random=np_random)
+    for k in range(vehicles_count):
+        vehicle_class = ego_class if ego_class and k == 0 else IDMVehicle
+        lane_index = ("0", "1", k % lanes_count)
+        longitudinal = 20 * (k // lanes_count) + np_random.uniform(-2, 2)
+        road.vehicles.append(vehicle_class.make_on_lane(road, lane_index, longitudinal,
+                                                        speed=np_random.uniform(20, 30)))
+    return road
+
+
+def closest_lane_index(size: int, np_random: np.random.RandomState) -> Kernel:
+    """ RoadNetwork.get_closest_lane_index on a network of size lanes """
+    network = RoadNetwork.straight_road_network(size)
+    position = np_random.uniform([0, 0], [1000, size * StraightLane.DEFAULT_WIDTH])
+    return lambda: network.get_closest_lane_index(position)
+
+
+def neighbour_vehicles(size: int, np_random: np.random.RandomState) -> Kernel:
+    """ Road.neighbour_vehicles of one vehicle, among size vehicles """
+    road = make_road(size, seed=np_random.randint(2 ** 31))
+    vehicle = road.vehicles[np_random.randint(size)]
+    return lambda: road.neighbour_vehicles(vehicle)
+
+
+def road_step(size: int, np_random: np.random.RandomState) -> Kernel:
+    """ Road.step of size vehicles, including pairwise collision checks """
+    road = make_road(size, seed=np_random.randint(2 ** 31))
+
+    def kernel(road_copy: Road) -> None:
+        road_copy.step(1 / 15)
+    kernel.setup = lambda: copy.deepcopy(road, {id(road.network): road.network})
+    return kernel
+
+
+def idm_act(size: int, np_random: np.random.RandomState) -> Kernel:
+    """ IDMVehicle.act of all size vehicles """
+    road = make_road(size, seed=np_random.randint(2 ** 31))
+    return road.act
+
+
+def ttc_grid(size: int, np_random: np.random.RandomState) -> Kernel:
+    """ compute_ttc_grid of an MDPVehicle among size vehicles """
+    road = make_road(size, seed=np_random.randint(2 ** 31), ego_class=MDPVehicle)
+    env = SimpleNamespace(road=road, vehicle=road.vehicles[0])
+    return lambda: compute_ttc_grid(env, time_quantization=1., horizon=10.)
+
+
+def rectangles_intersect(size: int, np_random: np.random.RandomState) -> Kernel:
+    """ utils.rotated_rectangles_intersect of size pairs of rectangles """
+    rectangles = [((np_random.uniform(-5, 5, 2), 5, 2, np_random.uniform(-np.pi, np.pi)),
+                   (np_random.uniform(-5, 5, 2), 5, 2, np_random.uniform(-np.pi, np.pi))) for _ in range(size)]
+    return lambda: [utils.rotated_rectangles_intersect(rect1, rect2) for rect1, rect2 in rectangles]
+
+
+def local_coordinates(lane: AbstractLane) -> Callable[[int, np.random.RandomState], Kernel]:
+    def kernel(size: int, np_random: np.random.RandomState) -> Kernel:
+        positions = np_random.uniform(-50, 50, size=(size, 2))
+        return lambda: [lane.local_coordinates(position) for position in positions]
+    kernel.__doc__ = """ {}.local_coordinates of size positions """.format(type(lane).__name__)
+    return kernel
+
+
+def lpv_step(size: int, np_random: np.random.RandomState) -> Kernel:
+    """ LPV.step of a system of state dimension size """
+    perturbation = np_random.uniform(-1, 1, size=(size, size))
+    a0 = -np.eye(size) + 0.05 * (perturbation + perturbation.T)  # stable, with real eigenvalues
+    da = [0.01 * np_random.uniform(-1, 1, size=(size, size))]
+    x0 = np_random.uniform(-1, 1, size)
+    lpv = LPV(x0=x0, a0=a0, da=da, x_i=[x0 - 0.1, x0 + 0.1])
+    return lambda: lpv.step(0.1)
+
+
+KERNELS = {
+    "RoadNetwork.get_closest_lane_index": closest_lane_index,
+    "Road.neighbour_vehicles": neighbour_vehicles,
+    "Road.step": road_step,
+    "IDMVehicle.act": idm_act,
+    "compute_ttc_grid": ttc_grid,
+    "utils.rotated_rectangles_intersect": rectangles_intersect,
+    "StraightLane.local_coordinates": local_coordinates(StraightLane([0, 0], [100, 0])),
+    "SineLane.local_coordinates": local_coordinates(SineLane([0, 0], [100, 0], amplitude=5, pulsation=0.1,
+                                                             phase=0)),
+    "CircularLane.local_coordinates": local_coordinates(CircularLane([0, 0], radius=20, start_phase=0,
+                                                                     end_phase=np.pi)),
+    "LPV.step": lpv_step,
+}
+
+
+def time_kernel(kernel: Kernel, repeat: int = 5, min_duration: float = 1e-3) -> float:
+    """
+        Time a kernel call.
+
+        The kernel is called in batches lasting at least min_duration, to mitigate the timer resolution, and the
+        fastest batch is kept to mitigate the system noise. If the kernel has a setup attribute, each call is given
+        its own input, created by setup() before the batch is timed, so that every call starts from the same state.
+
+    :param kernel: the kernel to call
+    :param repeat: the number of timed batches
+    :param min_duration: the minimum duration of a batch [s]
+    :return: the duration of a call [s]
+    """
+    setup = getattr(kernel, "setup", None)
+
+    def time_batch(number: int) -> float:
+        inputs = [(setup(),) if setup else () for _ in range(number)]
+        start = time.perf_counter()
+        for args in inputs:
+            kernel(*args)
+        return time.perf_counter() - start
+
+    number = 1
+    while True:
+        duration = time_batch(number)
+        if duration >= min_duration:
+            break
+        number *= 2
+    durations = [duration] + [time_batch(number) for _ in range(repeat - 1)]
+    return min(durations) / number
+
+
+def scaling_slope(sizes: Sequence[int], durations: Sequence[float]) -> float:
+    """
+        Get the exponent k of a scaling curve duration ~ size^k, by linear regression in log-log scale.
+
+    :param sizes: the scene sizes
+    :param durations: the corresponding durations
+    :return: the scaling exponent
+    """
+    return float(np.polyfit(np.log(sizes), np.log(durations), 1)[0])
+
+
+def benchmark_kernel(name: str, sizes: Sequence[int] = SIZES, repeat: int = 5, seed: int = 0) -> Dict[str, object]:
+    """
+        Measure the scaling curve of a kernel.
+
+    :param name: the kernel name, among KERNELS
+    :param sizes: the scene sizes
+    :param repeat: the number of timed batches per size
+    :param seed: the seed of the synthetic scenes
+    :return: the durations per size and the scaling slope
+    """
+    np_random = np.random.RandomState(seed)
+    durations = [time_kernel(KERNELS[name](size, np_random), repeat) for size in sizes]
+    return {
+        "kernel": name,
+        "description": KERNELS[name].__doc__.strip(),
+        "sizes": list(sizes),
+        "durations_us": [1e6 * duration for duration in durations],
+        "slope": scaling_slope(sizes, durations) if len(sizes) > 1 else None
+    }
+
+
+def run(kernels: Sequence[str] = tuple(KERNELS), sizes: Sequence[int] = SIZES, repeat: int = 5,
+        verbose: bool = True) -> dict:
+    """
+        Run the micro-benchmarks of several kernels.
+
+    :param kernels: the kernel names, among KERNELS
+    :param sizes: the scene sizes
+    :param repeat: the number of timed batches per size
+    :param verbose: whether to print the results as they are obtained
+    :return: the results, with metadata about the benchmark platform
+    """
+    results = []
+    for name in kernels:
+        results.append(benchmark_kernel(name, sizes, repeat))
+        if verbose:
+            print(format_result(results[-1]))
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "repeat": repeat
+        },
+        "results": results
+    }
+
+
+def superlinear(results: dict, threshold: float = SUPERLINEAR_SLOPE) -> List[str]:
+    """
+        List the kernels whose scaling slope exceeds a threshold.
+
+    :param results: the benchmark results
+    :param threshold: the slope threshold
+    :return: the names of the superlinear kernels
+    """
+    return [r["kernel"] for r in results["results"] if r["slope"] is not None and r["slope"] > threshold]
+
+
+def format_result(result: dict) -> str:
+    curve = ", ".join("{}: {:.1f}".format(size, duration)
+                      for size, duration in zip(result["sizes"], result["durations_us"]))
+    slope = " slope {:.2f}".format(result["slope"]) if result["slope"] is not None else ""
+    return "{} [{}] us |{}".format(result["kernel"], curve, slope)
+
+
+def main(args: Sequence[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the scaling of the simulation kernels.")
+    parser.add_argument("--kernels", nargs="+", default=list(KERNELS), choices=list(KERNELS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="path of the JSON results")
+    args = parser.parse_args(args)
+
+    results = run(args.kernels, args.sizes, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    kernels = superlinear(results)
+    print("Superlinear kernels: " + ", ".join(kernels) if kernels else "No superlinear kernel.")
+
+
+if __name__ == "__main__":
+    main()
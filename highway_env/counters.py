@@ -0,0 +1,92 @@
+"""
+    Global counters of the geometric queries and of the cache hits and misses.
+
+    Hot functions call increment(name) only when counting is enabled, so that the disabled path costs a single
+    branch; an increment is a locked dictionary update. Counting is enabled by the environments configured with
+    "profiling", and within a counting() scope. Caches count their lookups as <cache>.hits and <cache>.misses.
+
+    The counters are process-wide: they are shared by all the environments and threads of a process, e.g. the
+    rendering worker of an AsyncVideoRecorder, and the lock guarantees that concurrent increments are not lost.
+    Per-step or per-episode counts are obtained as differences between snapshots, so the counts of episodes running
+    concurrently in a process, e.g. several environments or threads, include each other's queries:
+
+        counters.enabled = True
+        before = counters.snapshot()
+        env.step(action)
+        assert counters.since(before)["local_coordinates"] < budget
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import DefaultDict, Dict, Iterator
+
+counts: DefaultDict[str, int] = defaultdict(int)
+""" The cumulative count of each counter, only to be modified with the lock held """
+
+lock = threading.Lock()
+
+enabled: bool = False
+""" Whether the call sites count their queries, which they check before calling increment() """
+
+
+def increment(name: str, count: int = 1) -> None:
+    with lock:
+        counts[name] += count
+
+
+def snapshot() -> Dict[str, int]:
+    """
+    :return: a copy of the current counts
+    """
+    with lock:
+        return dict(counts)
+
+
+def since(reference: Dict[str, int]) -> Dict[str, int]:
+    """
+        Get the counts accumulated since a snapshot.
+
+    :param reference: a snapshot of the counts
+    :return: the non-zero count increments since the snapshot
+    """
+    current = snapshot()
+    return {name: count - reference.get(name, 0) for name, count in current.items()
+            if count != reference.get(name, 0)}
+
+
+def hit_rate(values: Dict[str, int], cache: str) -> float:
+    """
+        Get the hit rate of a cache.
+
+    :param values: counts, e.g. a snapshot or increments since a snapshot
+    :param cache: the name of the cache
+    :return: the proportion of lookups that were hits, or NaN if there was no lookup
+    """
+    hits, misses = values.get(cache + ".hits", 0), values.get(cache + ".misses", 0)
+    return hits / (hits + misses) if hits + misses else float("nan")
+
+
+def clear() -> None:
+    with lock:
+        counts.clear()
+
+
+@contextmanager
+def counting() -> Iterator[Dict[str, int]]:
+    """
+        Enable counting and collect the counts accumulated within a scope.
+
+        with counting() as scope:
+            env.step(action)
+        scope["neighbour_vehicles"]
+
+    :return: a dictionary filled with the count increments when the scope exits
+    """
+    global enabled
+    was_enabled, enabled = enabled, True
+    reference, scope = snapshot(), {}
+    try:
+        yield scope
+    finally:
+        scope.update(since(reference))
+        enabled = was_enabled
@@ -0,0 +1,200 @@
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+import gym
+import numpy as np
+from numpy.lib.format import open_memmap
+
+Transition = Dict[str, np.ndarray]
+
+
+class DatasetRecorder(gym.Wrapper):
+    """
+        An environment wrapper recording transitions into an offline dataset.
+
+        Observations, actions, rewards, next observations, dones and selected info fields are streamed into
+        preallocated memory-mapped .npy shards, so that datasets larger than memory can be written at disk speed.
+        A small index.json file describes the fields and the number of transitions in each shard.
+    """
+    SHARD_SIZE: int = 100000
+    """ Number of transitions per shard """
+
+    INDEX_FILE: str = "index.json"
+
+    INFO_DTYPE: str = "float64"
+    """ Storage type of the info fields whose type is not declared, where missing values are NaN """
+
+    def __init__(self, env: gym.Env, directory: str, shard_size: int = None, info_keys: Sequence[str] = (),
+                 info_dtypes: Dict[str, str] = None) -> None:
+        """
+        :param env: the environment to record
+        :param directory: the directory where the dataset is written
+        :param shard_size: number of transitions per shard
+        :param info_keys: the info fields to record, which must be numeric
+        :param info_dtypes: the storage types of some info fields, float64 by default. A value that cannot be
+                            stored losslessly, such as a missing value in a bool or int field, raises a ValueError.
+        """
+        super().__init__(env)
+        self.directory = directory
+        self.shard_size = shard_size or self.SHARD_SIZE
+        self.info_keys = list(info_keys)
+        self.info_dtypes = {"info_" + key: np.dtype((info_dtypes or {}).get(key, self.INFO_DTYPE))
+                            for key in self.info_keys}
+        self.fields = None
+        self.shards = []
+        self.arrays = None
+        self.size = 0
+        self.observation = None
+        os.makedirs(directory, exist_ok=True)
+
+    def reset(self, **kwargs) -> np.ndarray:
+        observation = self.env.reset(**kwargs)
+        self.observation = np.array(observation)  # Observations may be views overwritten by the next step
+        return observation
+
+    def step(self, action) -> Tuple[np.ndarray, float, bool, dict]:
+        next_observation, reward, done, info = self.env.step(action)
+        self.write({
+            "observations": self.observation,
+            "actions": action,
+            "rewards": reward,
+            "next_observations": next_observation,
+            "dones": done,
+            **{"info_" + key: info.get(key, np.nan) for key in self.info_keys}
+        })
+        self.observation = np.array(next_observation)
+        return next_observation, reward, done, info
+
+    def write(self, transition: Dict[str, object]) -> None:
+        """
+            Write a transition in the current shard, and open a new shard if it is full.
+
+        :param transition: a dictionary {field: value}
+        """
+        if self.fields is None:
+            self.fields = OrderedDict((name, {"shape": list(np.shape(value)),
+                                              "dtype": self.info_dtypes.get(name, np.asarray(value).dtype).str})
+                                      for name, value in transition.items())
+        for name, dtype in self.info_dtypes.items():
+            self.check_cast(name, transition[name], dtype)
+        if self.arrays is None or self.size == self.shard_size:
+            self.open_shard()
+        for name, value in transition.items():
+            self.arrays[name][self.size] = value
+        self.size += 1
+        self.shards[-1]["size"] = self.size
+
+    @staticmethod
+    def check_cast(name: str, value: object, dtype: np.dtype) -> None:
+        """
+            Check that a value can be stored losslessly with a storage type.
+
+        :param name: the field name
+        :param value: the value
+        :param dtype: the storage type
+        :raises ValueError: if the value would be altered
+        """
+        value = np.asarray(value)
+        with np.errstate(invalid="ignore"):
+            lossless = value.dtype.kind in "biuf" and np.array_equal(value.astype(dtype), value, equal_nan=True)
+        if not lossless:
+            raise ValueError("The value {} of field {} cannot be stored as {}".format(value, name, dtype))
+
+    def open_shard(self) -> None:
+        """
+            Flush the current shard, and preallocate the files of a new one.
+        """
+        self.flush()
+        name = "shard_{:05d}".format(len(self.shards))
+        os.makedirs(os.path.join(self.directory, name), exist_ok=True)
+        self.arrays = {field: open_memmap(os.path.join(self.directory, name, field + ".npy"), mode="w+",
+                                          dtype=np.dtype(spec["dtype"]), shape=(self.shard_size, *spec["shape"]))
+                       for field, spec in self.fields.items()}
+        self.shards.append({"name": name, "size": 0})
+        self.size = 0
+
+    def flush(self) -> None:
+        """
+            Write the recorded transitions and the index to disk.
+        """
+        if self.arrays:
+            for array in self.arrays.values():
+                array.flush()
+        if self.fields is not None:
+            with open(os.path.join(self.directory, self.INDEX_FILE), "w") as f:
+                json.dump({"fields": self.fields, "shards": self.shards}, f, indent=2)
+
+    def close(self) -> None:
+        self.flush()
+        self.arrays = None
+        super().close()
+
+
+class DatasetReader(object):
+    """
+        Random access to a dataset written by a DatasetRecorder.
+
+        Shards are memory-mapped and never loaded in memory as a whole: slices within a shard are zero-copy views,
+        and arbitrary batches only read the requested transitions.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """
+        :param directory: the directory of the dataset
+        """
+        with open(os.path.join(directory, DatasetRecorder.INDEX_FILE)) as f:
+            index = json.load(f)
+        self.fields = list(index["fields"])
+        self.shards = [{field: np.load(os.path.join(directory, shard["name"], field + ".npy"), mmap_mode="r")
+                        [:shard["size"]] for field in self.fields}
+                       for shard in index["shards"] if shard["size"]]
+        self.offsets = np.cumsum([0] + [len(shard[self.fields[0]]) for shard in self.shards])
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def slice(self, start: int, stop: int) -> List[Transition]:
+        """
+            Get a range of transitions, as views of the shards that contain them.
+
+        :param start: the index of the first transition
+        :param stop: the index after the last transition
+        :return: a list of transitions batches, one per shard overlapping the range
+        """
+        batches = []
+        for k, shard in enumerate(self.shards):
+            low, high = max(start, self.offsets[k]), min(stop, self.offsets[k + 1])
+            if low < high:
+                batches.append({field: shard[field][low - self.offsets[k]:high - self.offsets[k]]
+                                for field in self.fields})
+        return batches
+
+    def __getitem__(self, indices: np.ndarray) -> Transition:
+        """
+            Get a batch of transitions.
+
+        :param indices: the indexes of the transitions
+        :return: a dictionary {field: values}, stacked along the first axis
+        """
+        indices = np.asarray(indices)
+        shards = np.searchsorted(self.offsets, indices, side="right") - 1
+        batch = {field: np.empty((len(indices),) + self.shards[0][field].shape[1:], dtype=self.shards[0][field].dtype)
+                 for field in self.fields}
+        for k in np.unique(shards):
+            where = shards == k
+            local = indices[where] - self.offsets[k]
+            for field in self.fields:
+                batch[field][where] = self.shards[k][field][local]
+        return batch
+
+    def sample(self, batch_size: int, np_random: np.random.RandomState = np.random) -> Transition:
+        """
+            Sample a batch of transitions uniformly.
+
+        :param batch_size: the number of transitions
+        :param np_random: a random number generator
+        :return: a dictionary {field: values}
+        """
+        return self[np_random.randint(len(self), size=batch_size)]
@@ -1,14 +1,17 @@
 import copy
-from typing import List, Union, Tuple, Optional
+from typing import Callable, Dict, List, Union, Tuple, Optional
 import gym
 from gym import spaces
 from gym.utils import seeding
 import numpy as np
 
-from highway_env import utils
+from highway_env import counters, utils
 from highway_env.envs.common.observation import observation_factory
 from highway_env.envs.common.finite_mdp import finite_mdp
 from highway_env.envs.common.graphics import EnvViewer
+from highway_env.envs.common.profiler import Profiler
+from highway_env.envs.common.scene_cache import scene_cache, config_hash, random_state_hash
+from highway_env.road.road import RoadNetwork
 from highway_env.vehicle.behavior import IDMVehicle, LinearVehicle
 from highway_env.vehicle.controller import MDPVehicle
 
@@ -71,10 +74,13 @@ class AbstractEnv(gym.Env):
         self.time = 0  # Simulation time
         self.steps = 0  # Actions performed
         self.done = False
+        self.profiler = None
+        self.counts_at_reset = {}
 
         # Rendering
         self.viewer = None
         self.automatic_rendering_callback = None
+        self.frame_callback = None
         self.should_update_rendering = True
         self.rendering_mode = 'human'
         self.enable_auto_render = False
@@ -105,7 +111,10 @@ class AbstractEnv(gym.Env):
             "scaling": 5.5,
             "show_trajectories": False,
             "render_agent": True,
-            "offscreen_rendering": False
+            "offscreen_rendering": False,
+            "cache_network": True,
+            "cache_traffic": False,  # only honoured by intersection-v0, whose population includes a warm-up
+            "profiling": False
         }
 
     def seed(self, seed: int = None) -> List[int]:
@@ -119,6 +128,7 @@ class AbstractEnv(gym.Env):
     def define_spaces(self) -> None:
         self.observation = observation_factory(self, self.config["observation"])
         self.observation_space = self.observation.space()
+        self.observe_phase = "observe/" + type(self.observation).__name__
 
         if self.config["action"]["type"] == "Discrete":
             self.action_space = spaces.Discrete(len(self.ACTIONS))
@@ -161,8 +171,44 @@ class AbstractEnv(gym.Env):
         self.time = 0
         self.done = False
         self.define_spaces()
+        self.profiler = (self.profiler or Profiler()) if self.config["profiling"] else None
+        if self.profiler:
+            counters.enabled = True  # for the whole process, as the counters are process-wide
+        self.counts_at_reset = counters.snapshot()
         return self.observation.observe()
 
+    def _cached_network(self, make_network: Callable[[], RoadNetwork]) -> RoadNetwork:
+        """
+        Get the road network of the scene, reusing it across resets with the same configuration.
+
+        :param make_network: a function creating the road network
+        :return: the road network
+        """
+        if not self.config["cache_network"]:
+            return make_network()
+        return scene_cache.get_network((self.__class__.__name__, config_hash(self.config)), make_network)
+
+    def _cached_traffic(self, populate: Callable[[], None]) -> None:
+        """
+        Populate the road with initial traffic, or restore a cached outcome of this population.
+
+        The cache is keyed by the configuration and the state of the random generator before population, so that the
+        restored road and the random generator state after restoration are identical to those obtained by populating.
+
+        :param populate: a function populating self.road, e.g. by spawning vehicles and warming up the traffic
+        """
+        if not self.config["cache_traffic"]:
+            populate()
+            return
+        key = (self.__class__.__name__, config_hash(self.config), random_state_hash(self.np_random))
+        cached = scene_cache.get_traffic(key, self.road)
+        if cached:
+            self.road, random_state = cached
+            self.np_random.set_state(random_state)
+        else:
+            populate()
+            scene_cache.store_traffic(key, self.road, self.np_random.get_state())
+
     def step(self, action: Action) -> Tuple[Observation, float, bool, dict]:
         """
         Perform an action and step the environment dynamics.
@@ -176,11 +222,13 @@ class AbstractEnv(gym.Env):
         if self.road is None or self.vehicle is None:
             raise NotImplementedError("The road and vehicle must be initialized in the environment implementation")
 
-        self._simulate(action)
+        if self.profiler:
+            self.profiler.start_step()
+        self._profiled("simulate", self._simulate, action)
 
-        obs = self.observation.observe()
-        reward = self._reward(action)
-        terminal = self._is_terminal()
+        obs = self._profiled(self.observe_phase, self.observation.observe)
+        reward = self._profiled("reward", self._reward, action)
+        terminal = self._profiled("terminal", self._is_terminal)
 
         info = {
             "speed": self.vehicle.speed,
@@ -188,16 +236,61 @@ class AbstractEnv(gym.Env):
             "action": action,
         }
         try:
-            info["cost"] = self._cost(action)
+            info["cost"] = self._profiled("cost", self._cost, action)
         except NotImplementedError:
             pass
+        self._add_profile_info(info)
 
         return obs, reward, terminal, info
 
+    def _add_profile_info(self, info: dict) -> None:
+        """
+        Add the profile and the counts of the last step to the step information, if profiling is enabled.
+
+        :param info: the step information
+        """
+        if self.profiler:
+            info["profile"] = self.profiler.last_step()
+            info["counts"] = self.profiler.last_step_counts()
+
+    def _profiled(self, phase: str, function: Callable, *args) -> object:
+        """
+        Call a function, and record its duration if profiling is enabled.
+
+        :param phase: the name of the profiled phase
+        :param function: the function to call
+        :param args: the function arguments
+        :return: the function result
+        """
+        if self.profiler is None:
+            return function(*args)
+        return self.profiler.call(phase, function, *args)
+
+    def get_profile(self) -> dict:
+        """
+        Get the profile of the environment steps, when the "profiling" configuration is enabled.
+
+        :return: the number of calls, total and mean duration [s] of each phase of the steps
+        """
+        return self.profiler.summary() if self.profiler else {}
+
+    def get_counts(self) -> Dict[str, int]:
+        """
+        Get the counts of geometric queries and cache lookups since the last reset.
+
+        The queries are only counted while counting is enabled, i.e. once an environment of the process is configured
+        with "profiling", or within highway_env.counters.counting(). The counters are process-wide: they include the
+        queries of the other environments and threads of the process during the episode.
+
+        :return: the non-zero counts
+        """
+        return counters.since(self.counts_at_reset)
+
     def _simulate(self, action: Optional[Action] = None) -> None:
         """
         Perform several steps of simulation with constant action
         """
+        self.road.profiler = self.profiler
         for k in range(int(self.config["simulation_frequency"] // self.config["policy_frequency"])):
             if action is not None and \
                     self.time % int(self.config["simulation_frequency"] // self.config["policy_frequency"]) == 0:
@@ -216,7 +309,7 @@ class AbstractEnv(gym.Env):
 
             # Automatically render intermediate simulation steps if a viewer has been launched
             # Ignored if the rendering is done offscreen
-            self._automatic_rendering()
+            self._profiled("simulate/render", self._automatic_rendering)
 
             # Stop at terminal states
             if self.done or self._is_terminal():
@@ -290,7 +383,12 @@ class AbstractEnv(gym.Env):
 
         If a callback has been set, use it to perform the rendering. This is useful for the environment wrappers
         such as video-recording monitor that need to access these intermediate renderings.
+
+        If a frame callback has been set, it is called at every simulation frame, even without a viewer. This is used
+        by recorders that render the frames themselves, such as the AsyncVideoRecorder.
         """
+        if self.frame_callback:
+            self.frame_callback()
         if self.viewer is not None and self.enable_auto_render:
             self.should_update_rendering = True
 
@@ -381,7 +479,7 @@ class AbstractEnv(gym.Env):
         result = cls.__new__(cls)
         memo[id(self)] = result
         for k, v in self.__dict__.items():
-            if k not in ['viewer', 'automatic_rendering_callback']:
+            if k not in ['viewer', 'automatic_rendering_callback', 'frame_callback']:
                 setattr(result, k, copy.deepcopy(v, memo))
             else:
                 setattr(result, k, None)
@@ -1,5 +1,5 @@
 import os
-from typing import TYPE_CHECKING, Callable, List
+from typing import TYPE_CHECKING, Callable, List, Tuple
 import numpy as np
 import pygame
 from gym.spaces import Discrete
@@ -152,3 +152,69 @@ class EnvViewer(object):
             Close the pygame window.
         """
         pygame.quit()
+
+
+class TiledEnvViewer(object):
+    """
+        An offscreen viewer rendering several environments into the tiles of a single canvas, e.g. to monitor the
+        environments of a vectorized environment.
+
+        All environments are drawn in one pass on the same surface: for each tile, the clipping area is restricted to
+        the tile and the origin is shifted so that the tile is centered on the environment ego-vehicle. The road layer
+        tiles and vehicle sprites caches are shared by all tiles.
+    """
+
+    def __init__(self, envs: List['AbstractEnv'], columns: int = None, tile_size: Tuple[int, int] = None) -> None:
+        """
+        :param envs: the environments to render
+        :param columns: the number of tiles per row, by default to obtain a square grid
+        :param tile_size: the size of a tile (width, height) [px], by default the screen size of the first environment
+        """
+        self.envs = envs
+        self.columns = columns or int(np.ceil(np.sqrt(len(envs))))
+        self.rows = int(np.ceil(len(envs) / self.columns))
+        self.tile_size = np.array(tile_size or (envs[0].config["screen_width"], envs[0].config["screen_height"]))
+        size = (int(self.columns * self.tile_size[0]), int(self.rows * self.tile_size[1]))
+        self.canvas = WorldSurface(size, 0, pygame.Surface(size))
+        self.canvas.fill(WorldSurface.BLACK)
+
+    def tile_offset(self, index: int) -> np.ndarray:
+        """
+        :param index: the index of an environment
+        :return: the position of the top-left corner of its tile in the canvas [px]
+        """
+        return np.array([index % self.columns, index // self.columns]) * self.tile_size
+
+    def display(self) -> None:
+        """
+            Display the road and vehicles of every environment in its tile.
+        """
+        for index, env in enumerate(self.envs):
+            self.display_tile(index, env)
+        self.canvas.set_clip(None)
+
+    def display_tile(self, index: int, env: 'AbstractEnv') -> None:
+        offset = self.tile_offset(index)
+        self.canvas.set_clip(pygame.Rect(tuple(offset), tuple(self.tile_size)))
+        self.canvas.scaling = env.config.get("scaling", WorldSurface.INITIAL_SCALING)
+        centering = np.array(env.config.get("centering_position", WorldSurface.INITIAL_CENTERING))
+        position = env.vehicle.position if env.vehicle else np.array([0, 0])
+        self.canvas.origin = position - (centering * self.tile_size + offset) / self.canvas.scaling
+        RoadGraphics.display(env.road, self.canvas)
+        RoadGraphics.display_road_objects(env.road, self.canvas, offscreen=True)
+        RoadGraphics.display_traffic(env.road, self.canvas, simulation_frequency=env.config["simulation_frequency"],
+                                     offscreen=True)
+
+    def get_image(self) -> np.ndarray:
+        """
+        :return: the rendered canvas as an rgb array, of shape (rows * height, columns * width, 3)
+        """
+        return np.moveaxis(pygame.surfarray.array3d(self.canvas), 0, 1)
+
+    def get_images(self) -> List[np.ndarray]:
+        """
+        :return: the rendered image of each environment, as views of a single rgb array of the canvas
+        """
+        image = self.get_image()
+        width, height = self.tile_size
+        return [image[y:y + height, x:x + width] for x, y in (self.tile_offset(k) for k in range(len(self.envs)))]
@@ -1,12 +1,13 @@
 from typing import Optional, List, Dict, TYPE_CHECKING
 from gym import spaces
 import numpy as np
-import pandas as pd
 
 from highway_env import utils
 from highway_env.envs.common.finite_mdp import compute_ttc_grid
+from highway_env.envs.common.rasterizer import Rasterizer
 from highway_env.road.lane import AbstractLane
 from highway_env.vehicle.controller import MDPVehicle
+from highway_env.vehicle.kinematics import Vehicle
 
 if TYPE_CHECKING:
     from highway_env.envs.common.abstract import AbstractEnv
@@ -31,35 +32,68 @@ class GrayscaleObservation(ObservationType):
                 "type": "GrayscaleObservation",
                 "weights": [0.2989, 0.5870, 0.1140],  #weights for RGB conversion,
                 "stack_size": 4,
-                "observation_shape": (84, 84)
+                "observation_shape": (84, 84),
+                "headless": False,  # rasterize with numpy rather than rendering with pygame
+                "dtype": "uint8",  # storage type of the frames, up to float32
+                "view": False  # return a view of the ring buffer rather than a copy
             }
 
         Also, the screen_height and screen_width of the environment should match the
-        expected observation_shape. 
+        expected observation_shape, unless the frames are rasterized headless, at the observation_shape resolution.
+
+        The frames are stacked in a ring buffer where each frame is written twice, at positions k and k + stack_size,
+        so that the stack ordered from oldest to newest frame is always the slice [k + 1, k + 1 + stack_size) of the
+        last axis, a strided view of the buffer obtained without rolling the frames. With uint8 frames, this buffer of
+        2 * stack_size frames takes about 4 times less memory than a stack of stack_size float64 frames.
+
+        The observation is a copy of this view by default. With the view option, the view itself is returned, which
+        saves a copy per step but is overwritten by the next call to observe(): callers that keep an observation
+        across steps, such as replay buffers, must then copy it.
     """
     def __init__(self, env: 'AbstractEnv', config: dict) -> None:
         self.env = env
         self.config = config
         self.observation_shape = config["observation_shape"]
-        self.shape = self.observation_shape + (config["stack_size"], )
-        self.state = np.zeros(self.shape)
+        self.stack_size = config["stack_size"]
+        self.shape = self.observation_shape + (self.stack_size, )
+        self.dtype = np.dtype(config.get("dtype", "uint8"))
+        self.view = config.get("view", False)
+        self.frames = np.zeros(self.observation_shape + (2 * self.stack_size, ), dtype=self.dtype)
+        self.index = 0  # Position of the oldest frame in the ring buffer
+        self.rasterizer = None
+        if config.get("headless", False):
+            self.rasterizer = Rasterizer.from_env(env, width=self.observation_shape[0],
+                                                  height=self.observation_shape[1], weights=config["weights"])
 
     def space(self) -> spaces.Space:
         try:
             return spaces.Box(shape=self.shape,
-                              low=0, high=1,
-                              dtype=np.float32)
+                              low=0, high=255,
+                              dtype=self.dtype)
         except AttributeError:
             return spaces.Space()
 
+    @property
+    def state(self) -> np.ndarray:
+        """ The stack of frames ordered from oldest to newest, as a strided view of the ring buffer """
+        return self.frames[..., self.index:self.index + self.stack_size]
+
     def observe(self) -> np.ndarray:
+        """
+            Record a new frame, and get the stack of the most recent frames.
+
+        :return: the stack of frames. With the view option, it is a view of the ring buffer which is overwritten by
+                 the next call to observe(), and callers that keep an observation across steps must copy it.
+        """
         new_obs = self._record_to_grayscale()
         new_obs = np.reshape(new_obs, self.observation_shape)
-        self.state = np.roll(self.state, -1, axis=-1)
-        self.state[:, :, -1] = new_obs
-        return self.state
+        self.frames[..., self.index] = self.frames[..., self.index + self.stack_size] = new_obs
+        self.index = (self.index + 1) % self.stack_size
+        return self.state if self.view else self.state.copy()
 
     def _record_to_grayscale(self) -> np.ndarray:
+        if self.rasterizer:
+            return self.rasterizer.render(self.env)
         raw_rgb = self.env.render('rgb_array')
         return np.dot(raw_rgb[..., :3], self.config['weights'])
 
@@ -135,12 +169,12 @@ class KinematicObservation(ObservationType):
     def space(self) -> spaces.Space:
         return spaces.Box(shape=(self.vehicles_count, len(self.features)), low=-1, high=1, dtype=np.float32)
 
-    def normalize_obs(self, df: pd.DataFrame) -> pd.DataFrame:
+    def normalize_obs(self, obs: np.ndarray) -> np.ndarray:
         """
             Normalize the observation values.
 
             For now, assume that the road is straight along the x axis.
-        :param Dataframe df: observation data
+        :param ndarray obs: observation data, with a column per feature
         """
         if not self.features_range:
             side_lanes = self.env.road.network.all_side_lanes(self.env.vehicle.lane_index)
@@ -151,40 +185,33 @@ class KinematicObservation(ObservationType):
                 "vy": [-2*MDPVehicle.SPEED_MAX, 2*MDPVehicle.SPEED_MAX]
             }
         for feature, f_range in self.features_range.items():
-            if feature in df:
-                df[feature] = utils.lmap(df[feature], [f_range[0], f_range[1]], [-1, 1])
+            if feature in self.features:
+                j = self.features.index(feature)
+                obs[:, j] = utils.lmap(obs[:, j], [f_range[0], f_range[1]], [-1, 1])
                 if self.clip:
-                    df[feature] = np.clip(df[feature], -1, 1)
-        return df
+                    obs[:, j] = np.clip(obs[:, j], -1, 1)
+        return obs
 
     def observe(self) -> np.ndarray:
-        # Add ego-vehicle
-        df = pd.DataFrame.from_records([self.env.vehicle.to_dict()])[self.features]
-        # Add nearby traffic
-        sort = self.order == "sorted"
+        # Add ego-vehicle, and nearby traffic
         close_vehicles = self.env.road.close_vehicles_to(self.env.vehicle,
                                                          self.env.PERCEPTION_DISTANCE,
                                                          count=self.vehicles_count - 1,
                                                          see_behind=self.see_behind)
-        if close_vehicles:
-            origin = self.env.vehicle if not self.absolute else None
-            df = df.append(pd.DataFrame.from_records(
-                [v.to_dict(origin, observe_intentions=self.observe_intentions)
-                 for v in close_vehicles[-self.vehicles_count + 1:]])[self.features],
-                           ignore_index=True)
+        origin = self.env.vehicle if not self.absolute else None
+        rows = np.concatenate([
+            Vehicle.features_array([self.env.vehicle], self.features),
+            Vehicle.features_array(close_vehicles[-self.vehicles_count + 1:], self.features, origin,
+                                   observe_intentions=self.observe_intentions)])
         # Normalize and clip
         if self.normalize:
-            df = self.normalize_obs(df)
+            rows = self.normalize_obs(rows)
         # Fill missing rows
-        if df.shape[0] < self.vehicles_count:
-            rows = np.zeros((self.vehicles_count - df.shape[0], len(self.features)))
-            df = df.append(pd.DataFrame(data=rows, columns=self.features), ignore_index=True)
+        obs = np.zeros((self.vehicles_count, len(self.features)))
+        obs[:rows.shape[0]] = rows
         # Reorder
-        df = df[self.features]
-        obs = df.values.copy()
         if self.order == "shuffled":
             self.env.np_random.shuffle(obs[1:])
-        # Flatten
         return obs
 
 
@@ -221,12 +248,12 @@ class OccupancyGridObservation(ObservationType):
     def space(self) -> spaces.Space:
         return spaces.Box(shape=self.grid.shape, low=-1, high=1, dtype=np.float32)
 
-    def normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+    def normalize(self, obs: np.ndarray) -> np.ndarray:
         """
             Normalize the observation values.
 
             For now, assume that the road is straight along the x axis.
-        :param Dataframe df: observation data
+        :param ndarray obs: observation data, with a column per feature
         """
         if not self.features_range:
             self.features_range = {
@@ -234,9 +261,10 @@ class OccupancyGridObservation(ObservationType):
                 "vy": [-2*MDPVehicle.SPEED_MAX, 2*MDPVehicle.SPEED_MAX]
             }
         for feature, f_range in self.features_range.items():
-            if feature in df:
-                df[feature] = utils.lmap(df[feature], [f_range[0], f_range[1]], [-1, 1])
-        return df
+            if feature in self.features:
+                j = self.features.index(feature)
+                obs[:, j] = utils.lmap(obs[:, j], [f_range[0], f_range[1]], [-1, 1])
+        return obs
 
     def observe(self) -> np.ndarray:
         if self.absolute:
@@ -244,23 +272,15 @@ class OccupancyGridObservation(ObservationType):
         else:
             # Add nearby traffic
             self.grid.fill(0)
-            df = pd.DataFrame.from_records(
-                [v.to_dict(self.env.vehicle) for v in self.env.road.vehicles])
+            features = Vehicle.features_array(self.env.road.vehicles, self.features + ["x", "y"], self.env.vehicle)
+            values, positions = features[:, :-2], features[:, -2:]
             # Normalize
-            df = self.normalize(df)
+            values = self.normalize(values)
             # Fill-in features
-            for layer, feature in enumerate(self.features):
-                for _, vehicle in df.iterrows():
-                    x, y = vehicle["x"], vehicle["y"]
-                    # Recover unnormalized coordinates for cell index
-                    if "x" in self.features_range:
-                        x = utils.lmap(x, [-1, 1], [self.features_range["x"][0], self.features_range["x"][1]])
-                    if "y" in self.features_range:
-                        y = utils.lmap(y, [-1, 1], [self.features_range["y"][0], self.features_range["y"][1]])
-                    cell = (int((x - self.grid_size[0, 0]) / self.grid_step[0]),
-                            int((y - self.grid_size[1, 0]) / self.grid_step[1]))
-                    if 0 <= cell[1] < self.grid.shape[-2] and 0 <= cell[0] < self.grid.shape[-1]:
-                        self.grid[layer, cell[1], cell[0]] = vehicle[feature]
+            cells = ((positions - self.grid_size[:, 0]) / self.grid_step).astype(int)
+            for (x, y), value in zip(cells, values):
+                if 0 <= y < self.grid.shape[-2] and 0 <= x < self.grid.shape[-1]:
+                    self.grid[:, y, x] = value
             # Clip
             obs = np.clip(self.grid, -1, 1)
             return obs
@@ -283,8 +303,8 @@ class KinematicsGoalObservation(KinematicObservation):
             return spaces.Space()
 
     def observe(self) -> Dict[str, np.ndarray]:
-        obs = np.ravel(pd.DataFrame.from_records([self.env.vehicle.to_dict()])[self.features])
-        goal = np.ravel(pd.DataFrame.from_records([self.env.goal.to_dict()])[self.features])
+        obs = Vehicle.features_array([self.env.vehicle], self.features)[0]
+        goal = Vehicle.features_array([self.env.goal], self.features)[0]
         obs = {
             "observation": obs / self.scales,
             "achieved_goal": obs / self.scales,
@@ -362,83 +382,72 @@ class SimplifiedKinematicsObservation(ObservationType):
         observation = np.clip(observation, -1, 1)
         return observation
     
-    def truncated_normal(mu,sigma):
-        x = 3*sigma
-        while x >= 2*sigma or x <= 2*sigma:
-            x = np.random.normal(mu,sigma)
+    @staticmethod
+    def truncated_normal(mu: np.ndarray, sigma: float, np_random: np.random.RandomState) -> np.ndarray:
+        """
+            Sample normal variables truncated within two standard deviations of their means.
+
+            All variables are drawn at once, and only the rejected ones are drawn again.
+
+        :param mu: the means
+        :param sigma: the standard deviation
+        :param np_random: the random generator
+        :return: the samples, of the shape of mu
+        """
+        mu = np.asarray(mu, dtype=float)
+        x = np_random.normal(mu, sigma)
+        rejected = np.abs(x - mu) >= 2 * sigma
+        while rejected.any():
+            x[rejected] = np_random.normal(mu[rejected], sigma)
+            rejected = np.abs(x - mu) >= 2 * sigma
         return x
 
     def observe(self) -> np.ndarray:
-        side_lanes = self.env.road.network.all_side_lanes(self.env.vehicle.lane_index)
+        ego = self.env.vehicle
+        lanes_count = len(self.env.road.network.all_side_lanes(ego.lane_index))
         if self.features_range is None:
             self.features_range = {
-                "lane_index": [0, len(side_lanes)-1],
+                "lane_index": [0, lanes_count-1],
                 "x": [-5.0 * MDPVehicle.SPEED_MAX, 5.0 * MDPVehicle.SPEED_MAX],
                 "vx": [-2*MDPVehicle.SPEED_MAX, 2*MDPVehicle.SPEED_MAX]
             }
-        
-        # Add ego-vehicle
-        ego = self.env.vehicle.to_dict()
-
-        ego_lane_id = ego['lane_index'][2]
-        right_lanes_id = []
-        left_lanes_id = []
-        for i in range(1,self.lanes_count+1):
-            right_lanes_id.append(ego_lane_id + i)
-            left_lanes_id.append(ego_lane_id - i)
-        left_to_right_lanes_id = left_lanes_id
-        left_to_right_lanes_id.reverse()
-        left_to_right_lanes_id.append(ego_lane_id)
-        left_to_right_lanes_id.extend(right_lanes_id)
-        lanes_id = dict()
-        for i,lane in enumerate(left_to_right_lanes_id):
-            lanes_id[lane] = 2*i+1
-
-        
-        # Add nearby traffic
-        close_vehicles = self.env.road.close_vehicles_to(self.env.vehicle,
-                                                         self.env.PERCEPTION_DISTANCE,
-                                                         count=None,
-                                                         see_behind=True)
-        origin = self.env.vehicle
-        exos = [ v.to_dict(origin, observe_intentions=False) for v in close_vehicles ]
-
-        observation = np.ones((3+4*self.lanes_count,2))
-
-        observation[1::2,0] = truncated_normal(self.features_range['x'][0]*0.8,0.1)
-        observation[1::2,1] = truncated_normal(self.features_range['vx'][0]*0.5,0.1)
-        observation[2::2,0] = truncated_normal(self.features_range['x'][1]*0.8,0.1)
-        observation[2::2,1] = truncated_normal(self.features_range['vx'][1]*0.5,0.1)
-
-        observation[0,0] = ego['lane_index'][2]
-        observation[0,1] = ego['vx']
-        for exo in exos:
-            lane = exo['lane_index'][2]
-            if lane in left_to_right_lanes_id:
-                if exo['x']<0 and exo['x']>observation[lanes_id[lane],0]:
-                    observation[lanes_id[lane],0] = exo['x']
-                    observation[lanes_id[lane],1] = exo['vx']
-                elif exo['x']>0 and exo['x']<observation[lanes_id[lane]+1,0]:
-                    observation[lanes_id[lane]+1,0] = exo['x']
-                    observation[lanes_id[lane]+1,1] = exo['vx']
-        
-        for lane in left_to_right_lanes_id:
-            if lane < 0:
-                observation[lanes_id[lane]] = observation[lanes_id[0]]
-                observation[lanes_id[lane]+1] = observation[lanes_id[0]+1]
-            if lane >= len(side_lanes):
-                observation[lanes_id[lane]] = observation[lanes_id[len(side_lanes)-1]]
-                observation[lanes_id[lane]+1] = observation[lanes_id[len(side_lanes)-1]+1]
-                
+
+        # Observed lanes, from left to right, each with a rear and a front slot filled with padding values
+        ego_lane_id = ego.lane_index[2]
+        lanes_id = ego_lane_id + np.arange(-self.lanes_count, self.lanes_count + 1)
+        padding = self.truncated_normal([[self.features_range['x'][0]*0.8, self.features_range['vx'][0]*0.5],
+                                         [self.features_range['x'][1]*0.8, self.features_range['vx'][1]*0.5]],
+                                        0.1, self.env.np_random)
+        slots = np.tile(padding, (len(lanes_id), 1, 1))  # lane, [rear, front], [x, vx]
+
+        # Nearby traffic, relative to the ego-vehicle
+        others = [v for v in self.env.road.vehicles if v is not ego]
+        if others:
+            x, y, vx = Vehicle.features_array(others, ["x", "y", "vx"], ego).T
+            lane = np.array([v.lane_index[2] for v in others]) - lanes_id[0]
+            observed = (np.hypot(x, y) < self.env.PERCEPTION_DISTANCE) \
+                & (0 <= lane) & (lane < len(lanes_id))
+            # Closest vehicle behind (largest negative x) and ahead (smallest positive x) in each lane
+            for side, candidates in [(0, observed & (padding[0, 0] < x) & (x < 0)),
+                                     (1, observed & (0 < x) & (x < padding[1, 0]))]:
+                indexes = np.flatnonzero(candidates)
+                if not indexes.size:
+                    continue
+                indexes = indexes[np.lexsort((x[indexes], lane[indexes]))]
+                starts = np.flatnonzero(np.diff(lane[indexes])) + 1
+                indexes = indexes[np.r_[starts - 1, indexes.size - 1] if side == 0 else np.r_[0, starts]]
+                slots[lane[indexes], side] = np.stack([x[indexes], vx[indexes]], axis=1)
+
+        # Lanes beyond the road replicate its side lanes
+        slots = slots[np.clip(lanes_id, 0, lanes_count - 1) - lanes_id[0]]
+        observation = np.concatenate([[[ego_lane_id, ego.velocity[0]]], slots.reshape((-1, 2))])
+
         # Normalize and clip
         if self.normalize:
             observation = self.normalize_obs(observation)
-                
         return observation.flatten()
 
 
-
-
 def observation_factory(env: 'AbstractEnv', config: dict) -> ObservationType:
     if config["type"] == "TimeToCollision":
         return TimeToCollisionObservation(env, **config)
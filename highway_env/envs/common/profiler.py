@@ -0,0 +1,96 @@
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, TYPE_CHECKING
+
+from highway_env import counters
+
+if TYPE_CHECKING:
+    from highway_env.vehicle.kinematics import Vehicle
+
+
+class Profiler(object):
+    """
+        Record the wall time and number of calls of the phases of an environment step.
+
+        Phases are named hierarchically, e.g. simulate/act/IDMVehicle or observe/KinematicObservation, and their
+        durations are accumulated both over the last step and over the whole lifetime of the profiler. The counts of
+        geometric queries and cache lookups of the last step are also available.
+    """
+
+    def __init__(self) -> None:
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.step_durations = defaultdict(float)
+        self.counts_at_step = {}
+        self.phases = {}
+
+    def call(self, phase: str, function: Callable, *args) -> object:
+        """
+            Call a function and record its duration.
+
+        :param phase: the name of the phase
+        :param function: the function to call
+        :param args: the function arguments
+        :return: the function result
+        """
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def record(self, phase: str, duration: float) -> None:
+        self.durations[phase] += duration
+        self.counts[phase] += 1
+        self.step_durations[phase] += duration
+
+    def vehicle_phase(self, prefix: str, vehicle: "Vehicle") -> str:
+        """
+            Get the name of a phase for a vehicle class, without formatting it at every call.
+
+        :param prefix: the phase prefix
+        :param vehicle: a vehicle
+        :return: the phase name, prefix/VehicleClass
+        """
+        key = (prefix, type(vehicle))
+        if key not in self.phases:
+            self.phases[key] = "{}/{}".format(prefix, type(vehicle).__name__)
+        return self.phases[key]
+
+    def vehicles_act(self, vehicles: List["Vehicle"]) -> None:
+        for vehicle in vehicles:
+            self.call(self.vehicle_phase("simulate/act", vehicle), vehicle.act)
+
+    def vehicles_step(self, vehicles: List["Vehicle"], dt: float) -> None:
+        for vehicle in vehicles:
+            self.call(self.vehicle_phase("simulate/step", vehicle), vehicle.step, dt)
+
+    def start_step(self) -> None:
+        self.step_durations = defaultdict(float)
+        self.counts_at_step = counters.snapshot()
+
+    def last_step(self) -> Dict[str, float]:
+        """
+        :return: the duration of each phase during the last step [s]
+        """
+        return dict(self.step_durations)
+
+    def last_step_counts(self) -> Dict[str, int]:
+        """
+        :return: the process-wide counts of geometric queries and cache lookups since the start of the last step
+        """
+        return counters.since(self.counts_at_step)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: the number of calls, total duration [s] and mean duration [s] of each phase, sorted by name
+        """
+        return {phase: {"calls": self.counts[phase],
+                        "total": self.durations[phase],
+                        "mean": self.durations[phase] / self.counts[phase]}
+                for phase in sorted(self.durations)}
+
+    def clear(self) -> None:
+        self.durations.clear()
+        self.counts.clear()
+        self.step_durations.clear()
@@ -0,0 +1,296 @@
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple, Union, TYPE_CHECKING
+
+import numpy as np
+
+from highway_env import counters
+from highway_env.road.graphics import LaneGraphics, RoadObjectGraphics, WorldSurface
+from highway_env.road.lane import LineType
+from highway_env.vehicle.graphics import VehicleGraphics
+
+if TYPE_CHECKING:
+    from highway_env.envs.common.abstract import AbstractEnv
+    from highway_env.road.road import Road, RoadNetwork
+
+Layer = Tuple[np.ndarray, np.ndarray, np.ndarray, List[Union[int, np.ndarray]]]
+
+
+class SceneSnapshot(object):
+    """
+        The minimal state needed to rasterize a scene: its static road network, the image origin, and the poses, sizes
+        and colors of its road objects and vehicles.
+
+        It does not reference the road entities, so that it can be rasterized later, e.g. in another thread, while
+        the simulation goes on.
+    """
+
+    def __init__(self, network: 'RoadNetwork', origin: np.ndarray, layers: List[Layer]) -> None:
+        """
+        :param network: the road network
+        :param origin: the world position of the image origin, on the pixel grid [m]
+        :param layers: the rectangles drawn in order, as (positions, headings, sizes, colors) tuples
+        """
+        self.network = network
+        self.origin = origin
+        self.layers = layers
+
+
+class Rasterizer(object):
+    """
+        A headless rasterizer of a road scene, drawing directly into numpy arrays.
+
+        It reproduces the framing and palette of the EnvViewer, without relying on pygame surfaces: lane lines are
+        obtained by thresholding the lane coordinates of every pixel, and road objects and vehicles are drawn as oriented
+        rectangles within their bounding boxes. Images are either grayscale, with the palette converted by RGB weights,
+        or RGB.
+
+        The lane lines are static, so their masks are rasterized once in square tiles aligned on the pixel grid, and
+        cached. The image origin is snapped to this grid. The tiles cache is shared by all rasterizers, so that it
+        outlives the rasterizers created at every reset for the same road network.
+    """
+    TILE_SIZE: int = 64
+    """ Size of a lane mask tile [px] """
+
+    MAX_TILES: int = 1024
+    """ Maximum number of lane mask tiles kept in memory """
+
+    tiles = OrderedDict()
+    tiles_lock = threading.Lock()
+
+    def __init__(self,
+                 width: int,
+                 height: int,
+                 scaling: float = WorldSurface.INITIAL_SCALING,
+                 centering_position: Sequence[float] = WorldSurface.INITIAL_CENTERING,
+                 weights: Optional[Sequence[float]] = None) -> None:
+        """
+        :param width: image width [px]
+        :param height: image height [px]
+        :param scaling: the image scaling [px/m]
+        :param centering_position: the relative position of the ego-vehicle in the image
+        :param weights: weights for the RGB to grayscale conversion. If None, images are RGB.
+        """
+        self.width = width
+        self.height = height
+        self.scaling = scaling
+        self.centering_position = np.array(centering_position, dtype=float)
+        self.weights = np.array(weights, dtype=float) if weights is not None else None
+        self.shape = (height, width) if self.weights is not None else (height, width, 3)
+        self.buffer = np.zeros(self.shape, dtype=np.uint8)
+        self.mask = np.zeros((height, width), dtype=bool)
+        self.colors = {}
+        rows, cols = np.mgrid[0:self.TILE_SIZE, 0:self.TILE_SIZE]
+        self.tile_pixels = np.stack([cols.ravel(), rows.ravel()], axis=1) + 0.5  # Pixel centers in a tile [px]
+
+    @classmethod
+    def from_env(cls, env: 'AbstractEnv', width: int = None, height: int = None,
+                 weights: Optional[Sequence[float]] = None) -> "Rasterizer":
+        """
+            Create a rasterizer with the framing of an environment viewer.
+
+        :param env: the environment
+        :param width: image width [px], defaults to the screen width
+        :param height: image height [px], defaults to the screen height
+        :param weights: weights for the RGB to grayscale conversion. If None, images are RGB.
+        :return: the rasterizer
+        """
+        return cls(width or env.config["screen_width"],
+                   height or env.config["screen_height"],
+                   scaling=env.config.get("scaling", WorldSurface.INITIAL_SCALING),
+                   centering_position=env.config.get("centering_position", WorldSurface.INITIAL_CENTERING),
+                   weights=weights)
+
+    def color(self, rgb: Sequence[int]) -> Union[int, np.ndarray]:
+        """
+            Convert a color of the palette to the image format.
+
+        :param rgb: an RGB color
+        :return: the corresponding gray level, or RGB color
+        """
+        rgb = tuple(rgb[:3])
+        if rgb not in self.colors:
+            if self.weights is not None:
+                self.colors[rgb] = np.uint8(np.clip(np.round(np.dot(rgb, self.weights)), 0, 255))
+            else:
+                self.colors[rgb] = np.array(rgb, dtype=np.uint8)
+        return self.colors[rgb]
+
+    def origin(self, position: np.ndarray) -> np.ndarray:
+        """
+            The world position of the top-left corner of the image, centered on a given position.
+
+        :param position: the world position to center on [m]
+        :return: the world position of the image origin [m]
+        """
+        return np.asarray(position, dtype=float) \
+            - self.centering_position * np.array([self.width, self.height]) / self.scaling
+
+    def render(self, env: 'AbstractEnv', out: np.ndarray = None) -> np.ndarray:
+        """
+            Rasterize the scene of an environment, centered on its ego-vehicle.
+
+        :param env: the environment
+        :param out: an optional output array of shape self.shape. If None, the internal buffer is used.
+        :return: the rendered image, of shape (height, width) or (height, width, 3)
+        """
+        position = env.vehicle.position if env.vehicle else np.array([0, 0])
+        return self.render_road(env.road, self.origin(position), out)
+
+    def render_batch(self, envs: List['AbstractEnv'], out: np.ndarray = None) -> np.ndarray:
+        """
+            Rasterize the scenes of several environments, e.g. of a vectorized environment, into a stacked array.
+
+        :param envs: the environments
+        :param out: an optional output array of shape (len(envs), *self.shape)
+        :return: the rendered images, of shape (len(envs), *self.shape)
+        """
+        if out is None:
+            out = np.empty((len(envs),) + self.shape, dtype=np.uint8)
+        for k, env in enumerate(envs):
+            self.render(env, out[k])
+        return out
+
+    def render_road(self, road: 'Road', origin: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+            Rasterize a road scene.
+
+        :param road: the road, with its lanes, objects and vehicles
+        :param origin: the world position of the top-left corner of the image [m]
+        :param out: an optional output array of shape self.shape
+        :return: the rendered image
+        """
+        return self.render_snapshot(self.snapshot(road, origin), out)
+
+    def snapshot(self, road: 'Road', origin: np.ndarray) -> SceneSnapshot:
+        """
+            Capture the state of a road scene needed to rasterize it.
+
+        :param road: the road, with its lanes, objects and vehicles
+        :param origin: the world position of the top-left corner of the image [m]
+        :return: the scene snapshot
+        """
+        origin = np.floor(np.asarray(origin) * self.scaling) / self.scaling
+        layers = []
+        for objects, graphics in [(road.objects, RoadObjectGraphics), (road.vehicles, VehicleGraphics)]:
+            if objects:
+                layers.append((np.array([o.position for o in objects]),
+                               np.array([o.heading for o in objects]),
+                               np.array([[o.LENGTH, o.WIDTH] for o in objects]),
+                               [self.color(graphics.get_color(o)) for o in objects]))
+        return SceneSnapshot(road.network, origin, layers)
+
+    def render_snapshot(self, snapshot: SceneSnapshot, out: np.ndarray = None) -> np.ndarray:
+        """
+            Rasterize a scene snapshot.
+
+        :param snapshot: the scene snapshot
+        :param out: an optional output array of shape self.shape
+        :return: the rendered image
+        """
+        image = out if out is not None else self.buffer
+        image[...] = self.color(WorldSurface.GREY)
+        self.draw_lanes(snapshot.network, snapshot.origin, image)
+        for positions, headings, sizes, colors in snapshot.layers:
+            self.draw_rectangles(image, snapshot.origin, positions, headings, sizes, colors)
+        return image
+
+    def draw_lanes(self, network: 'RoadNetwork', origin: np.ndarray, image: np.ndarray) -> None:
+        """
+            Draw the side lines of all lanes of a road network, by assembling the cached tiles covering the image.
+
+        :param network: the road network
+        :param origin: the world position of the image origin, on the pixel grid [m]
+        :param image: the image to draw on
+        """
+        corner = np.round(origin * self.scaling).astype(int)  # [px]
+        size = np.array([self.width, self.height])
+        first, last = corner // self.TILE_SIZE, (corner + size - 1) // self.TILE_SIZE
+        for i in range(first[0], last[0] + 1):
+            for j in range(first[1], last[1] + 1):
+                tile_corner = np.array([i, j]) * self.TILE_SIZE
+                low = np.maximum(tile_corner, corner)
+                high = np.minimum(tile_corner + self.TILE_SIZE, corner + size)
+                (x0, y0), (x1, y1) = low - corner, high - corner
+                (u0, v0), (u1, v1) = low - tile_corner, high - tile_corner
+                self.mask[y0:y1, x0:x1] = self.lane_tile(network, i, j)[v0:v1, u0:u1]
+        image[self.mask] = self.color(WorldSurface.WHITE)
+
+    def lane_tile(self, network: 'RoadNetwork', i: int, j: int) -> np.ndarray:
+        """
+            Get the mask of lane lines in a tile, and rasterize it if it is not cached yet.
+
+            A pixel belongs to a line if its lane coordinates are within the lane extent and close to the line lateral
+            offset. Striped lines additionally select the stripes phase, as in LaneGraphics.
+
+        :param network: the road network
+        :param i: the horizontal index of the tile
+        :param j: the vertical index of the tile
+        :return: the boolean mask of lane lines, of shape (TILE_SIZE, TILE_SIZE)
+        """
+        key = (network, self.scaling, i, j)
+        with self.tiles_lock:
+            if key in self.tiles:
+                if counters.enabled:
+                    counters.increment("rasterizer.tiles.hits")
+                self.tiles.move_to_end(key)
+                return self.tiles[key]
+        if counters.enabled:
+            counters.increment("rasterizer.tiles.misses")
+        positions = (self.tile_pixels + np.array([i, j]) * self.TILE_SIZE) / self.scaling
+        half_width = max(LaneGraphics.STRIPE_WIDTH, 1 / self.scaling) / 2
+        mask = np.zeros(positions.shape[0], dtype=bool)
+        for _from in network.graph.keys():
+            for _to in network.graph[_from].keys():
+                for lane in network.graph[_from][_to]:
+                    if lane.line_types[0] == LineType.NONE and lane.line_types[1] == LineType.NONE:
+                        continue
+                    longitudinal, lateral = lane.local_coordinates_batch(positions)
+                    along = (0 <= longitudinal) & (longitudinal <= lane.length)
+                    for side in range(2):
+                        if lane.line_types[side] == LineType.NONE:
+                            continue
+                        line = along & (np.abs(lateral - (side - 0.5) * lane.width_at(0)) <= half_width)
+                        if lane.line_types[side] == LineType.STRIPED:
+                            line &= np.mod(longitudinal, LaneGraphics.STRIPE_SPACING) < LaneGraphics.STRIPE_LENGTH
+                        mask |= line
+        mask = mask.reshape((self.TILE_SIZE, self.TILE_SIZE))
+        with self.tiles_lock:
+            self.tiles[key] = mask
+            while len(self.tiles) > self.MAX_TILES:
+                self.tiles.popitem(last=False)
+        return mask
+
+    def draw_rectangles(self, image: np.ndarray, origin: np.ndarray, positions: np.ndarray, headings: np.ndarray,
+                        sizes: np.ndarray, colors: List[Union[int, np.ndarray]]) -> None:
+        """
+            Draw oriented rectangles with a dark outline, such as vehicles, in order.
+
+            The rectangles outside of the image are culled at once, and the others are drawn within their bounding box.
+
+        :param image: the image to draw on
+        :param origin: the world position of the image origin [m]
+        :param positions: the rectangles centers, of shape (N, 2) [m]
+        :param headings: the rectangles headings, of shape (N,) [rad]
+        :param sizes: the rectangles (length, width), of shape (N, 2) [m]
+        :param colors: the rectangles fill colors, in the image format
+        """
+        centers = (positions - origin) * self.scaling  # [px]
+        radii = np.hypot(sizes[:, 0], sizes[:, 1])[:, np.newaxis] / 2 * self.scaling
+        low = np.clip(np.floor(centers - radii), 0, [self.width, self.height]).astype(int)
+        high = np.clip(np.floor(centers + radii) + 1, 0, [self.width, self.height]).astype(int)
+        visible = np.flatnonzero(np.all(low < high, axis=1))
+        black = self.color(VehicleGraphics.BLACK)
+        border = 1 / self.scaling
+        for k in visible:
+            (col0, row0), (col1, row1) = low[k], high[k]
+            dx = (np.arange(col0, col1) + 0.5 - centers[k, 0]) / self.scaling
+            dy = (np.arange(row0, row1)[:, np.newaxis] + 0.5 - centers[k, 1]) / self.scaling
+            c, s = np.cos(headings[k]), np.sin(headings[k])
+            longitudinal, lateral = np.abs(c * dx + s * dy), np.abs(-s * dx + c * dy)
+            half_length, half_width = sizes[k] / 2
+            inside = (longitudinal <= half_length) & (lateral <= half_width)
+            outline = inside & ((longitudinal > half_length - border) | (lateral > half_width - border))
+            window = image[row0:row1, col0:col1]
+            window[inside] = colors[k]
+            window[outline] = black
@@ -0,0 +1,187 @@
+import copy
+import pickle
+from typing import List, Optional, Tuple
+
+import gym
+
+from highway_env.envs.common.abstract import AbstractEnv, Action, Observation
+from highway_env.envs.common.scene_cache import config_hash, random_state_hash
+
+
+class EpisodeTrace(object):
+    """
+        A compact record of an episode, sufficient to re-simulate it exactly.
+
+        It contains the environment id and configuration, the seed and random generator state at reset, and the
+        sequence of ego-vehicle actions. The hash of the random generator state after each step is kept to detect
+        divergences during replay, and snapshots of the environment may be stored periodically as checkpoints.
+    """
+
+    def __init__(self, env_id: str, config: dict, seed: Optional[int], random_state: tuple,
+                 checkpoint_period: int = 0) -> None:
+        """
+        :param env_id: the id of the environment
+        :param config: the environment configuration
+        :param seed: the seed of the environment
+        :param random_state: the state of the environment random generator before reset
+        :param checkpoint_period: number of steps between checkpoints, or 0 to disable checkpoints
+        """
+        self.env_id = env_id
+        self.config = copy.deepcopy(config)
+        self.config_hash = config_hash(config)
+        self.seed = seed
+        self.random_state = random_state
+        self.checkpoint_period = checkpoint_period
+        self.actions = []
+        self.random_hashes = []
+        self.checkpoints = {}
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    def save(self, path: str, checkpoints: bool = True) -> None:
+        """
+            Save the trace to a file.
+
+        :param path: the file path
+        :param checkpoints: whether to include the checkpoints
+        """
+        trace = copy.copy(self)
+        if not checkpoints:
+            trace.checkpoints = {}
+        with open(path, "wb") as f:
+            pickle.dump(trace, f)
+
+    @staticmethod
+    def load(path: str) -> "EpisodeTrace":
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+class TraceRecorder(gym.Wrapper):
+    """
+        An environment wrapper recording a trace of each episode.
+    """
+
+    def __init__(self, env: gym.Env, checkpoint_period: int = 0) -> None:
+        """
+        :param env: the environment to record
+        :param checkpoint_period: number of steps between checkpoints, or 0 to disable checkpoints
+        """
+        super().__init__(env)
+        self.checkpoint_period = checkpoint_period
+        self.last_seed = None
+        self.trace = None
+        self.traces = []
+
+    def seed(self, seed: int = None) -> List[int]:
+        seeds = self.env.seed(seed)
+        self.last_seed = seeds[0] if seeds else seed
+        return seeds
+
+    def reset(self, **kwargs) -> Observation:
+        env = self.env.unwrapped
+        self.trace = EpisodeTrace(env.spec.id if env.spec else None, env.config, self.last_seed,
+                                  env.np_random.get_state(), self.checkpoint_period)
+        self.traces.append(self.trace)
+        obs = self.env.reset(**kwargs)
+        self.checkpoint()
+        return obs
+
+    def step(self, action: Action) -> Tuple[Observation, float, bool, dict]:
+        result = self.env.step(action)
+        self.trace.actions.append(action)
+        self.trace.random_hashes.append(random_state_hash(self.env.unwrapped.np_random))
+        self.checkpoint()
+        return result
+
+    def checkpoint(self) -> None:
+        step = len(self.trace)
+        if self.checkpoint_period and step % self.checkpoint_period == 0:
+            self.trace.checkpoints[step] = copy.deepcopy(self.env.unwrapped)
+
+
+class EpisodeReplay(object):
+    """
+        Re-simulate a recorded episode up to any step.
+
+        The simulation resumes from the closest checkpoint before the requested step, or from the reset state if there
+        is none, and only the remaining actions are replayed. Observations, which are not needed to reproduce the
+        dynamics, are skipped. If an observation draws from the environment random generator, which is detected by
+        comparing random states with the trace, or if the environment reads its observation to compute its rewards or
+        terminal states, which fails while observations are skipped, the episode is replayed again with observations.
+    """
+
+    def __init__(self, trace: EpisodeTrace, env: AbstractEnv = None) -> None:
+        """
+        :param trace: the episode trace
+        :param env: an environment to reset for the replay, created from the trace environment id if None
+        """
+        self.trace = trace
+        self.env = env
+        self.skip_observations = True
+
+    def initial_env(self) -> AbstractEnv:
+        """
+            Reset an environment to the initial state of the episode.
+
+        :return: the environment, right after reset
+        """
+        env = (self.env or gym.make(self.trace.env_id)).unwrapped
+        env.configure(self.trace.config)
+        if config_hash(env.config) != self.trace.config_hash:
+            raise ValueError("The environment configuration does not match the trace configuration.")
+        env.seed(self.trace.seed)
+        env.np_random.set_state(self.trace.random_state)
+        env.reset()
+        return env
+
+    def env_at(self, step: int) -> AbstractEnv:
+        """
+            Get the environment state after a number of steps of the episode.
+
+        :param step: the number of actions performed, between 0 and the length of the trace
+        :return: an environment in the state reached after these actions
+        """
+        if not 0 <= step <= len(self.trace):
+            raise ValueError("Step {} is out of the trace range [0, {}]".format(step, len(self.trace)))
+        checkpoints = [k for k in self.trace.checkpoints if k <= step]
+        start = max(checkpoints, default=None)
+        env = copy.deepcopy(self.trace.checkpoints[start]) if start is not None else self.initial_env()
+        start = start or 0
+        for k in range(start, step):
+            try:
+                self.replay_step(env, self.trace.actions[k])
+            except Exception:
+                if not self.skip_observations:
+                    raise
+                self.skip_observations = False
+                return self.env_at(step)
+            if random_state_hash(env.np_random) != self.trace.random_hashes[k]:
+                if self.skip_observations:
+                    self.skip_observations = False
+                    return self.env_at(step)
+                raise RuntimeError("The replay diverged from the trace at step {}.".format(k + 1))
+        return env
+
+    def replay_step(self, env: AbstractEnv, action: Action) -> None:
+        """
+            Step an environment, without computing its observation if possible.
+
+        :param env: the environment
+        :param action: the action to perform
+        """
+        if not self.skip_observations:
+            env.step(action)
+            return
+        observation = env.observation
+        env.observation = _SkippedObservation()
+        try:
+            env.step(action)
+        finally:
+            env.observation = observation
+
+
+class _SkippedObservation(object):
+    def observe(self) -> None:
+        return None
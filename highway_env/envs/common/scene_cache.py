@@ -0,0 +1,114 @@
+import copy
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+import numpy as np
+
+from highway_env import counters
+from highway_env.road.road import Road, RoadNetwork
+
+
+def config_hash(config: dict) -> str:
+    """
+        Compute a stable hash of an environment configuration.
+
+    :param config: a configuration dict
+    :return: the hexadecimal digest of the configuration
+    """
+    return hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def random_state_hash(np_random: np.random.RandomState) -> str:
+    """
+        Compute a hash of the internal state of a random generator.
+
+        Two generators with the same hash produce the same sequence of draws. This is a finer key than the seed,
+        which only determines the state at the first reset.
+
+    :param np_random: a random generator
+    :return: the hexadecimal digest of its state
+    """
+    _, keys, position, has_gauss, cached_gaussian = np_random.get_state()
+    digest = hashlib.sha1(keys.tobytes())
+    digest.update(np.array([position, has_gauss, cached_gaussian]).tobytes())
+    return digest.hexdigest()
+
+
+class SceneCache(object):
+    """
+        A cache of scene elements that can be reused across environment resets.
+
+        - Road networks are immutable, and are shared between all resets with the same configuration.
+        - Pre-warmed traffic is stored as a snapshot of the road together with the random generator state obtained
+          after populating it, so that restoring it is indistinguishable from generating it again.
+    """
+    MAX_NETWORKS: int = 32
+    MAX_TRAFFIC: int = 256
+
+    def __init__(self) -> None:
+        self.networks = OrderedDict()
+        self.traffic = OrderedDict()
+
+    def get_network(self, key: Hashable, make_network: Callable[[], RoadNetwork]) -> RoadNetwork:
+        """
+            Get the road network corresponding to a key, and create it if it is not cached yet.
+
+        :param key: the cache key, e.g. environment class and configuration hash
+        :param make_network: a function creating the road network
+        :return: the road network
+        """
+        if key in self.networks:
+            if counters.enabled:
+                counters.increment("scene_cache.networks.hits")
+            self.networks.move_to_end(key)
+            return self.networks[key]
+        if counters.enabled:
+            counters.increment("scene_cache.networks.misses")
+        network = make_network()
+        self._store(self.networks, key, network, self.MAX_NETWORKS)
+        return network
+
+    def get_traffic(self, key: Hashable, road: Road) -> Optional[Tuple[Road, tuple]]:
+        """
+            Restore a pre-warmed traffic snapshot on a new road.
+
+        :param key: the cache key, e.g. environment class, configuration hash and random state hash
+        :param road: the current road, whose network and random generator are reused by the restored road
+        :return: the restored road and the random generator state to resume from, or None if not cached
+        """
+        if key not in self.traffic:
+            if counters.enabled:
+                counters.increment("scene_cache.traffic.misses")
+            return None
+        if counters.enabled:
+            counters.increment("scene_cache.traffic.hits")
+        self.traffic.move_to_end(key)
+        snapshot, random_state = self.traffic[key]
+        memo = {id(snapshot.network): road.network, id(snapshot.np_random): road.np_random}
+        return copy.deepcopy(snapshot, memo), random_state
+
+    def store_traffic(self, key: Hashable, road: Road, random_state: tuple) -> None:
+        """
+            Store a snapshot of a populated road.
+
+        :param key: the cache key
+        :param road: the populated road
+        :param random_state: the state of the random generator after populating the road
+        """
+        snapshot = copy.deepcopy(road, {id(road.network): road.network})
+        self._store(self.traffic, key, (snapshot, random_state), self.MAX_TRAFFIC)
+
+    def clear(self) -> None:
+        self.networks.clear()
+        self.traffic.clear()
+
+    @staticmethod
+    def _store(cache: OrderedDict, key: Hashable, value: object, max_size: int) -> None:
+        cache[key] = value
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+
+
+scene_cache = SceneCache()
@@ -0,0 +1,107 @@
+import os
+import queue
+import threading
+from typing import Callable, Tuple
+
+import gym
+import numpy as np
+from gym.wrappers.monitoring.video_recorder import ImageEncoder
+
+from highway_env.envs.common.abstract import Observation
+from highway_env.envs.common.rasterizer import Rasterizer, SceneSnapshot
+
+
+class AsyncVideoRecorder(gym.Wrapper):
+    """
+        An environment wrapper recording a video of each episode, without blocking the simulation on rendering.
+
+        At every simulation frame, the draw state of the scene is captured as a SceneSnapshot in the simulation thread
+        and pushed to a bounded queue. A background worker rasterizes the snapshots with a headless Rasterizer, and
+        passes the RGB frames to a video writer. The simulation only waits for the worker when the queue is full.
+    """
+    QUEUE_SIZE: int = 64
+    """ Maximum number of snapshots waiting to be rendered """
+
+    def __init__(self, env: gym.Env, directory: str, queue_size: int = None,
+                 make_writer: Callable[[str, Tuple[int, ...], int], object] = None) -> None:
+        """
+        :param env: the environment to record
+        :param directory: the directory where the videos are written
+        :param queue_size: maximum number of snapshots waiting to be rendered
+        :param make_writer: a function (path, frame_shape, fps) creating a video writer with capture_frame(frame) and
+                            close() methods, by default an ffmpeg encoder
+        """
+        super().__init__(env)
+        self.directory = directory
+        self.make_writer = make_writer or self.default_writer
+        self.rasterizer = Rasterizer.from_env(self.env.unwrapped)
+        self.fps = self.env.unwrapped.config["simulation_frequency"]
+        self.episode = 0
+        self.error = None
+        self.queue = queue.Queue(maxsize=queue_size or self.QUEUE_SIZE)
+        self.worker = threading.Thread(target=self.work, daemon=True)
+        self.worker.start()
+        self.env.unwrapped.frame_callback = self.capture
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def default_writer(path: str, frame_shape: Tuple[int, ...], fps: int) -> ImageEncoder:
+        return ImageEncoder(path, frame_shape, fps, fps)
+
+    def reset(self, **kwargs) -> Observation:
+        obs = self.env.reset(**kwargs)
+        self.queue.put(os.path.join(self.directory, "episode_{:05d}.mp4".format(self.episode)))
+        self.episode += 1
+        self.capture()
+        return obs
+
+    def capture(self) -> None:
+        """
+            Snapshot the current scene, and queue it for rendering.
+        """
+        if self.error:
+            raise self.error
+        env = self.env.unwrapped
+        position = env.vehicle.position if env.vehicle else np.array([0, 0])
+        self.queue.put(self.rasterizer.snapshot(env.road, self.rasterizer.origin(position)))
+
+    def work(self) -> None:
+        """
+            Render the queued snapshots and write them to the video of their episode, until the recorder is closed.
+
+            The queue items are either an episode video path, a scene snapshot, or None to stop. After an error, the
+            remaining items are discarded so that the simulation thread is never blocked.
+        """
+        writer, path = None, None
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if self.error:
+                continue
+            try:
+                if isinstance(item, SceneSnapshot):
+                    frame = self.rasterizer.render_snapshot(item, np.empty(self.rasterizer.shape, dtype=np.uint8))
+                    if writer is None:
+                        writer = self.make_writer(path, frame.shape, self.fps)
+                    writer.capture_frame(frame)
+                else:
+                    if writer:
+                        writer.close()
+                    writer, path = None, item
+            except Exception as e:
+                self.error = e
+        if writer and not self.error:
+            writer.close()
+
+    def close(self) -> None:
+        """
+            Wait for the queued frames to be written, and close the videos and the environment.
+        """
+        if self.worker.is_alive():
+            self.queue.put(None)
+            self.worker.join()
+        self.env.unwrapped.frame_callback = None
+        super().close()
+        if self.error:
+            raise self.error
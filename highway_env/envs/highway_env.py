@@ -63,8 +63,9 @@ class HighwayEnv(AbstractEnv):
         self.road.vehicles.append(self.vehicle)
 
         vehicles_type = utils.class_from_path(self.config["other_vehicles_type"])
-        for _ in range(self.config["vehicles_count"]):
-            self.road.vehicles.append(vehicles_type.create_random(self.road, spacing=self.config["spacing"]))
+        self.road.vehicles.extend(vehicles_type.create_random_vehicles(self.road,
+                                                                       self.config["vehicles_count"],
+                                                                       spacing=self.config["spacing"]))
 
     def _reward(self, action):
         """
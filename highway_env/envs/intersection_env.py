@@ -84,6 +84,11 @@ class IntersectionEnv(AbstractEnv):
         return results
 
     def _make_road(self) -> None:
+        net = self._cached_network(self._make_network)
+        self.road = RegulatedRoad(network=net, np_random=self.np_random,
+                                  record_history=self.config["show_trajectories"])
+
+    def _make_network(self) -> RoadNetwork:
         """
         Make an 4-way intersection.
 
@@ -96,7 +101,7 @@ class IntersectionEnv(AbstractEnv):
         The code for nodes in the road network is:
         (o:outer | i:inner + [r:right, l:left]) + (0:south | 1:west | 2:north | 3:east)
 
-        :return: the intersection road
+        :return: the intersection road network
         """
         lane_width = AbstractLane.DEFAULT_WIDTH
         right_turn_radius = lane_width + 5  # [m}
@@ -136,9 +141,7 @@ class IntersectionEnv(AbstractEnv):
             end = rotation @ np.flip([lane_width / 2, outer_distance], axis=0)
             net.add_lane("il" + str((corner - 1) % 4), "o" + str((corner - 1) % 4),
                          StraightLane(end, start, line_types=[n, c], priority=priority, speed_limit=10))
-
-        road = RegulatedRoad(network=net, np_random=self.np_random, record_history=self.config["show_trajectories"])
-        self.road = road
+        return net
 
     def _make_vehicles(self, n_vehicles: int = 10) -> None:
         """
@@ -153,11 +156,13 @@ class IntersectionEnv(AbstractEnv):
         vehicle_type.COMFORT_ACC_MIN = -3
 
         # Random vehicles
-        simulation_steps = 3
-        for t in range(n_vehicles - 1):
-            self._spawn_vehicle(np.linspace(0, 80, n_vehicles)[t])
-        for _ in range(simulation_steps):
-            [(self.road.act(), self.road.step(1 / self.config["simulation_frequency"])) for _ in range(self.config["simulation_frequency"])]
+        def spawn_and_warm_up():
+            simulation_steps = 3
+            for t in range(n_vehicles - 1):
+                self._spawn_vehicle(np.linspace(0, 80, n_vehicles)[t])
+            for _ in range(simulation_steps):
+                [(self.road.act(), self.road.step(1 / self.config["simulation_frequency"])) for _ in range(self.config["simulation_frequency"])]
+        self._cached_traffic(spawn_and_warm_up)
 
         # Challenger vehicle
         self._spawn_vehicle(60, spawn_probability=1, go_straight=True, position_deviation=0.1, speed_deviation=0)
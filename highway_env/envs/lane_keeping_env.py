@@ -51,6 +51,8 @@ class LaneKeepingEnv(AbstractEnv):
         self.action_space = spaces.Box(-self.config["steering_range"], self.config["steering_range"], shape=(1,), dtype=np.float32)
 
     def step(self, action: np.ndarray) -> Tuple[np.ndarray, float, bool, dict]:
+        if self.profiler:
+            self.profiler.start_step()
         if self.lanes and not self.lane.on_lane(self.vehicle.position):
             self.lane = self.lanes.pop(0)
         self.store_data()
@@ -63,12 +65,13 @@ class LaneKeepingEnv(AbstractEnv):
             "acceleration": 0,
             "steering": action[0]
         })
-        obs = self.observation.observe()
-        self._simulate()
+        obs = self._profiled(self.observe_phase, self.observation.observe)
+        self._profiled("simulate", self._simulate)
 
         info = {}
-        reward = self._reward(action)
-        terminal = self._is_terminal()
+        reward = self._profiled("reward", self._reward, action)
+        terminal = self._profiled("terminal", self._is_terminal)
+        self._add_profile_info(info)
         return obs, reward, terminal, info
 
     def _reward(self, action: np.ndarray) -> float:
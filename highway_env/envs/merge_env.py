@@ -65,9 +65,19 @@ class MergeEnv(AbstractEnv):
 
     def _make_road(self) -> None:
         """
-        Make a road composed of a straight highway and a merging lane.
+        Make a road composed of a straight highway and a merging lane, blocked by an obstacle at its end.
+        """
+        net = self._cached_network(self._make_network)
+        road = Road(network=net, np_random=self.np_random, record_history=self.config["show_trajectories"])
+        lbc = net.get_lane(("b", "c", 2))
+        road.objects.append(Obstacle(road, lbc.position(lbc.length, 0)))
+        self.road = road
 
-        :return: the road
+    def _make_network(self) -> RoadNetwork:
+        """
+        Make a road network composed of a straight highway and a merging lane.
+
+        :return: the road network
         """
         net = RoadNetwork()
 
@@ -92,9 +102,7 @@ class MergeEnv(AbstractEnv):
         net.add_lane("j", "k", ljk)
         net.add_lane("k", "b", lkb)
         net.add_lane("b", "c", lbc)
-        road = Road(network=net, np_random=self.np_random, record_history=self.config["show_trajectories"])
-        road.objects.append(Obstacle(road, lbc.position(ends[2], 0)))
-        self.road = road
+        return net
 
     def _make_vehicles(self) -> None:
         """
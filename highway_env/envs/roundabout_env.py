@@ -52,6 +52,10 @@ class RoundaboutEnv(AbstractEnv):
         return super().step(action)
 
     def _make_road(self) -> None:
+        net = self._cached_network(self._make_network)
+        self.road = Road(network=net, np_random=self.np_random, record_history=self.config["show_trajectories"])
+
+    def _make_network(self) -> RoadNetwork:
         # Circle lanes: (s)outh/(e)ast/(n)orth/(w)est (e)ntry/e(x)it.
         center = [0, 0]  # [m]
         radius = 30  # [m]
@@ -109,9 +113,7 @@ class RoundaboutEnv(AbstractEnv):
         net.add_lane("nes", "ne", SineLane([-2 - a, -dev / 2], [-2 - a, -dev / 2 + delta_st], a, w, -np.pi / 2, line_types=(c, c)))
         net.add_lane("nx", "nxs", SineLane([2 + a, dev / 2 - delta_en], [2 + a, -dev / 2], a, w, -np.pi / 2 + w * delta_en, line_types=(c, c)))
         net.add_lane("nxs", "nxr", StraightLane([2, -dev / 2], [2, -access], line_types=(n, c)))
-
-        road = Road(network=net, np_random=self.np_random, record_history=self.config["show_trajectories"])
-        self.road = road
+        return net
 
     def _make_vehicles(self) -> None:
         """
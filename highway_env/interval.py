@@ -1,9 +1,12 @@
+import copy
 import itertools
+from collections import OrderedDict
 from typing import Tuple, Union, List, Callable
 
 import numpy as np
 from numpy.linalg import LinAlgError
 
+from highway_env import counters
 from highway_env.road.lane import AbstractLane
 from highway_env.types import Vector, Matrix, Interval
 
@@ -22,6 +25,20 @@ def intervals_product(a: Interval, b: Interval) -> np.ndarray:
          np.dot(p(a[1]), p(b[1])) - np.dot(p(a[0]), n(b[1])) - np.dot(n(a[1]), p(b[0])) + np.dot(n(a[0]), n(b[0]))])
 
 
+def intervals_product_batch(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+        Compute the elementwise products of two batches of intervals
+    :param a: intervals of shape (N, 2, ...), where the second axis holds [a_min, a_max]
+    :param b: intervals of shape (N, 2, ...), where the second axis holds [b_min, b_max]
+    :return: the intervals of their elementwise products ab, of shape (N, 2, ...)
+    """
+    p = lambda x: np.maximum(x, 0)
+    n = lambda x: np.maximum(-x, 0)
+    a_m, a_M, b_m, b_M = a[:, 0], a[:, 1], b[:, 0], b[:, 1]
+    return np.stack([p(a_m) * p(b_m) - p(a_M) * n(b_m) - n(a_m) * p(b_M) + n(a_M) * n(b_M),
+                     p(a_M) * p(b_M) - p(a_m) * n(b_M) - n(a_M) * p(b_m) + n(a_m) * n(b_m)], axis=1)
+
+
 def intervals_scaling(a: Interval, b: Interval) -> np.ndarray:
     """
         Scale an intervals
@@ -46,6 +63,16 @@ def intervals_diff(a: Interval, b: Interval) -> np.ndarray:
     return np.array([a[0] - b[1], a[1] - b[0]])
 
 
+def intervals_diff_batch(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+        Compute the differences of two batches of intervals
+    :param a: intervals of shape (N, 2, ...)
+    :param b: intervals of shape (N, 2, ...)
+    :return: the intervals of their differences a - b, of shape (N, 2, ...)
+    """
+    return np.stack([a[:, 0] - b[:, 1], a[:, 1] - b[:, 0]], axis=1)
+
+
 def interval_negative_part(a: Interval) -> np.ndarray:
     """
         Compute the negative part of an interval
@@ -72,6 +99,18 @@ def integrator_interval(x: Interval, k: Interval) -> np.ndarray:
     return interval_gain*x  # Note: no flip of x, contrary to using intervals_product(k,interval_minus(x))
 
 
+def integrator_interval_batch(x: np.ndarray, k: np.ndarray) -> np.ndarray:
+    """
+        Compute the intervals of a batch of integrator systems: dx = -k*x
+    :param x: state intervals, of shape (N, 2)
+    :param k: gain intervals, of shape (N, 2), must be positive
+    :return: intervals for dx, of shape (N, 2)
+    """
+    interval_gain = np.where((x[:, 0] >= 0)[:, np.newaxis], -np.flip(k, axis=1),
+                             np.where((x[:, 1] <= 0)[:, np.newaxis], -k, -k[:, [0, 0]]))
+    return interval_gain*x
+
+
 def vector_interval_section(v_i: Interval, direction: Vector) -> np.ndarray:
     corners = [[v_i[0, 0], v_i[0, 1]],
                [v_i[0, 0], v_i[1, 1]],
@@ -81,6 +120,48 @@ def vector_interval_section(v_i: Interval, direction: Vector) -> np.ndarray:
     return np.array([min(corners_dist), max(corners_dist)])
 
 
+def vector_interval_section_batch(v_i: np.ndarray, directions: np.ndarray) -> np.ndarray:
+    """
+        Compute the intervals of the projections of a batch of vector intervals onto directions
+    :param v_i: vector intervals, of shape (N, 2, 2)
+    :param directions: projection directions, of shape (N, 2)
+    :return: the intervals of the projections, of shape (N, 2)
+    """
+    corners_dist = interval_corners_batch(v_i) @ directions[:, :, np.newaxis]
+    return np.stack([corners_dist.min(axis=(1, 2)), corners_dist.max(axis=(1, 2))], axis=1)
+
+
+def interval_corners_batch(position_i: np.ndarray) -> np.ndarray:
+    """
+        Compute the corners of a batch of position intervals
+    :param position_i: the position intervals, of shape (N, 2, 2)
+    :return: the corners, of shape (N, 4, 2)
+    """
+    return np.stack([position_i[:, [0, 0, 1, 1], 0], position_i[:, [0, 1, 0, 1], 1]], axis=-1)
+
+
+def interval_cos_batch(angle_i: np.ndarray) -> np.ndarray:
+    """
+        Compute the intervals of the cosine of a batch of angle intervals
+    :param angle_i: angle intervals, of shape (N, 2)
+    :return: the intervals of their cosine, of shape (N, 2)
+    """
+    contains = lambda angle: np.floor((angle_i[:, 1] - angle) / (2 * np.pi)) \
+        >= np.ceil((angle_i[:, 0] - angle) / (2 * np.pi))
+    cos = np.cos(angle_i)
+    return np.stack([np.where(contains(np.pi), -1, cos.min(axis=1)),
+                     np.where(contains(0), 1, cos.max(axis=1))], axis=1)
+
+
+def interval_sin_batch(angle_i: np.ndarray) -> np.ndarray:
+    """
+        Compute the intervals of the sine of a batch of angle intervals
+    :param angle_i: angle intervals, of shape (N, 2)
+    :return: the intervals of their sine, of shape (N, 2)
+    """
+    return interval_cos_batch(angle_i - np.pi / 2)
+
+
 def interval_absolute_to_local(position_i: Interval, lane: AbstractLane) -> Tuple[np.ndarray, np.ndarray]:
     """
         Converts an interval in absolute x,y coordinates to an interval in local (longiturinal, lateral) coordinates
@@ -98,6 +179,27 @@ def interval_absolute_to_local(position_i: Interval, lane: AbstractLane) -> Tupl
     return longitudinal_i, lateral_i
 
 
+def interval_absolute_to_local_batch(position_i: np.ndarray, lanes: List[AbstractLane]) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+        Converts a batch of intervals in absolute x,y coordinates to intervals in local lane coordinates
+    :param position_i: the position intervals, of shape (N, 2, 2)
+    :param lanes: the N lanes giving the local frames
+    :return: the corresponding local intervals, of shapes (N, 2)
+    """
+    corners = interval_corners_batch(position_i)
+    corners_local = np.empty(corners.shape)
+    groups = {}
+    for k, lane in enumerate(lanes):
+        groups.setdefault(lane, []).append(k)
+    for lane, indexes in groups.items():
+        longitudinal, lateral = lane.local_coordinates_batch(corners[indexes].reshape((-1, 2)))
+        corners_local[indexes] = np.stack([longitudinal, lateral], axis=-1).reshape((len(indexes), 4, 2))
+    longitudinal_i = np.stack([corners_local[:, :, 0].min(axis=1), corners_local[:, :, 0].max(axis=1)], axis=1)
+    lateral_i = np.stack([corners_local[:, :, 1].min(axis=1), corners_local[:, :, 1].max(axis=1)], axis=1)
+    return longitudinal_i, lateral_i
+
+
 def interval_local_to_absolute(longitudinal_i: Interval, lateral_i: Interval, lane: AbstractLane) -> Interval:
     """
         Converts an interval in local (longiturinal, lateral) coordinates to an interval in absolute x,y coordinates
@@ -115,6 +217,27 @@ def interval_local_to_absolute(longitudinal_i: Interval, lateral_i: Interval, la
     return position_i
 
 
+AFFINE_POLYTOPES_CACHE_SIZE = 1024
+_affine_polytopes = OrderedDict()
+_box_vertices = {}
+
+
+def box_vertices(dimension: int) -> np.ndarray:
+    """
+        Enumerate the vertices of the unit box [0, 1]^dimension.
+
+        The table only depends on the dimension, and is computed once.
+
+    :param dimension: the box dimension
+    :return: the vertices, of shape (2^dimension, dimension), in lexicographic order
+    """
+    if dimension not in _box_vertices:
+        vertices = np.array(list(itertools.product([0, 1], repeat=dimension)), dtype=int)
+        vertices.setflags(write=False)
+        _box_vertices[dimension] = vertices
+    return _box_vertices[dimension]
+
+
 def polytope(parametrized_f: Callable[[np.ndarray], np.ndarray], params_intervals: np.ndarray) \
         -> Tuple[np.ndarray, List[np.ndarray]]:
     """
@@ -125,13 +248,59 @@ def polytope(parametrized_f: Callable[[np.ndarray], np.ndarray], params_interval
     """
     params_means = params_intervals.mean(axis=0)
     a0 = parametrized_f(params_means)
-    vertices_id = itertools.product([0, 1], repeat=params_intervals.shape[1])
-    d_a = []
-    for vertex_id in vertices_id:
-        params_vertex = params_intervals[vertex_id, np.arange(len(vertex_id))]
-        d_a.append(parametrized_f(params_vertex) - parametrized_f(params_means))
-    d_a = list({d_a_i.tostring(): d_a_i for d_a_i in d_a}.values())
-    return a0, d_a
+    vertices_id = box_vertices(params_intervals.shape[1])
+    params_vertices = params_intervals[vertices_id, np.arange(vertices_id.shape[1])]
+    d_a = [parametrized_f(params_vertex) - a0 for params_vertex in params_vertices]
+    return a0, unique_matrices(d_a)
+
+
+def affine_polytope(a: np.ndarray, phi: np.ndarray, params_intervals: np.ndarray) \
+        -> Tuple[np.ndarray, List[np.ndarray]]:
+    """
+        Polytope of an affine parametrized matrix A(theta) = a + sum_k theta_k phi_k, over a box of parameters.
+
+        All vertices are evaluated at once as a tensor contraction, and the results are memoized per structure and
+        parameter box. The returned matrices are read-only, and the returned list is a copy of the memoized one.
+
+    :param a: the constant term, of shape (n, n)
+    :param phi: the parametrized terms, of shape (k, n, n)
+    :param params_intervals: axes: [min, max], params
+    :return: a0, d_a polytope that represents the matrix interval
+    """
+    a, phi = np.asarray(a, dtype=float), np.asarray(phi, dtype=float)
+    params_intervals = np.asarray(params_intervals, dtype=float)
+    key = (a.shape, phi.shape, a.tobytes(), phi.tobytes(), params_intervals.tobytes())
+    if key in _affine_polytopes:
+        if counters.enabled:
+            counters.increment("affine_polytopes.hits")
+        _affine_polytopes.move_to_end(key)
+        a0, d_a = _affine_polytopes[key]
+        return a0, list(d_a)
+    if counters.enabled:
+        counters.increment("affine_polytopes.misses")
+
+    params_means = params_intervals.mean(axis=0)
+    a0 = a + np.tensordot(params_means, phi, axes=[0, 0])
+    vertices_id = box_vertices(params_intervals.shape[1])
+    params_vertices = params_intervals[vertices_id, np.arange(vertices_id.shape[1])]
+    d_a = a + np.tensordot(params_vertices, phi, axes=[1, 0]) - a0
+    result = a0, unique_matrices(d_a)
+    for matrix in [result[0]] + result[1]:
+        matrix.setflags(write=False)
+    _affine_polytopes[key] = result
+    while len(_affine_polytopes) > AFFINE_POLYTOPES_CACHE_SIZE:
+        _affine_polytopes.popitem(last=False)
+    return result[0], list(result[1])
+
+
+def unique_matrices(matrices: Union[np.ndarray, List[np.ndarray]]) -> List[np.ndarray]:
+    """
+        Remove duplicate matrices, keeping the first occurrences in order.
+
+    :param matrices: a list of matrices
+    :return: the list of distinct matrices
+    """
+    return list({matrix.tobytes(): matrix for matrix in matrices}.values())
 
 
 def is_metzler(matrix: np.ndarray, eps: float = 1e-9) -> bool:
@@ -139,6 +308,12 @@ def is_metzler(matrix: np.ndarray, eps: float = 1e-9) -> bool:
 
 
 class LPV(object):
+    COORDINATES_CACHE_SIZE: int = 128
+    """ Maximum number of dynamics structures whose coordinates transformation is cached """
+
+    coordinates_cache: OrderedDict = OrderedDict()
+    """ A cache of coordinates transformations and transformed dynamics, keyed by the (a0, da) structure """
+
     def __init__(self,
                  x0: Vector,
                  a0: Matrix,
@@ -166,7 +341,7 @@ class LPV(object):
         """
         self.x0 = np.array(x0, dtype=float)
         self.a0 = np.array(a0, dtype=float)
-        self.da = [np.array(da_i) for da_i in da]
+        self.da = [np.array(da_i, dtype=float) for da_i in da]
         self.b = np.array(b) if b is not None else np.zeros((*self.x0.shape, 1))
         self.d = np.array(d) if d is not None else np.zeros((*self.x0.shape, 1))
         self.omega_i = np.array(omega_i) if omega_i is not None else np.zeros((2, 1))
@@ -182,6 +357,9 @@ class LPV(object):
         self.x_t = self.x0
         self.x_i = np.array(x_i) if x_i is not None else np.array([self.x0, self.x0])
         self.x_i_t = None
+        self.metzler = False
+        self.da_p, self.da_n = None, None
+        self.discrete = None
 
         self.update_coordinates_frame(self.a0)
 
@@ -190,7 +368,35 @@ class LPV(object):
             Ensure that the dynamics matrix A0 is Metzler.
 
             If not, design a coordinate transformation and apply it to the model and state interval.
+            The transformation and transformed dynamics only depend on the (a0, da) structure, and are cached.
+        :param a0: the dynamics matrix A0
+        """
+        key = (a0.shape, a0.tobytes(), tuple(da_i.tobytes() for da_i in self.da))
+        if key in LPV.coordinates_cache:
+            if counters.enabled:
+                counters.increment("lpv_coordinates.hits")
+            LPV.coordinates_cache.move_to_end(key)
+        else:
+            if counters.enabled:
+                counters.increment("lpv_coordinates.misses")
+            LPV.coordinates_cache[key] = self.design_coordinates_frame(a0)
+            while len(LPV.coordinates_cache) > LPV.COORDINATES_CACHE_SIZE:
+                LPV.coordinates_cache.popitem(last=False)
+        self.coordinates, self.a0, self.da, self.da_p, self.da_n, self.metzler = \
+            copy.deepcopy(LPV.coordinates_cache[key])
+        self.discrete = None
+
+        # Forward coordinates change of states and models
+        self.b = self.change_coordinates(self.b, offset=False)
+        self.x_i_t = np.array(self.change_coordinates([x for x in self.x_i]))
+
+    def design_coordinates_frame(self, a0: np.ndarray) -> Tuple:
+        """
+            Design a coordinate transformation such that A0 is Metzler, and transform the dynamics.
+
         :param a0: the dynamics matrix A0
+        :return: the coordinates transformation, the transformed a0 and da, the sums of positive and negative parts of
+                 the transformed da, and whether the transformed a0 is Metzler
         """
         self.coordinates = None
         # Rotation
@@ -206,11 +412,11 @@ class LPV(object):
         else:
             self.coordinates = (np.eye(a0.shape[0]), np.eye(a0.shape[0]))
 
-        # Forward coordinates change of states and models
-        self.a0 = self.change_coordinates(self.a0, matrix=True)
-        self.da = self.change_coordinates(self.da, matrix=True)
-        self.b = self.change_coordinates(self.b, offset=False)
-        self.x_i_t = np.array(self.change_coordinates([x for x in self.x_i]))
+        a0 = self.change_coordinates(a0, matrix=True)
+        da = self.change_coordinates(self.da, matrix=True)
+        da_p = sum(np.maximum(da_i, 0) for da_i in da)
+        da_n = sum(np.maximum(-da_i, 0) for da_i in da)
+        return self.coordinates, a0, da, da_p, da_n, is_metzler(a0)
 
     def set_control(self, control: np.ndarray, state: np.ndarray = None) -> None:
         if state is not None:
@@ -261,12 +467,45 @@ class LPV(object):
                 return transformation_inv @ value
 
     def step(self, dt: float) -> None:
-        if is_metzler(self.a0):
-            self.x_i_t = self.step_interval_predictor(self.x_i_t, dt)
+        """
+            Step the interval predictor and the nominal state, with an explicit Euler discretization.
+
+            The discrete-time matrices only depend on the timestep, and are precomputed when it changes.
+        :param dt: timestep [s]
+        """
+        if self.discrete is None or self.discrete[0] != dt:
+            self.discretize(dt)
+        _, a_d, da_p_d, da_n_d, a_i_d, omega_m_d, omega_M_d = self.discrete
+        bu = self.b @ np.ravel(self.u) * dt
+        p = lambda x: np.maximum(x, 0)
+        n = lambda x: np.maximum(-x, 0)
+        x_m, x_M = self.x_i_t
+        if self.metzler:
+            self.x_i_t = np.array([a_d @ x_m - da_p_d @ n(x_m) - da_n_d @ p(x_M) + omega_m_d + bu,
+                                   a_d @ x_M + da_p_d @ p(x_M) + da_n_d @ n(x_m) + omega_M_d + bu])
+        else:
+            self.x_i_t = self.x_i_t + intervals_product(a_i_d, self.x_i_t) + np.array([omega_m_d, omega_M_d]) \
+                + np.array([bu, bu])
+        self.x_t = a_d @ self.x_t + bu
+
+    def discretize(self, dt: float) -> None:
+        """
+            Precompute the discrete-time update of the interval dynamics for a fixed timestep.
+
+        :param dt: timestep [s]
+        """
+        a0, da, d, omega_i = self.a0, self.da, self.d, self.omega_i
+        p = lambda x: np.maximum(x, 0)
+        n = lambda x: np.maximum(-x, 0)
+        if self.metzler:
+            omega_m = (p(d) @ omega_i[0, :, np.newaxis] - n(d) @ omega_i[1, :, np.newaxis]).squeeze(-1)
+            omega_M = (p(d) @ omega_i[1, :, np.newaxis] - n(d) @ omega_i[0, :, np.newaxis]).squeeze(-1)
+            a_i = None
         else:
-            self.x_i_t = self.step_naive_predictor(self.x_i_t, dt)
-        dx = self.a0 @ self.x_t + self.b @ self.u.squeeze(-1)
-        self.x_t = self.x_t + dx * dt
+            omega_m, omega_M = intervals_product([d, d], omega_i)
+            a_i = (a0 + sum(intervals_product([0, 1], [da_i, da_i]) for da_i in da)) * dt
+        self.discrete = (dt, np.eye(a0.shape[0]) + a0 * dt, self.da_p * dt, self.da_n * dt, a_i,
+                         omega_m * dt, omega_M * dt)
 
     def step_naive_predictor(self, x_i: Interval, dt: float) -> np.ndarray:
         """
@@ -290,11 +529,10 @@ class LPV(object):
         :param dt: time step
         :return: state interval at time t+dt
         """
-        a0, da, d, omega_i, b, u = self.a0, self.da, self.d, self.omega_i, self.b, self.u
+        a0, d, omega_i, b, u = self.a0, self.d, self.omega_i, self.b, self.u
         p = lambda x: np.maximum(x, 0)
         n = lambda x: np.maximum(-x, 0)
-        da_p = sum(p(da_i) for da_i in da)
-        da_n = sum(n(da_i) for da_i in da)
+        da_p, da_n = self.da_p, self.da_n
         x_m, x_M = x_i[0, :, np.newaxis], x_i[1, :, np.newaxis]
         o_m, o_M = omega_i[0, :, np.newaxis], omega_i[1, :, np.newaxis]
         dx_m = a0 @ x_m - da_p @ n(x_m) - da_n @ p(x_M) + p(d) @ o_m - n(d) @ o_M + b @ u
@@ -1,3 +1,10 @@
+from collections import OrderedDict
+from typing import Dict, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
 class Loggable(object):
     """
         Implements an object whose metrics can be logged through
@@ -18,6 +25,103 @@ class Loggable(object):
         raise Exception('Not implemented.')
 
 
+class ColumnarLogger(object):
+    """
+        A log of tabular data, stored by columns in preallocated chunks of numpy arrays.
+
+        Rows are appended in bulk, e.g. one row per vehicle at each step. Columns can be added at any time, and are
+        filled with a missing value (NaN, or -1 for integers) in the rows where they were not logged. The type of a
+        column, integer or float, is set by the values it is first logged with.
+    """
+    CHUNK_SIZE: int = 4096
+    """ Number of rows allocated at once """
+
+    def __init__(self, chunk_size: int = None) -> None:
+        """
+        :param chunk_size: number of rows allocated at once
+        """
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.columns = OrderedDict()
+        self.chunks = 0
+        self.size = 0
+
+    def append(self, data: Dict[str, Union[Sequence, np.ndarray]]) -> None:
+        """
+            Append rows to the log.
+
+        :param data: a dictionary {column name: values}, where all values have the same length
+        """
+        rows = len(next(iter(data.values()))) if data else 0
+        while self.chunks * self.chunk_size < self.size + rows:
+            for column in self.columns.values():
+                column.append(self._allocate(column[0].dtype))
+            self.chunks += 1
+        for name, values in data.items():
+            values = np.asarray(values)
+            if name not in self.columns:
+                dtype = np.int64 if np.issubdtype(values.dtype, np.integer) else np.float64
+                self.columns[name] = [self._allocate(dtype) for _ in range(max(self.chunks, 1))]
+            written = 0
+            while written < rows:
+                chunk, offset = divmod(self.size + written, self.chunk_size)
+                count = min(rows - written, self.chunk_size - offset)
+                self.columns[name][chunk][offset:offset + count] = values[written:written + count]
+                written += count
+        self.chunks = max(self.chunks, 1)
+        self.size += rows
+
+    def column(self, name: str) -> np.ndarray:
+        """
+            Get the logged values of a column.
+
+        :param name: the column name
+        :return: the array of values, with one entry per row
+        """
+        return np.concatenate(self.columns[name])[:self.size]
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        return OrderedDict((name, self.column(name)) for name in self.columns)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.to_dict())
+
+    def save(self, path: str) -> None:
+        """
+            Write the log to a file, in bulk.
+
+        :param path: the file path. Logs are saved in the Parquet format if the path has a .parquet extension, which
+                     requires a Parquet engine such as pyarrow, and in the numpy .npz format otherwise.
+        """
+        if str(path).endswith(".parquet"):
+            self.to_dataframe().to_parquet(path)
+        else:
+            np.savez(path, **self.to_dict())
+
+    @staticmethod
+    def load(path: str) -> pd.DataFrame:
+        """
+            Read a saved log.
+
+        :param path: the file path, with a .parquet or .npz extension
+        :return: the DataFrame of the log
+        """
+        if str(path).endswith(".parquet"):
+            return pd.read_parquet(path)
+        with np.load(path) as data:
+            return pd.DataFrame(OrderedDict((name, data[name]) for name in data.files))
+
+    def clear(self) -> None:
+        self.columns.clear()
+        self.chunks = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _allocate(self, dtype: np.dtype) -> np.ndarray:
+        return np.full(self.chunk_size, -1 if np.issubdtype(dtype, np.integer) else np.nan, dtype=dtype)
+
+
 def test():
     from highway_env.vehicle.kinematics import Vehicle
     r = None
@@ -1,10 +1,12 @@
+from collections import OrderedDict
 from typing import List, Tuple, Union, TYPE_CHECKING
 
 import numpy as np
 import pygame
 
+from highway_env import counters
 from highway_env.road.lane import LineType, AbstractLane
-from highway_env.road.road import Road
+from highway_env.road.road import Road, RoadNetwork
 from highway_env.types import Vector
 from highway_env.vehicle.graphics import VehicleGraphics
 from highway_env.road.objects import Obstacle, Landmark
@@ -209,18 +211,96 @@ class LaneGraphics(object):
         pygame.draw.polygon(draw_surface, color, dots, 0)
 
 
+class RoadLayerCache(object):
+    """
+        A cache of the static road layer, rasterized into square tiles.
+
+        The lanes of a road network never change, so they are drawn once per tile and zoom level, and each frame only
+        blits the tiles intersecting the displayed window. Tiles are keyed by the network object and the scaling, so
+        that they are invalidated when zooming or changing the network, and the least recently used are discarded.
+    """
+    TILE_SIZE: int = 256
+    """ Size of a tile [px] """
+
+    MAX_TILES: int = 128
+    """ Maximum number of tiles kept in memory """
+
+    def __init__(self) -> None:
+        self.tiles = OrderedDict()
+
+    def display(self, network: RoadNetwork, surface: WorldSurface) -> None:
+        """
+            Blit the road layer of a network on the displayed window of a surface.
+
+            Only the tiles intersecting the clipping area of the surface are blitted.
+
+        :param network: the road network to be displayed
+        :param surface: the pygame surface
+        """
+        origin = np.asarray(surface.origin, dtype=float) * surface.scaling  # [px]
+        clip = surface.get_clip()
+        first = np.floor((origin + clip.topleft) / self.TILE_SIZE).astype(int)
+        last = np.floor((origin + clip.bottomright) / self.TILE_SIZE).astype(int)
+        surface.blits([(self.get_tile(network, surface.scaling, i, j),
+                        (int(np.floor(i * self.TILE_SIZE - origin[0])), int(np.floor(j * self.TILE_SIZE - origin[1]))))
+                       for i in range(first[0], last[0] + 1)
+                       for j in range(first[1], last[1] + 1)], doreturn=False)
+
+    def get_tile(self, network: RoadNetwork, scaling: float, i: int, j: int) -> pygame.Surface:
+        """
+            Get a tile of the road layer, and draw it if it is not cached yet.
+
+        :param network: the road network
+        :param scaling: the scaling of the tile [px/m]
+        :param i: the horizontal index of the tile
+        :param j: the vertical index of the tile
+        :return: the tile surface
+        """
+        key = (network, scaling, i, j)
+        if key in self.tiles:
+            if counters.enabled:
+                counters.increment("road_layer.tiles.hits")
+            self.tiles.move_to_end(key)
+            return self.tiles[key]
+        if counters.enabled:
+            counters.increment("road_layer.tiles.misses")
+        size = (self.TILE_SIZE, self.TILE_SIZE)
+        tile = WorldSurface(size, 0, pygame.Surface(size))
+        tile.scaling = scaling
+        tile.origin = np.array([i, j]) * self.TILE_SIZE / scaling
+        tile.fill(tile.GREY)
+        for _from in network.graph.keys():
+            for _to in network.graph[_from].keys():
+                for l in network.graph[_from][_to]:
+                    LaneGraphics.display(l, tile)
+        self.tiles[key] = tile
+        while len(self.tiles) > self.MAX_TILES:
+            self.tiles.popitem(last=False)
+        return tile
+
+    def clear(self) -> None:
+        self.tiles.clear()
+
+
 class RoadGraphics(object):
     """
         A visualization of a road lanes and vehicles.
     """
+    road_layer_cache: RoadLayerCache = RoadLayerCache()
+    """ The cache of rasterized road layers, shared by all surfaces """
+
     @staticmethod
-    def display(road: Road, surface: WorldSurface) -> None:
+    def display(road: Road, surface: WorldSurface, cached: bool = True) -> None:
         """
             Display the road lanes on a surface.
 
         :param road: the road to be displayed
         :param surface: the pygame surface
+        :param cached: whether to blit the lanes from the road layer cache, rather than drawing them
         """
+        if cached:
+            RoadGraphics.road_layer_cache.display(road.network, surface)
+            return
         surface.fill(surface.GREY)
         for _from in road.network.graph.keys():
             for _to in road.network.graph[_from].keys():
@@ -241,8 +321,7 @@ class RoadGraphics(object):
         if road.record_history:
             for v in road.vehicles:
                 VehicleGraphics.display_history(v, surface, simulation=simulation_frequency, offscreen=offscreen)
-        for v in road.vehicles:
-            VehicleGraphics.display(v, surface, offscreen=offscreen)
+        VehicleGraphics.display_batch(road.vehicles, surface, offscreen=offscreen)
 
     @staticmethod
     def display_road_objects(road: Road, surface: WorldSurface, offscreen: bool = False) -> None:
@@ -2,7 +2,7 @@ from abc import ABCMeta, abstractmethod
 from typing import Tuple, List
 import numpy as np
 
-from highway_env import utils
+from highway_env import counters, utils
 from highway_env.types import Vector
 
 
@@ -27,6 +27,17 @@ class AbstractLane(object):
         """
         raise NotImplementedError()
 
+    def position_batch(self, longitudinal: np.ndarray, lateral: np.ndarray) -> np.ndarray:
+        """
+            Convert several local lane coordinates to world positions.
+
+        :param longitudinal: an array of longitudinal lane coordinates, of shape (N,) [m]
+        :param lateral: an array of lateral lane coordinates, of shape (N,) [m]
+        :return: the array of corresponding world positions, of shape (N, 2) [m]
+        """
+        longitudinal, lateral = np.broadcast_arrays(longitudinal, lateral)
+        return np.array([self.position(s, r) for s, r in zip(longitudinal, lateral)]).reshape((-1, 2))
+
     @abstractmethod
     def local_coordinates(self, position: np.ndarray) -> Tuple[float, float]:
         """
@@ -37,6 +48,16 @@ class AbstractLane(object):
         """
         raise NotImplementedError()
 
+    def local_coordinates_batch(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+            Convert several world positions to local lane coordinates.
+
+        :param positions: an array of world positions, of shape (N, 2) [m]
+        :return: the arrays of (longitudinal, lateral) lane coordinates, of shape (N,) [m]
+        """
+        coordinates = np.array([self.local_coordinates(position) for position in positions]).reshape((-1, 2))
+        return coordinates[:, 0], coordinates[:, 1]
+
     @abstractmethod
     def heading_at(self, longitudinal: float) -> float:
         """
@@ -47,6 +68,15 @@ class AbstractLane(object):
         """
         raise NotImplementedError()
 
+    def heading_at_batch(self, longitudinal: np.ndarray) -> np.ndarray:
+        """
+            Get the lane headings at several longitudinal lane coordinates.
+
+        :param longitudinal: an array of longitudinal lane coordinates, of shape (N,) [m]
+        :return: the array of lane headings, of shape (N,) [rad]
+        """
+        return np.array([self.heading_at(s) for s in longitudinal], dtype=float)
+
     @abstractmethod
     def width_at(self, longitudinal: float) -> float:
         """
@@ -148,18 +178,33 @@ class StraightLane(AbstractLane):
     def position(self, longitudinal: float, lateral: float) -> np.ndarray:
         return self.start + longitudinal * self.direction + lateral * self.direction_lateral
 
+    def position_batch(self, longitudinal: np.ndarray, lateral: np.ndarray) -> np.ndarray:
+        return self.start + np.multiply.outer(longitudinal, self.direction) \
+            + np.multiply.outer(lateral, self.direction_lateral)
+
     def heading_at(self, longitudinal: float) -> float:
         return self.heading
 
+    def heading_at_batch(self, longitudinal: np.ndarray) -> np.ndarray:
+        return np.full(np.shape(longitudinal), self.heading, dtype=float)
+
     def width_at(self, longitudinal: float) -> float:
         return self.width
 
     def local_coordinates(self, position: np.ndarray) -> Tuple[float, float]:
+        if counters.enabled:
+            counters.increment("local_coordinates")
         delta = position - self.start
         longitudinal = np.dot(delta, self.direction)
         lateral = np.dot(delta, self.direction_lateral)
         return float(longitudinal), float(lateral)
 
+    def local_coordinates_batch(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if counters.enabled:
+            counters.increment("local_coordinates_batch")
+        delta = positions - self.start
+        return delta @ self.direction, delta @ self.direction_lateral
+
 
 class SineLane(StraightLane):
     """
@@ -195,14 +240,26 @@ class SineLane(StraightLane):
         return super().position(longitudinal,
                                 lateral + self.amplitude * np.sin(self.pulsation * longitudinal + self.phase))
 
+    def position_batch(self, longitudinal: np.ndarray, lateral: np.ndarray) -> np.ndarray:
+        return super().position_batch(longitudinal,
+                                      lateral + self.amplitude * np.sin(self.pulsation * longitudinal + self.phase))
+
     def heading_at(self, longitudinal: float) -> float:
         return super().heading_at(longitudinal) + np.arctan(
             self.amplitude * self.pulsation * np.cos(self.pulsation * longitudinal + self.phase))
 
+    def heading_at_batch(self, longitudinal: np.ndarray) -> np.ndarray:
+        return super().heading_at_batch(longitudinal) + np.arctan(
+            self.amplitude * self.pulsation * np.cos(self.pulsation * longitudinal + self.phase))
+
     def local_coordinates(self, position: np.ndarray) -> Tuple[float, float]:
         longitudinal, lateral = super().local_coordinates(position)
         return longitudinal, lateral - self.amplitude * np.sin(self.pulsation * longitudinal + self.phase)
 
+    def local_coordinates_batch(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        longitudinal, lateral = super().local_coordinates_batch(positions)
+        return longitudinal, lateral - self.amplitude * np.sin(self.pulsation * longitudinal + self.phase)
+
 
 class CircularLane(AbstractLane):
     """
@@ -236,15 +293,25 @@ class CircularLane(AbstractLane):
         phi = self.direction * longitudinal / self.radius + self.start_phase
         return self.center + (self.radius - lateral * self.direction)*np.array([np.cos(phi), np.sin(phi)])
 
+    def position_batch(self, longitudinal: np.ndarray, lateral: np.ndarray) -> np.ndarray:
+        phi = self.direction * np.asarray(longitudinal) / self.radius + self.start_phase
+        radius = self.radius - np.asarray(lateral) * self.direction
+        return self.center + np.stack([radius * np.cos(phi), radius * np.sin(phi)], axis=-1)
+
     def heading_at(self, longitudinal: float) -> float:
         phi = self.direction * longitudinal / self.radius + self.start_phase
         psi = phi + np.pi/2 * self.direction
         return psi
 
+    def heading_at_batch(self, longitudinal: np.ndarray) -> np.ndarray:
+        return self.heading_at(np.asarray(longitudinal, dtype=float))
+
     def width_at(self, longitudinal: float) -> float:
         return self.width
 
     def local_coordinates(self, position: np.ndarray) -> Tuple[float, float]:
+        if counters.enabled:
+            counters.increment("local_coordinates")
         delta = position - self.center
         phi = np.arctan2(delta[1], delta[0])
         phi = self.start_phase + utils.wrap_to_pi(phi - self.start_phase)
@@ -252,3 +319,14 @@ class CircularLane(AbstractLane):
         longitudinal = self.direction*(phi - self.start_phase)*self.radius
         lateral = self.direction*(self.radius - r)
         return longitudinal, lateral
+
+    def local_coordinates_batch(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if counters.enabled:
+            counters.increment("local_coordinates_batch")
+        delta = positions - self.center
+        phi = np.arctan2(delta[:, 1], delta[:, 0])
+        phi = self.start_phase + utils.wrap_to_pi(phi - self.start_phase)
+        r = np.linalg.norm(delta, axis=1)
+        longitudinal = self.direction*(phi - self.start_phase)*self.radius
+        lateral = self.direction*(self.radius - r)
+        return longitudinal, lateral
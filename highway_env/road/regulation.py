@@ -72,11 +72,10 @@ class RegulatedRoad(Road):
         positions_1, headings_1 = v1.predict_trajectory_constant_speed(times)
         positions_2, headings_2 = v2.predict_trajectory_constant_speed(times)
 
-        for position_1, heading_1, position_2, heading_2 in zip(positions_1, headings_1, positions_2, headings_2):
-            # Fast spherical pre-check
-            if np.linalg.norm(position_2 - position_1) > v1.LENGTH:
-                continue
-
+        # Fast spherical pre-check
+        close = np.flatnonzero(np.linalg.norm(positions_2 - positions_1, axis=1) <= v1.LENGTH)
+        for position_1, heading_1, position_2, heading_2 in zip(positions_1[close], headings_1[close],
+                                                                positions_2[close], headings_2[close]):
             # Accurate rectangular check
             if utils.rotated_rectangles_intersect((position_1, 1.5*v1.LENGTH, 0.9*v1.WIDTH, heading_1),
                                                   (position_2, 1.5*v2.LENGTH, 0.9*v2.WIDTH, heading_2)):
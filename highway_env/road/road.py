@@ -1,9 +1,12 @@
+from collections import OrderedDict
+
 import numpy as np
 import pandas as pd
 import logging
 from typing import List, Tuple, Dict, TYPE_CHECKING, Optional
 
-from highway_env.logger import Loggable
+from highway_env import counters
+from highway_env.logger import Loggable, ColumnarLogger
 from highway_env.road.lane import LineType, StraightLane, AbstractLane
 from highway_env.road.objects import Landmark
 
@@ -19,9 +22,12 @@ Route = List[LaneIndex]
 
 class RoadNetwork(object):
     graph: Dict[str, Dict[str, List[AbstractLane]]]
+    ROUTE_CACHE_SIZE: int = 256
+    """ Maximum number of routes whose cumulative lengths are cached """
 
     def __init__(self):
         self.graph = {}
+        self.route_lengths_cache = OrderedDict()
 
     def add_lane(self, _from: str, _to: str, lane: AbstractLane) -> None:
         """
@@ -35,6 +41,7 @@ class RoadNetwork(object):
         if _to not in self.graph[_from]:
             self.graph[_from][_to] = []
         self.graph[_from][_to].append(lane)
+        self.route_lengths_cache.clear()
 
     def get_lane(self, index: LaneIndex) -> AbstractLane:
         """
@@ -54,6 +61,8 @@ class RoadNetwork(object):
         :param position: a world position [m].
         :return: the index of the closest lane.
         """
+        if counters.enabled:
+            counters.increment("get_closest_lane_index")
         indexes, distances = [], []
         for _from, to_dict in self.graph.items():
             for _to, lanes in to_dict.items():
@@ -182,6 +191,8 @@ class RoadNetwork(object):
         :param depth: search depth from lane 1 along its route
         :return: whether the roads are connected
         """
+        if counters.enabled:
+            counters.increment("is_connected_road")
         if RoadNetwork.is_same_road(lane_index_2, lane_index_1, same_lane) \
                 or RoadNetwork.is_leading_to_road(lane_index_2, lane_index_1, same_lane):
             return True
@@ -230,6 +241,57 @@ class RoadNetwork(object):
             route = route[1:]
         return self.get_lane(route[0]).position(longitudinal, lateral), self.get_lane(route[0]).heading_at(longitudinal)
 
+    def route_lengths(self, route: Route) -> np.ndarray:
+        """
+            Get the cumulative lengths of the lanes of a route.
+
+            The table is cached per route, until a lane is added to the network. A lane with an unspecified id on a
+            road of several lanes has an undefined length, and so do the following lanes.
+        :param route: a planned route, list of lane indexes
+        :return: the longitudinal positions along the route at which each lane ends, or NaN if undefined
+        """
+        key = tuple(route)
+        if key in self.route_lengths_cache:
+            if counters.enabled:
+                counters.increment("route_lengths.hits")
+            self.route_lengths_cache.move_to_end(key)
+            return self.route_lengths_cache[key]
+        if counters.enabled:
+            counters.increment("route_lengths.misses")
+        defined = [index[2] is not None or len(self.graph[index[0]][index[1]]) == 1 for index in route]
+        lengths = np.cumsum([self.get_lane(index).length if ok else np.nan for index, ok in zip(route, defined)])
+        self.route_lengths_cache[key] = lengths
+        while len(self.route_lengths_cache) > self.ROUTE_CACHE_SIZE:
+            self.route_lengths_cache.popitem(last=False)
+        return lengths
+
+    def position_heading_along_route_batch(self, route: Route, longitudinal: np.ndarray, lateral: float = 0) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """
+            Get the absolute positions and headings along a route at several local coordinates.
+
+            This is the batch equivalent of position_heading_along_route: the lane of each longitudinal position is
+            found in the cumulative lengths of the route, and the geometry of each lane is evaluated once for all the
+            positions that it contains.
+        :param route: a planned route, list of lane indexes
+        :param longitudinal: an array of longitudinal positions along the route, of shape (N,)
+        :param lateral: lateral position
+        :return: positions of shape (N, 2), headings of shape (N,)
+        """
+        longitudinal = np.asarray(longitudinal, dtype=float)
+        ends = self.route_lengths(route)
+        segments = np.searchsorted(ends[:-1], longitudinal)
+        local = longitudinal - np.concatenate(([0], ends[:-1]))[segments]
+        positions, headings = np.empty((longitudinal.size, 2)), np.empty(longitudinal.size)
+        for segment in range(segments.min(initial=0), segments.max(initial=-1) + 1):
+            mask = segments == segment
+            if not mask.any():
+                continue
+            lane = self.get_lane(route[segment])
+            positions[mask] = lane.position_batch(local[mask], lateral)
+            headings[mask] = lane.heading_at_batch(local[mask])
+        return positions, headings
+
 
 class Road(Loggable):
     """
@@ -256,6 +318,9 @@ class Road(Loggable):
         self.objects = road_objects or []
         self.np_random = np_random if np_random else np.random.RandomState()
         self.record_history = record_history
+        self.logger = None
+        self.logged_steps = 0
+        self.profiler = None
 
     def close_vehicles_to(self, vehicle: 'kinematics.Vehicle', distance: float, count: int = None,
                           see_behind: bool = True) -> object:
@@ -273,6 +338,9 @@ class Road(Loggable):
         """
             Decide the actions of each entity on the road.
         """
+        if self.profiler:
+            self.profiler.vehicles_act(self.vehicles)
+            return
         for vehicle in self.vehicles:
             vehicle.act()
 
@@ -282,8 +350,18 @@ class Road(Loggable):
 
         :param dt: timestep [s]
         """
+        if self.profiler:
+            self.profiler.vehicles_step(self.vehicles, dt)
+            self.profiler.call("simulate/collisions", self.check_collisions)
+            return
         for vehicle in self.vehicles:
             vehicle.step(dt)
+        self.check_collisions()
+
+    def check_collisions(self) -> None:
+        """
+            Check the collisions between each pair of entities on the road.
+        """
         for vehicle in self.vehicles:
             for other in self.vehicles:
                 vehicle.check_collision(other)
@@ -300,6 +378,8 @@ class Road(Loggable):
                      vehicle is projected on it considering its local coordinates in the lane.
         :return: its preceding vehicle, its following vehicle
         """
+        if counters.enabled:
+            counters.increment("neighbour_vehicles")
         lane_index = lane_index or vehicle.lane_index
         if not lane_index:
             return None, None
@@ -321,19 +401,43 @@ class Road(Loggable):
                     v_rear = v
         return v_front, v_rear
 
-    def dump(self) -> None:
-        """
-            Dump the data of all entities on the road
-        """
-        for v in self.vehicles:
-            v.dump()
+    def dump(self, neighbours: bool = False) -> None:
+        """
+            Dump the data of all entities on the road, in a single columnar log.
+
+        :param neighbours: whether to log the metrics relative to side lanes and neighbour vehicles
+        """
+        if self.logger is None:
+            self.logger = ColumnarLogger()
+        if not self.vehicles:
+            return
+        position = np.array([v.position for v in self.vehicles], dtype=float)
+        heading = np.array([v.heading for v in self.vehicles], dtype=float)
+        speed = np.array([v.speed for v in self.vehicles], dtype=float)
+        data = {
+            'step': np.full(len(self.vehicles), self.logged_steps),
+            'vehicle': np.array([id(v) for v in self.vehicles]),
+            'x': position[:, 0],
+            'y': position[:, 1],
+            'psi': heading,
+            'vx': speed * np.cos(heading),
+            'vy': speed * np.sin(heading),
+            'v': speed,
+            'acceleration': np.array([v.action['acceleration'] for v in self.vehicles], dtype=float),
+            'steering': np.array([v.action['steering'] for v in self.vehicles], dtype=float)}
+        if neighbours:
+            metrics = [v.neighbours_metrics() for v in self.vehicles]
+            for key in sorted(set().union(*metrics)):
+                data[key] = np.array([m.get(key, np.nan) for m in metrics])
+        self.logger.append(data)
+        self.logged_steps += 1
 
     def get_log(self) -> pd.DataFrame:
         """
-            Concatenate the logs of all entities on the road.
-        :return: the concatenated log.
+            Get the log of all entities on the road.
+        :return: the log, with one row per vehicle and dumped step.
         """
-        return pd.concat([v.get_log() for v in self.vehicles])
+        return self.logger.to_dataframe() if self.logger is not None else pd.DataFrame()
 
     def __repr__(self):
         return self.vehicles.__repr__()
@@ -1,4 +1,3 @@
-import copy
 import importlib
 import itertools
 from typing import Tuple, Dict, Callable
@@ -115,6 +114,91 @@ def has_corner_inside(rect1: Tuple[Vector, float, float, float],
     return any([point_in_rotated_rectangle(c1+np.squeeze(p), c2, l2, w2, a2) for p in rotated_r1_points])
 
 
+class RecursiveLeastSquares(object):
+    """
+        An online estimator of the parameter theta of a linear model y = theta^T phi.
+
+        It maintains the regularized Gramian G_N = lambda I + 1/sigma sum phi_n phi_n^T, its inverse through
+        Sherman-Morrison updates, its log-determinant through the matrix determinant lemma, and the statistic
+        1/sigma sum phi_n y_n, so that each observation costs O(d^2) regardless of the number of observations.
+
+        A forgetting factor gamma < 1 discounts past observations: G_N = gamma G_{N-1} + 1/sigma phi_N phi_N^T.
+        The state before the last observation is kept, to test the consistency of this observation, as well as its
+        a priori prediction error.
+    """
+
+    def __init__(self, dimension: int, lambda_: float = 1e-5, sigma: float = 0.1, forgetting: float = 1.0) -> None:
+        """
+        :param dimension: the dimension d of the parameter
+        :param lambda_: l2 regularization parameter
+        :param sigma: noise covariance
+        :param forgetting: forgetting factor gamma in (0, 1]
+        """
+        self.dimension = dimension
+        self.lambda_ = lambda_
+        self.sigma = sigma
+        self.forgetting = forgetting
+        self.count = 0
+        self.gramian = lambda_ * np.identity(dimension)
+        self.gramian_inv = 1 / lambda_ * np.identity(dimension)
+        self.log_det = dimension * np.log(lambda_)
+        self.statistic = np.zeros(dimension)
+        self.theta = np.zeros(dimension)
+        self.error = 0
+        self.previous = None
+
+    @classmethod
+    def from_data(cls, data: Dict[str, np.ndarray], **kwargs) -> "RecursiveLeastSquares":
+        """
+            Create an estimator from a dataset.
+
+        :param data: a dictionary {"features": [phi_0,...,phi_N], "outputs": [y_0,...,y_N]}
+        :param kwargs: the estimator parameters
+        :return: the estimator, updated with all observations
+        """
+        estimator = cls(np.shape(data["features"][0])[0], **kwargs)
+        for phi, y in zip(data["features"], data["outputs"]):
+            estimator.update(phi, y)
+        return estimator
+
+    def update(self, phi: np.ndarray, y: float) -> None:
+        """
+            Update the estimate with a new observation.
+
+        :param phi: the features, of shape (d,)
+        :param y: the output
+        """
+        self.previous = (self.count, self.gramian, self.gramian_inv, self.log_det, self.theta)
+        self.error = float(y) - float(np.dot(self.theta, phi))
+        u = np.asarray(phi, dtype=float) / np.sqrt(self.sigma)
+        gramian_inv = self.gramian_inv / self.forgetting
+        g_u = gramian_inv @ u
+        denominator = 1 + u @ g_u
+        self.gramian_inv = gramian_inv - np.outer(g_u, g_u) / denominator
+        self.gramian = self.forgetting * self.gramian + np.outer(u, u)
+        self.log_det += self.dimension * np.log(self.forgetting) + np.log(denominator)
+        self.statistic = self.forgetting * self.statistic + u * float(y) / np.sqrt(self.sigma)
+        self.theta = self.gramian_inv @ self.statistic
+        self.count += 1
+
+    def ellipsoid(self, delta: float = 0.1, param_bound: float = 1.0, previous: bool = False) \
+            -> Tuple[np.ndarray, np.ndarray, float]:
+        """
+            Compute a confidence ellipsoid over the parameter theta.
+
+        :param delta: confidence level
+        :param param_bound: an upper-bound on the parameter norm
+        :param previous: whether to use the state before the last observation
+        :return: estimated theta, Gramian matrix G_N_lambda, radius beta_N
+        """
+        _, gramian, _, log_det, theta = self.previous if previous else \
+            (self.count, self.gramian, self.gramian_inv, self.log_det, self.theta)
+        d = self.dimension
+        beta_n = np.sqrt(2*(0.5*(log_det - d*np.log(self.lambda_)) - np.log(delta))) + \
+            np.sqrt(self.lambda_*d) * param_bound
+        return theta, gramian, beta_n
+
+
 def confidence_ellipsoid(data: Dict[str, np.ndarray], lambda_: float = 1e-5, delta: float = 0.1, sigma: float = 0.1,
                          param_bound: float = 1.0) -> Tuple[np.ndarray, np.ndarray, float]:
     """
@@ -128,6 +212,9 @@ def confidence_ellipsoid(data: Dict[str, np.ndarray], lambda_: float = 1e-5, del
     :param param_bound: an upper-bound on the parameter norm
     :return: estimated theta, Gramian matrix G_N_lambda, radius beta_N
     """
+    estimator = data.get("estimator")
+    if estimator is not None and (estimator.lambda_, estimator.sigma) == (lambda_, sigma):
+        return estimator.ellipsoid(delta=delta, param_bound=param_bound)
     phi = np.array(data["features"])
     y = np.array(data["outputs"])
     g_n_lambda = 1/sigma * np.transpose(phi) @ phi + lambda_ * np.identity(phi.shape[-1])
@@ -153,12 +240,11 @@ def confidence_polytope(data: dict, parameter_box: np.ndarray) -> Tuple[np.ndarr
     values, pp = np.linalg.eig(g_n_lambda)
     radius_matrix = np.sqrt(beta_n) * np.linalg.inv(pp) @ np.diag(np.sqrt(1 / values))
     h = np.array(list(itertools.product([-1, 1], repeat=theta_n_lambda.shape[0])))
-    d_theta = np.array([radius_matrix @ h_k for h_k in h])
+    d_theta = h @ radius_matrix.T
 
     # Clip the parameter and confidence region within the prior parameter box.
     theta_n_lambda = np.clip(theta_n_lambda, parameter_box[0], parameter_box[1])
-    for k in range(len(d_theta)):
-        d_theta[k] = np.clip(d_theta[k], parameter_box[0] - theta_n_lambda, parameter_box[1] - theta_n_lambda)
+    d_theta = np.clip(d_theta, parameter_box[0] - theta_n_lambda, parameter_box[1] - theta_n_lambda)
     return theta_n_lambda, d_theta, g_n_lambda, beta_n
 
 
@@ -191,7 +277,16 @@ def is_consistent_dataset(data: dict, parameter_box: np.ndarray = None) -> bool:
     :param parameter_box: a box [theta_min, theta_max]  containing the parameter theta
     :return: consistency of the dataset
     """
-    train_set = copy.deepcopy(data)
+    estimator = data.get("estimator")
+    if estimator is not None:
+        y, phi = np.array(data["outputs"][-1])[..., np.newaxis], np.array(data["features"][-1])[..., np.newaxis]
+        if estimator.count <= 1:
+            return True
+        theta, gramian, beta = estimator.ellipsoid(param_bound=np.amax(np.abs(parameter_box)), previous=True)
+        theta = np.clip(theta, parameter_box[0], parameter_box[1])
+        return is_valid_observation(y, phi, theta, gramian, beta)
+
+    train_set = {"features": list(data["features"]), "outputs": list(data["outputs"])}
     y, phi = train_set["outputs"].pop(-1), train_set["features"].pop(-1)
     y, phi = np.array(y)[..., np.newaxis], np.array(phi)[..., np.newaxis]
     if train_set["outputs"] and train_set["features"]:
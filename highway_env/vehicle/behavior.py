@@ -460,20 +460,30 @@ class LinearVehicle(IDMVehicle):
         front_vehicle, rear_vehicle = self.road.neighbour_vehicles(self)
         features = self.acceleration_features(self, front_vehicle, rear_vehicle)
         output = np.dot(self.ACCELERATION_PARAMETERS, features)
-        if "longitudinal" not in data:
-            data["longitudinal"] = {"features": [], "outputs": []}
-        data["longitudinal"]["features"].append(features)
-        data["longitudinal"]["outputs"].append(output)
+        self.add_observation(data, "longitudinal", features, output)
 
         if output_lane is None:
             output_lane = lane_index
         features = self.steering_features(lane_index)
         out_features = self.steering_features(output_lane)
         output = np.dot(self.STEERING_PARAMETERS, out_features)
-        if "lateral" not in data:
-            data["lateral"] = {"features": [], "outputs": []}
-        data["lateral"]["features"].append(features)
-        data["lateral"]["outputs"].append(output)
+        self.add_observation(data, "lateral", features, output)
+
+    @staticmethod
+    def add_observation(data: dict, key: str, features: np.ndarray, output: float) -> None:
+        """
+            Store an observation, and update the corresponding online parameter estimator.
+
+        :param data: the dataset
+        :param key: the model to which the observation belongs
+        :param features: the observed features
+        :param output: the observed output
+        """
+        if key not in data:
+            data[key] = {"features": [], "outputs": [], "estimator": utils.RecursiveLeastSquares(len(features))}
+        data[key]["features"].append(features)
+        data[key]["outputs"].append(output)
+        data[key]["estimator"].update(features, output)
 
 
 class AggressiveVehicle(LinearVehicle):
@@ -1,4 +1,4 @@
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
 import numpy as np
 import copy
@@ -185,16 +185,16 @@ class ControlledVehicle(Vehicle):
                 _to = self.road.np_random.randint(len(routes))
             self.route = routes[_to % len(routes)]
 
-    def predict_trajectory_constant_speed(self, times: np.ndarray) -> Tuple[List[np.ndarray], List[float]]:
+    def predict_trajectory_constant_speed(self, times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
             Predict the future positions of the vehicle along its planned route, under constant speed
         :param times: timesteps of prediction
-        :return: positions, headings
+        :return: positions of shape (len(times), 2), headings of shape (len(times),)
         """
         coordinates = self.lane.local_coordinates(self.position)
         route = self.route or [self.lane_index]
-        return tuple(zip(*[self.road.network.position_heading_along_route(route, coordinates[0] + self.speed * t, 0)
-                     for t in times]))
+        return self.road.network.position_heading_along_route_batch(
+            route, coordinates[0] + self.speed * np.asarray(times), 0)
 
 
 class MDPVehicle(ControlledVehicle):
@@ -289,3 +289,107 @@ class MDPVehicle(ControlledVehicle):
                 if (t % int(trajectory_timestep / dt)) == 0:
                     states.append(copy.deepcopy(v))
         return states
+
+    def predict_trajectories(self, action_sequences: List[List[str]], action_duration: float,
+                             trajectory_timestep: float, dt: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+            Predict the future trajectories of the vehicle for a batch of action sequences.
+
+            This is a lightweight equivalent of predict_trajectory for each sequence: the kinematic states of all the
+            sequences are propagated at once with the same controllers and dynamics, without copying the vehicle. The
+            lane geometry is evaluated in batch for all the sequences following the same target lane.
+
+        :param action_sequences: a batch of sequences of future actions, all of the same length
+        :param action_duration: the duration of each action.
+        :param trajectory_timestep: the duration between each save of the vehicle state.
+        :param dt: the timestep of the simulation
+        :return: the positions, of shape (len(action_sequences), T, 2), the headings and speeds, of shape
+                 (len(action_sequences), T), where T is the number of saved states
+        """
+        count = len(action_sequences)
+        position = np.tile(np.asarray(self.position, dtype=float), (count, 1))
+        heading = np.full(count, self.heading, dtype=float)
+        speed = np.full(count, self.speed, dtype=float)
+        target_speed = np.full(count, self.target_speed, dtype=float)
+        target_lanes = [self.target_lane_index] * count
+        routes = [list(self.route) if self.route else self.route for _ in range(count)]
+        random_state, generators = self.road.np_random.get_state(), {}
+
+        def follow_roads() -> None:
+            for lane_index, indexes in self._group_by_lane(target_lanes).items():
+                lane = self.road.network.get_lane(lane_index)
+                longitudinal, _ = lane.local_coordinates_batch(position[indexes])
+                for i in indexes[longitudinal > lane.length - lane.VEHICLE_LENGTH / 2]:
+                    if i not in generators:  # Each sequence draws from its own copy of the road random generator
+                        generators[i] = np.random.RandomState()
+                        generators[i].set_state(random_state)
+                    target_lanes[i] = self.road.network.next_lane(target_lanes[i], route=routes[i],
+                                                                  position=position[i], np_random=generators[i])
+
+        steps, save_every = int(action_duration / dt), int(trajectory_timestep / dt)
+        states, t = [], 0
+        for actions in zip(*action_sequences):
+            # High-level decisions
+            follow_roads()
+            for i, action in enumerate(actions):
+                if action in ["FASTER", "SLOWER"]:
+                    speed_index = self.speed_to_index(speed[i]) + (1 if action == "FASTER" else -1)
+                    target_speed[i] = self.index_to_speed(np.clip(speed_index, 0, self.SPEED_COUNT - 1))
+                elif action in ["LANE_LEFT", "LANE_RIGHT"]:
+                    _from, _to, _id = target_lanes[i]
+                    _id = np.clip(_id + (1 if action == "LANE_RIGHT" else -1),
+                                  0, len(self.road.network.graph[_from][_to]) - 1)
+                    if self.road.network.get_lane((_from, _to, _id)).is_reachable_from(position[i]):
+                        target_lanes[i] = _from, _to, _id
+            for _ in range(steps):
+                t += 1
+                # Low-level control
+                follow_roads()
+                steering, acceleration = self._control_batch(target_lanes, position, heading, speed, target_speed)
+                # Kinematics
+                beta = np.arctan(1 / 2 * np.tan(steering))
+                position += (speed * np.array([np.cos(heading + beta), np.sin(heading + beta)])).T * dt
+                heading += speed * np.sin(beta) / (self.LENGTH / 2) * dt
+                speed += acceleration * dt
+                if t % save_every == 0:
+                    states.append((position.copy(), heading.copy(), speed.copy()))
+        if not states:
+            return np.zeros((count, 0, 2)), np.zeros((count, 0)), np.zeros((count, 0))
+        positions, headings, speeds = zip(*states)
+        return np.stack(positions, axis=1), np.stack(headings, axis=1), np.stack(speeds, axis=1)
+
+    @staticmethod
+    def _group_by_lane(lanes: List[LaneIndex]) -> Dict[LaneIndex, np.ndarray]:
+        groups = {}
+        for i, lane_index in enumerate(lanes):
+            groups.setdefault(lane_index, []).append(i)
+        return {lane_index: np.array(indexes) for lane_index, indexes in groups.items()}
+
+    def _control_batch(self, target_lanes: List[LaneIndex], position: np.ndarray, heading: np.ndarray,
+                       speed: np.ndarray, target_speed: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+            Compute the steering and acceleration commands of several states, as in steering_control, speed_control
+            and clip_actions.
+        """
+        lateral, future_heading = np.empty(speed.size), np.empty(speed.size)
+        for lane_index, indexes in self._group_by_lane(target_lanes).items():
+            lane = self.road.network.get_lane(lane_index)
+            longitudinal, lateral[indexes] = lane.local_coordinates_batch(position[indexes])
+            future_heading[indexes] = lane.heading_at_batch(longitudinal + speed[indexes] * self.PURSUIT_TAU)
+        speed_not_zero = np.where(np.abs(speed) > 1e-2, speed, np.where(speed > 0, 1e-2, -1e-2))
+        # Lateral position control
+        lateral_speed_command = - self.KP_LATERAL * lateral
+        # Lateral speed to heading
+        heading_command = np.arcsin(np.clip(lateral_speed_command / speed_not_zero, -1, 1))
+        heading_ref = future_heading + np.clip(heading_command, -np.pi/4, np.pi/4)
+        # Heading control
+        heading_rate_command = self.KP_HEADING * utils.wrap_to_pi(heading_ref - heading)
+        # Heading rate to steering angle
+        steering = np.arcsin(np.clip(self.LENGTH / 2 / speed_not_zero * heading_rate_command, -1, 1))
+        steering = np.clip(steering, -self.MAX_STEERING_ANGLE, self.MAX_STEERING_ANGLE)
+        acceleration = self.KP_A * (target_speed - speed)
+        if self.crashed:
+            steering, acceleration = np.zeros(speed.size), -1.0 * speed
+        acceleration = np.where(speed > self.MAX_SPEED, np.minimum(acceleration, self.MAX_SPEED - speed), acceleration)
+        acceleration = np.where(speed < -self.MAX_SPEED, np.maximum(acceleration, self.MAX_SPEED - speed), acceleration)
+        return steering, acceleration
@@ -1,9 +1,10 @@
-import itertools
+from collections import OrderedDict
 from typing import List, Union, Tuple, TYPE_CHECKING
 
 import numpy as np
 import pygame
 
+from highway_env import counters
 from highway_env.types import Vector
 from highway_env.vehicle.dynamics import BicycleVehicle
 from highway_env.vehicle.kinematics import Vehicle
@@ -24,6 +25,18 @@ class VehicleGraphics(object):
     DEFAULT_COLOR = YELLOW
     EGO_COLOR = GREEN
 
+    SPRITES_CACHE_SIZE: int = 256
+    """ Maximum number of vehicle sprites kept in memory """
+
+    ROTATIONS_CACHE_SIZE: int = 4096
+    """ Maximum number of rotated vehicle sprites kept in memory """
+
+    HEADING_RESOLUTION: float = 1
+    """ Quantization of the headings of rotated sprites [deg] """
+
+    sprites = OrderedDict()
+    rotations = OrderedDict()
+
     @classmethod
     def display(cls, vehicle: Vehicle, surface: "WorldSurface", transparent: bool = False, offscreen: bool = False,
                 label: bool = False) -> None:
@@ -38,42 +51,134 @@ class VehicleGraphics(object):
         :param offscreen: whether the rendering should be done offscreen or not
         :param label: whether a text label should be rendered
         """
+        surface.blit(*cls.sprite_blit(vehicle, surface, vehicle.position, vehicle.heading, transparent, offscreen))
+
+        # Label
+        if label:
+            font = pygame.font.Font(None, 15)
+            text = "#{}".format(id(vehicle) % 1000)
+            text = font.render(text, 1, (10, 10, 10), (255, 255, 255))
+            surface.blit(text, [*surface.pos2pix(vehicle.position[0], vehicle.position[1])])
+
+    @classmethod
+    def display_batch(cls, vehicles: List[Vehicle], surface: "WorldSurface", transparent: bool = False,
+                      offscreen: bool = False) -> None:
+        """
+            Display several vehicles on a pygame surface, in a single blit sequence.
+
+        :param vehicles: the vehicles to be drawn
+        :param surface: the surface to draw the vehicles on
+        :param transparent: whether the vehicles should be drawn slightly transparent
+        :param offscreen: whether the rendering should be done offscreen or not
+        """
+        surface.blits([cls.sprite_blit(v, surface, v.position, v.heading, transparent, offscreen) for v in vehicles],
+                      doreturn=False)
+
+    @classmethod
+    def sprite_blit(cls, vehicle: Vehicle, surface: "WorldSurface", position: Vector, heading: float,
+                    transparent: bool = False, offscreen: bool = False) -> Tuple[pygame.SurfaceType, Tuple[int, int]]:
+        """
+            Get the rotated sprite of a vehicle at a given pose, and where to blit it.
+
+            Rotated sprites are cached at quantized headings.
+
+        :param vehicle: the vehicle to be drawn
+        :param surface: the surface to draw the vehicle on
+        :param position: the vehicle position [m]
+        :param heading: the vehicle heading [rad]
+        :param transparent: whether the vehicle should be drawn slightly transparent
+        :param offscreen: whether the rendering should be done offscreen or not
+        :return: the rotated sprite, and the position of its top-left corner on the surface [px]
+        """
+        key = cls.sprite_key(vehicle, surface, transparent, offscreen)
+        h = heading if abs(heading) > 2 * np.pi / 180 else 0
+        angle = (round(np.rad2deg(-h) / cls.HEADING_RESOLUTION) * cls.HEADING_RESOLUTION) % 360
+        rotation_key = (key, angle)
+        if rotation_key in cls.rotations:
+            if counters.enabled:
+                counters.increment("vehicle_graphics.rotations.hits")
+            cls.rotations.move_to_end(rotation_key)
+            image = cls.rotations[rotation_key]
+        else:
+            if counters.enabled:
+                counters.increment("vehicle_graphics.rotations.misses")
+            image = pygame.transform.rotate(cls.sprite(vehicle, surface, key), angle)
+            cls._store(cls.rotations, rotation_key, image, cls.ROTATIONS_CACHE_SIZE)
+        x, y = surface.pos2pix(position[0], position[1])
+        return image, (x - image.get_width() / 2, y - image.get_height() / 2)
+
+    @classmethod
+    def sprite_key(cls, vehicle: Vehicle, surface: "WorldSurface", transparent: bool = False,
+                   offscreen: bool = False) -> tuple:
+        """
+            The properties determining the appearance of a vehicle sprite.
+
+            Vehicles with tires are drawn with their front tires steered, at quantized steering angles.
+
+        :param vehicle: the vehicle to be drawn
+        :param surface: the surface to draw the vehicle on
+        :param transparent: whether the vehicle should be drawn slightly transparent
+        :param offscreen: whether the rendering should be done offscreen or not
+        :return: the sprite key
+        """
+        steering = None
+        if type(vehicle) in [Vehicle, BicycleVehicle]:
+            steering = round(np.rad2deg(vehicle.action["steering"]) / cls.HEADING_RESOLUTION) \
+                * cls.HEADING_RESOLUTION
+        return (vehicle.LENGTH, vehicle.WIDTH, tuple(cls.get_color(vehicle, transparent)), steering,
+                surface.scaling, offscreen)
+
+    @classmethod
+    def sprite(cls, vehicle: Vehicle, surface: "WorldSurface", key: tuple) -> pygame.SurfaceType:
+        """
+            Get the sprite of a vehicle with null heading, and draw it if it is not cached yet.
+
+        :param vehicle: the vehicle to be drawn
+        :param surface: the surface to draw the vehicle on
+        :param key: the sprite key
+        :return: the vehicle sprite
+        """
+        if key in cls.sprites:
+            if counters.enabled:
+                counters.increment("vehicle_graphics.sprites.hits")
+            cls.sprites.move_to_end(key)
+            return cls.sprites[key]
+        if counters.enabled:
+            counters.increment("vehicle_graphics.sprites.misses")
         v = vehicle
+        _, _, color, steering, _, offscreen = key
         tire_length, tire_width = 1, 0.3
 
         # Vehicle rectangle
         length = v.LENGTH + 2 * tire_length
         vehicle_surface = pygame.Surface((surface.pix(length), surface.pix(length)), pygame.SRCALPHA)  # per-pixel alpha
         rect = (surface.pix(tire_length), surface.pix(length / 2 - v.WIDTH / 2), surface.pix(v.LENGTH), surface.pix(v.WIDTH))
-        pygame.draw.rect(vehicle_surface, cls.get_color(v, transparent), rect, 0)
+        pygame.draw.rect(vehicle_surface, color, rect, 0)
         pygame.draw.rect(vehicle_surface, cls.BLACK, rect, 1)
 
         # Tires
-        if type(vehicle) in [Vehicle, BicycleVehicle]:
+        if steering is not None:
             tire_positions = [[surface.pix(tire_length), surface.pix(length / 2 - v.WIDTH / 2)],
                               [surface.pix(tire_length), surface.pix(length / 2 + v.WIDTH / 2)],
                               [surface.pix(length - tire_length), surface.pix(length / 2 - v.WIDTH / 2)],
                               [surface.pix(length - tire_length), surface.pix(length / 2 + v.WIDTH / 2)]]
-            tire_angles = [0, 0, v.action["steering"], v.action["steering"]]
+            tire_angles = [0, 0, np.deg2rad(steering), np.deg2rad(steering)]
             for tire_position, tire_angle in zip(tire_positions, tire_angles):
                 tire_surface = pygame.Surface((surface.pix(tire_length), surface.pix(tire_length)), pygame.SRCALPHA)
                 rect = (0, surface.pix(tire_length/2-tire_width/2), surface.pix(tire_length), surface.pix(tire_width))
                 pygame.draw.rect(tire_surface, cls.BLACK, rect, 0)
                 cls.blit_rotate(vehicle_surface, tire_surface, tire_position, np.rad2deg(-tire_angle))
 
-        # Centered rotation
-        h = v.heading if abs(v.heading) > 2 * np.pi / 180 else 0
-        position = [*surface.pos2pix(v.position[0], v.position[1])]
         if not offscreen:  # convert_alpha throws errors in offscreen mode TODO() Explain why
             vehicle_surface = pygame.Surface.convert_alpha(vehicle_surface)
-        cls.blit_rotate(surface, vehicle_surface, position, np.rad2deg(-h))
+        cls._store(cls.sprites, key, vehicle_surface, cls.SPRITES_CACHE_SIZE)
+        return vehicle_surface
 
-        # Label
-        if label:
-            font = pygame.font.Font(None, 15)
-            text = "#{}".format(id(v) % 1000)
-            text = font.render(text, 1, (10, 10, 10), (255, 255, 255))
-            surface.blit(text, position)
+    @staticmethod
+    def _store(cache: OrderedDict, key: tuple, value: pygame.SurfaceType, max_size: int) -> None:
+        cache[key] = value
+        while len(cache) > max_size:
+            cache.popitem(last=False)
 
     @staticmethod
     def blit_rotate(surf: pygame.SurfaceType, image: pygame.SurfaceType, pos: Vector, angle: float,
@@ -112,8 +217,7 @@ class VehicleGraphics(object):
         :param surface: the surface to draw the vehicle future states on
         :param offscreen: whether the rendering should be done offscreen or not
         """
-        for vehicle in states:
-            cls.display(vehicle, surface, transparent=True, offscreen=offscreen)
+        cls.display_batch(states, surface, transparent=True, offscreen=offscreen)
 
     @classmethod
     def display_history(cls, vehicle: Vehicle, surface: "WorldSurface", frequency: float = 3, duration: float = 2,
@@ -128,11 +232,9 @@ class VehicleGraphics(object):
         :param simulation: simulation frequency
         :param offscreen: whether the rendering should be done offscreen or not
         """
-        for v in itertools.islice(vehicle.history,
-                                  None,
-                                  int(simulation * duration),
-                                  int(simulation / frequency)):
-            cls.display(v, surface, transparent=True, offscreen=offscreen)
+        states = vehicle.history.view()[:int(simulation * duration):int(simulation / frequency)]
+        surface.blits([cls.sprite_blit(vehicle, surface, state[:2], state[2], transparent=True, offscreen=offscreen)
+                       for state in states], doreturn=False)
 
     @classmethod
     def get_color(cls, vehicle: Vehicle, transparent: bool = False) -> Tuple[int]:
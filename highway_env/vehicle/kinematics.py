@@ -2,10 +2,9 @@ import copy
 from typing import List, Union, TYPE_CHECKING
 import numpy as np
 import pandas as pd
-from collections import deque
 
-from highway_env import utils
-from highway_env.logger import Loggable
+from highway_env import counters, utils
+from highway_env.logger import Loggable, ColumnarLogger
 from highway_env.road.lane import AbstractLane
 from highway_env.road.road import Road, LaneIndex
 from highway_env.road.objects import Obstacle, Landmark
@@ -15,6 +14,69 @@ if TYPE_CHECKING:
     from highway_env.road.objects import RoadObject
 
 
+class VehicleHistory(object):
+    """
+        A bounded history of the recent states (x, y, heading, speed) of a vehicle.
+
+        States are stored in a fixed-size ring buffer. Each state is written twice, at its slot and at the same slot
+        shifted by the buffer size, so that the most recent states are always contiguous and can be viewed without any
+        copy or allocation. The buffer is only allocated when the first state is recorded, since the history of
+        vehicles is not recorded by default.
+    """
+    X, Y, HEADING, SPEED = range(4)
+
+    def __init__(self, maxlen: int = 30) -> None:
+        """
+        :param maxlen: the maximum number of recorded states
+        """
+        self.maxlen = maxlen
+        self.buffer = None
+        self.index = maxlen - 1
+        self.count = 0
+
+    def append(self, vehicle: "Vehicle") -> None:
+        """
+            Record the current state of a vehicle.
+
+        :param vehicle: the vehicle
+        """
+        if self.buffer is None:
+            self.buffer = np.zeros((2 * self.maxlen, 4))
+        self.index = (self.index + 1) % self.maxlen
+        state = (vehicle.position[0], vehicle.position[1], vehicle.heading, vehicle.speed)
+        self.buffer[self.index] = self.buffer[self.index + self.maxlen] = state
+        self.count = min(self.count + 1, self.maxlen)
+
+    def view(self) -> np.ndarray:
+        """
+            A view of the recorded states, from the most recent to the oldest.
+
+        :return: an array of shape (len(self), 4) of states (x, y, heading, speed), not to be modified
+        """
+        if self.buffer is None:
+            return np.zeros((0, 4))
+        end = self.index + self.maxlen
+        return self.buffer[end:end - self.count:-1]
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self.view()[:, self.X:self.Y + 1]
+
+    @property
+    def headings(self) -> np.ndarray:
+        return self.view()[:, self.HEADING]
+
+    @property
+    def speeds(self) -> np.ndarray:
+        return self.view()[:, self.SPEED]
+
+    def clear(self) -> None:
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+
 class Vehicle(Loggable):
     """
         A moving vehicle on a road, and its kinematics.
@@ -33,6 +95,10 @@ class Vehicle(Loggable):
     """ Range for random initial speeds [m/s] """
     MAX_SPEED = 40.
     """ Maximum reachable speed [m/s] """
+    HISTORY_SIZE = 30
+    """ Number of recorded past states """
+    FEATURES: List[str] = ['presence', 'x', 'y', 'vx', 'vy', 'cos_h', 'sin_h', 'cos_d', 'sin_d']
+    """ The kinematic features that can be extracted in bulk by features_array """
 
     def __init__(self,
                  road: Road,
@@ -47,8 +113,8 @@ class Vehicle(Loggable):
         self.lane = self.road.network.get_lane(self.lane_index) if self.road else None
         self.action = {'steering': 0, 'acceleration': 0}
         self.crashed = False
-        self.log = []
-        self.history = deque(maxlen=30)
+        self.log = None
+        self.history = VehicleHistory(self.HISTORY_SIZE)
 
     @classmethod
     def make_on_lane(cls, road: Road, lane_index: LaneIndex, longitudinal: float, speed: float = 0) -> "Vehicle":
@@ -79,20 +145,45 @@ class Vehicle(Loggable):
         :param spacing: ratio of spacing to the front vehicle, 1 being the default
         :return: A vehicle with random position and/or speed
         """
-        if speed is None:
-            speed = road.np_random.uniform(Vehicle.DEFAULT_SPEEDS[0], Vehicle.DEFAULT_SPEEDS[1])
-        _from = road.np_random.choice(list(road.network.graph.keys()))
-        _to = road.np_random.choice(list(road.network.graph[_from].keys()))
-        _id = road.np_random.choice(len(road.network.graph[_from][_to]))
-        x0 = len(road.vehicles) * spacing if len(road.vehicles) else spacing
-        x0 += road.np_random.uniform(-0.1, 0.1)*spacing
-        v = cls(road,
-                road.network.get_lane((_from, _to, _id)).position(x0, 0),
-                road.network.get_lane((_from, _to, _id)).heading_at(x0),
-                speed)
-        v.index = len(road.vehicles)+1
-        return v
+        return cls.create_random_vehicles(road, 1, speed=speed, spacing=spacing)[0]
+
+    @classmethod
+    def create_random_vehicles(cls, road: Road, count: int, speed: float = None, spacing: float = 1) \
+            -> List["Vehicle"]:
+        """
+            Create several random vehicles on the road at once.
 
+            The lanes, longitudinal gaps and speeds of all vehicles are sampled in a single vectorized draw from the
+            road random generator, with the same distribution as repeated calls to create_random(). The k-th vehicle
+            is placed as if the k-1 previous ones had already been added to the road, but the vehicles are not added.
+
+        :param road: the road where the vehicles are driving
+        :param count: number of vehicles to create
+        :param speed: initial speed in [m/s]. If None, will be chosen randomly
+        :param spacing: ratio of spacing to the front vehicle, 1 being the default
+        :return: a list of vehicles with random positions and/or speeds
+        """
+        if speed is None:
+            speeds = road.np_random.uniform(Vehicle.DEFAULT_SPEEDS[0], Vehicle.DEFAULT_SPEEDS[1], size=count)
+        else:
+            speeds = np.full(count, speed)
+        lanes_draws = road.np_random.uniform(size=(count, 3))
+        offsets = road.np_random.uniform(-0.1, 0.1, size=count) * spacing
+        ranks = len(road.vehicles) + np.arange(count)
+        x0 = np.where(ranks > 0, ranks * spacing, spacing) + offsets
+
+        origins = list(road.network.graph.keys())
+        vehicles = []
+        for k in range(count):
+            _from = origins[int(lanes_draws[k, 0] * len(origins))]
+            destinations = list(road.network.graph[_from].keys())
+            _to = destinations[int(lanes_draws[k, 1] * len(destinations))]
+            _id = int(lanes_draws[k, 2] * len(road.network.graph[_from][_to]))
+            lane = road.network.get_lane((_from, _to, _id))
+            v = cls(road, lane.position(x0[k], 0), lane.heading_at(x0[k]), float(speeds[k]))
+            v.index = int(ranks[k]) + 1
+            vehicles.append(v)
+        return vehicles
 
     @classmethod
     def create_from(cls, vehicle: "Vehicle") -> "Vehicle":
@@ -151,7 +242,7 @@ class Vehicle(Loggable):
             self.lane_index = self.road.network.get_closest_lane_index(self.position)
             self.lane = self.road.network.get_lane(self.lane_index)
             if self.road.record_history:
-                self.history.appendleft(self.create_from(self))
+                self.history.append(self)
 
     def lane_distance_to(self, vehicle: "Vehicle", lane: AbstractLane = None) -> float:
         """
@@ -173,6 +264,8 @@ class Vehicle(Loggable):
 
         :param other: the other vehicle or object
         """
+        if counters.enabled:
+            counters.increment("check_collision")
         if self.crashed or other is self:
             return
 
@@ -254,11 +347,62 @@ class Vehicle(Loggable):
                 d[key] -= origin_dict[key]
         return d
 
-    def dump(self) -> None:
+    @classmethod
+    def features_array(cls, vehicles: List[Union["Vehicle", "RoadObject"]], features: List[str],
+                       origin: "Vehicle" = None, observe_intentions: bool = True) -> np.ndarray:
+        """
+            Get the kinematic features of several vehicles or road objects, as an array.
+
+            This is the bulk equivalent of to_dict: the position, heading, speed and destination of each vehicle are
+            read once, and the features are computed for all vehicles at once. Road objects have zero velocity and
+            destination direction.
+
+        :param vehicles: the vehicles or road objects
+        :param features: the names of the features, among FEATURES
+        :param origin: if not None, the positions and velocities are relative to this vehicle
+        :param observe_intentions: whether to observe the destination directions of the vehicles
+        :return: an array of shape (len(vehicles), len(features))
+        """
+        unknown = set(features) - set(cls.FEATURES)
+        if unknown:
+            raise ValueError("Unknown features: {}".format(", ".join(sorted(unknown))))
+        values = {}
+        if {'x', 'y', 'cos_d', 'sin_d'} & set(features):
+            positions = np.array([v.position for v in vehicles], dtype=float).reshape((-1, 2))
+            values['x'], values['y'] = positions.T
+        if {'vx', 'vy', 'cos_h', 'sin_h'} & set(features):
+            headings = np.array([v.heading for v in vehicles], dtype=float)
+            speeds = np.array([v.speed if isinstance(v, Vehicle) else 0. for v in vehicles], dtype=float)
+            values['cos_h'], values['sin_h'] = np.cos(headings), np.sin(headings)
+            values['vx'], values['vy'] = speeds * values['cos_h'], speeds * values['sin_h']
+        if {'cos_d', 'sin_d'} & set(features):
+            directions = np.zeros((len(vehicles), 2))
+            if observe_intentions:
+                for i, v in enumerate(vehicles):
+                    if isinstance(v, Vehicle) and getattr(v, "route", None):
+                        directions[i] = v.destination - positions[i]
+                norms = np.linalg.norm(directions, axis=1)
+                np.divide(directions, norms[:, None], out=directions, where=norms[:, None] > 0)
+            values['cos_d'], values['sin_d'] = directions.T
+
+        array = np.empty((len(vehicles), len(features)))
+        for j, feature in enumerate(features):
+            array[:, j] = values[feature] if feature != 'presence' else 1
+        if origin is not None and len(vehicles):
+            reference = dict(x=origin.position[0], y=origin.position[1],
+                             vx=origin.speed * np.cos(origin.heading), vy=origin.speed * np.sin(origin.heading))
+            for j, feature in enumerate(features):
+                if feature in reference:
+                    array[:, j] -= reference[feature]
+        return array
+
+    def dump(self, neighbours: bool = False) -> None:
         """
             Update the internal log of the vehicle, containing:
                 - its kinematics;
-                - some metrics relative to its neighbour vehicles.
+                - if asked, some metrics relative to its side lanes and neighbour vehicles.
+
+        :param neighbours: whether to log the metrics relative to side lanes and neighbour vehicles
         """
         data = {
             'x': self.position[0],
@@ -269,7 +413,19 @@ class Vehicle(Loggable):
             'v': self.speed,
             'acceleration': self.action['acceleration'],
             'steering': self.action['steering']}
+        if neighbours:
+            data.update(self.neighbours_metrics())
+        if self.log is None:
+            self.log = ColumnarLogger(chunk_size=256)
+        self.log.append({key: [float(value)] for key, value in data.items()})
+
+    def neighbours_metrics(self) -> dict:
+        """
+            Metrics relative to the side lanes and neighbour vehicles of the vehicle.
 
+        :return: a dict of metrics, only containing the neighbour vehicles that exist
+        """
+        data = {}
         if self.road:
             for lane_index in self.road.network.side_lanes(self.lane_index):
                 lane_coords = self.road.network.get_lane(lane_index).local_coordinates(self.position)
@@ -288,8 +444,7 @@ class Vehicle(Loggable):
                     'rear_v': rear_vehicle.speed,
                     'rear_distance': rear_vehicle.lane_distance_to(self)
                 })
-
-        self.log.append(data)
+        return data
 
     def get_log(self) -> pd.DataFrame:
         """
@@ -297,7 +452,7 @@ class Vehicle(Loggable):
 
         :return: the DataFrame of the Vehicle's log.
         """
-        return pd.DataFrame(self.log)
+        return self.log.to_dataframe() if self.log is not None else pd.DataFrame()
 
     def __str__(self):
         return "{} #{}: {}".format(self.__class__.__name__, id(self) % 1000, self.position)
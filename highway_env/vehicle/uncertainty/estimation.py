@@ -1,3 +1,4 @@
+import copy
 from typing import Tuple, List, Callable
 
 import numpy as np
@@ -26,11 +27,21 @@ class RegressionVehicle(IntervalVehicle):
         theta_n_lambda, d_theta, _, _ = confidence_polytope(data, parameter_box=parameter_box)
         a, phi = structure()
         a0 = a + np.tensordot(theta_n_lambda, phi, axes=[0, 0])
-        da = [np.tensordot(d_theta_k, phi, axes=[0, 0]) for d_theta_k in d_theta]
+        da = list(np.tensordot(d_theta, phi, axes=[1, 0]))
         return a0, da
 
 
 class MultipleModelVehicle(LinearVehicle):
+    """
+        A LinearVehicle tracking a set of hypotheses on the route that it is following.
+
+        Its data is a list of hypotheses (route, dataset). Hypotheses that currently follow the same lane have observed
+        the same features, and share their dataset until their routes diverge, when it is copied. Consistency tests
+        are thus evaluated once per dataset, incrementally, and falsified hypotheses are pruned at once.
+    """
+    MAX_HYPOTHESES: int = 8
+    """ Maximum number of tracked hypotheses. Those with the largest prediction errors are evicted first. """
+
     def __init__(self, road: Road,
                  position: Vector,
                  heading: float = 0,
@@ -54,16 +65,30 @@ class MultipleModelVehicle(LinearVehicle):
     def collect_data(self) -> None:
         """
             Collect the features for each possible route, and true observed outputs.
+
+            Datasets shared by hypotheses following different lanes are first copied, and features are then collected
+            once per dataset.
         """
+        lanes, copies = {}, {}
+        for k, (route, data) in enumerate(self.data):
+            lane = lanes.setdefault(id(data), route[0])
+            if lane != route[0]:
+                if (id(data), route[0]) not in copies:
+                    copies[(id(data), route[0])] = copy.deepcopy(data)
+                self.data[k] = (route, copies[(id(data), route[0])])
+        collected = set()
         for route, data in self.data:
-            self.add_features(data, route[0], output_lane=self.target_lane_index)
+            if id(data) not in collected:
+                collected.add(id(data))
+                self.add_features(data, route[0], output_lane=self.target_lane_index)
 
     def update_possible_routes(self) -> None:
         """
             Update a list of possible routes that this vehicle could be following.
-            - Add routes at the next intersection
+            - Add routes at the next intersection, sharing the dataset of hypotheses following the same lane
             - Step the current lane in each route
             - Reject inconsistent routes
+            - Evict hypotheses in excess
         """
 
         for route in self.get_routes_at_intersection():  # Candidates
@@ -71,14 +96,15 @@ class MultipleModelVehicle(LinearVehicle):
             for i in range(len(route)):
                 route[i] = route[i] if route[i][2] is not None else (route[i][0], route[i][1], 0)
             # Is this route already considered, or a suffix of a route already considered ?
-            for known_route, _ in self.data:
+            for k, (known_route, known_data) in enumerate(self.data):
                 if known_route == route:
                     break
                 elif len(known_route) < len(route) and route[:len(known_route)] == known_route:
-                    self.data = [(r, d) if r != known_route else (route, d) for r, d in self.data]
+                    self.data[k] = (route, known_data)
                     break
             else:
-                self.data.append((route.copy(), {}))  # Add it
+                shared_data = next((data for known_route, data in self.data if known_route[0] == route[0]), {})
+                self.data.append((route.copy(), shared_data))  # Add it
 
         # Step the lane being followed in each possible route
         for route, _ in self.data:
@@ -86,10 +112,30 @@ class MultipleModelVehicle(LinearVehicle):
                 route.pop(0)
 
         # Reject inconsistent hypotheses
-        for route, data in self.data.copy():
-            if data:
-                if not is_consistent_dataset(data["lateral"], parameter_box=LinearVehicle.STEERING_RANGE):
-                    self.data.remove((route, data))
+        consistent = {}
+        for _, data in self.data:
+            if id(data) not in consistent:
+                consistent[id(data)] = not data or \
+                    is_consistent_dataset(data["lateral"], parameter_box=LinearVehicle.STEERING_RANGE)
+        self.data = [(route, data) for route, data in self.data if consistent[id(data)]]
+
+        # Evict hypotheses in excess
+        if len(self.data) > self.MAX_HYPOTHESES:
+            errors = [self.hypothesis_error(data) for _, data in self.data]
+            kept = sorted(sorted(range(len(self.data)), key=lambda k: (errors[k], k))[:self.MAX_HYPOTHESES])
+            self.data = [self.data[k] for k in kept]
+
+    @staticmethod
+    def hypothesis_error(data: dict) -> float:
+        """
+            The prediction error of a hypothesis on the last observed steering command.
+
+        :param data: the dataset of the hypothesis
+        :return: the absolute a priori prediction error of its lateral model, or 0 if no data was collected
+        """
+        if not data or "estimator" not in data["lateral"]:
+            return 0
+        return abs(data["lateral"]["estimator"].error)
 
     def assume_model_is_valid(self, index: int) -> "LinearVehicle":
         """
@@ -3,9 +3,9 @@ from typing import List, Tuple, Callable, Union
 import numpy as np
 
 from highway_env import utils
-from highway_env.interval import polytope, vector_interval_section, integrator_interval, \
-    interval_negative_part, intervals_diff, intervals_product, LPV, interval_absolute_to_local, \
-    interval_local_to_absolute
+from highway_env.interval import affine_polytope, interval_negative_part, LPV, interval_absolute_to_local, \
+    interval_local_to_absolute, intervals_product_batch, intervals_diff_batch, integrator_interval_batch, \
+    vector_interval_section_batch, interval_absolute_to_local_batch, interval_cos_batch, interval_sin_batch
 from highway_env.road.road import Route, LaneIndex, Road
 from highway_env.road.objects import RoadObject
 from highway_env.types import Vector
@@ -91,88 +91,110 @@ class IntervalVehicle(LinearVehicle):
             Step the interval observer dynamics
         :param dt: timestep [s]
         """
-        # Input state intervals
-        position_i = self.interval.position
-        v_i = self.interval.speed
-        psi_i = self.interval.heading
+        IntervalVehicle.observer_step_batch([self], dt)
+
+    @staticmethod
+    def observer_step_batch(vehicles: List["IntervalVehicle"], dt: float) -> None:
+        """
+            Step the interval observer dynamics of several vehicles at once.
+
+            The interval states of all vehicles are stacked into arrays of shape (N, 2, ...), whose second axis holds
+            the [min, max] bounds, and propagated in a single pass of batched interval arithmetic.
+        :param vehicles: the interval vehicles
+        :param dt: timestep [s]
+        """
+        if not vehicles:
+            return
+        position_i = np.array([v.interval.position for v in vehicles])
+        v_i = np.array([v.interval.speed for v in vehicles])
+        psi_i = np.array([v.interval.heading for v in vehicles])
+        position_i, v_i, psi_i = IntervalVehicle._observer_integration(vehicles, position_i, v_i, psi_i, dt)
+        for k, v in enumerate(vehicles):
+            v.interval.position, v.interval.speed, v.interval.heading = position_i[k], v_i[k], psi_i[k]
 
-        # Features interval
-        front_interval = self.get_front_interval()
+    @staticmethod
+    def _observer_integration(vehicles: List["IntervalVehicle"], position_i: np.ndarray, v_i: np.ndarray,
+                              psi_i: np.ndarray, dt: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+            Integrate the interval observer dynamics over a timestep, for a batch of vehicles and state intervals.
+
+            The features that depend on the road, such as the front vehicle interval and the followed lanes frames, are
+            gathered for each vehicle, and the interval arithmetic is then performed on the whole batch.
+        :param vehicles: the N interval vehicles, which may be repeated
+        :param position_i: the position intervals, of shape (N, 2, 2)
+        :param v_i: the speed intervals, of shape (N, 2)
+        :param psi_i: the heading intervals, of shape (N, 2)
+        :param dt: timestep [s]
+        :return: the position, speed and heading intervals at the next timestep
+        """
+        n = len(vehicles)
+        theta_a_i = np.array([v.theta_a_i for v in vehicles])
+        theta_b_i = np.array([v.theta_b_i for v in vehicles])
+        target_speed = np.array([v.target_speed for v in vehicles])[:, np.newaxis]
 
         # Acceleration features
-        phi_a_i = np.zeros((2, 3))
-        phi_a_i[:, 0] = [0, 0]
-        if front_interval:
-            phi_a_i[:, 1] = interval_negative_part(
-                intervals_diff(front_interval.speed, v_i))
+        phi_a_i = np.zeros((n, 2, 3))
+        front_intervals = [v.get_front_interval() for v in vehicles]
+        front = [k for k in range(n) if front_intervals[k]]
+        if front:
+            front_position_i = np.array([front_intervals[k].position for k in front])
+            front_speed_i = np.array([front_intervals[k].speed for k in front])
+            phi_a_i[front, :, 1] = interval_negative_part(intervals_diff_batch(front_speed_i, v_i[front]))
             # Lane distance interval
-            lane_psi = self.lane.heading_at(self.lane.local_coordinates(self.position)[0])
-            lane_direction = [np.cos(lane_psi), np.sin(lane_psi)]
-            diff_i = intervals_diff(front_interval.position, position_i)
-            d_i = vector_interval_section(diff_i, lane_direction)
-
-            d_safe_i = self.DISTANCE_WANTED + self.TIME_WANTED * v_i
-            phi_a_i[:, 2] = interval_negative_part(intervals_diff(d_i, d_safe_i))
-
-        # Steering features
-        phi_b_i = None
-        lanes = self.get_followed_lanes()
-        for lane_index in lanes:
-            lane = self.road.network.get_lane(lane_index)
-            longitudinal_pursuit = lane.local_coordinates(self.position)[0] + self.speed * self.PURSUIT_TAU
-            lane_psi = lane.heading_at(longitudinal_pursuit)
-            _, lateral_i = interval_absolute_to_local(position_i, lane)
-            lateral_i = -np.flip(lateral_i)
-            i_v_i = 1/np.flip(v_i, 0)
-            phi_b_i_lane = np.transpose(np.array([
-                [0, 0],
-                intervals_product(lateral_i, i_v_i)]))
-            # Union of candidate feature intervals
-            if phi_b_i is None:
-                phi_b_i = phi_b_i_lane
-            else:
-                phi_b_i[0] = np.minimum(phi_b_i[0], phi_b_i_lane[0])
-                phi_b_i[1] = np.maximum(phi_b_i[1], phi_b_i_lane[1])
+            lane_psi = np.array([vehicles[k].lane.heading_at(vehicles[k].lane.local_coordinates(
+                vehicles[k].position)[0]) for k in front])
+            lane_direction = np.stack([np.cos(lane_psi), np.sin(lane_psi)], axis=1)
+            diff_i = intervals_diff_batch(front_position_i, position_i[front])
+            d_i = vector_interval_section_batch(diff_i, lane_direction)
+            d_safe_i = np.array([[v.DISTANCE_WANTED] for v in vehicles])[front] \
+                + np.array([[v.TIME_WANTED] for v in vehicles])[front] * v_i[front]
+            phi_a_i[front, :, 2] = interval_negative_part(intervals_diff_batch(d_i, d_safe_i))
+
+        # Steering features, as the union of candidate feature intervals over the followed lanes
+        owners, lanes, lane_psi = [], [], np.zeros(n)
+        for k, v in enumerate(vehicles):
+            for lane_index in v.get_followed_lanes():
+                lane = v.road.network.get_lane(lane_index)
+                longitudinal_pursuit = lane.local_coordinates(v.position)[0] + v.speed * v.PURSUIT_TAU
+                lane_psi[k] = lane.heading_at(longitudinal_pursuit)
+                owners.append(k)
+                lanes.append(lane)
+        _, lateral_i = interval_absolute_to_local_batch(position_i[owners], lanes)
+        lateral_i = -np.flip(lateral_i, axis=1)
+        i_v_i = 1/np.flip(v_i[owners], axis=1)
+        phi_b_i_lanes = intervals_product_batch(lateral_i, i_v_i)
+        phi_b_i = np.zeros((n, 2, 2))
+        phi_b_i[:, 0, 1], phi_b_i[:, 1, 1] = np.inf, -np.inf
+        np.minimum.at(phi_b_i[:, 0, 1], owners, phi_b_i_lanes[:, 0])
+        np.maximum.at(phi_b_i[:, 1, 1], owners, phi_b_i_lanes[:, 1])
 
         # Commands interval
-        a_i = intervals_product(self.theta_a_i, phi_a_i)
-        b_i = intervals_product(self.theta_b_i, phi_b_i)
+        a_i = intervals_product_batch(theta_a_i, phi_a_i).sum(axis=-1)
+        b_i = intervals_product_batch(theta_b_i, phi_b_i).sum(axis=-1)
 
         # Speeds interval
-        keep_stability = False
-        if keep_stability:
-            dv_i = integrator_interval(v_i - self.target_speed, self.theta_a_i[:, 0])
-        else:
-            dv_i = intervals_product(self.theta_a_i[:, 0], self.target_speed - np.flip(v_i, 0))
+        dv_i = intervals_product_batch(theta_a_i[:, :, 0], target_speed - np.flip(v_i, axis=1))
         dv_i += a_i
-        dv_i = np.clip(dv_i, -self.ACC_MAX, self.ACC_MAX)
-        keep_stability = True
-        if keep_stability:
-            delta_psi = list(map(utils.wrap_to_pi, psi_i - lane_psi))
-            d_psi_i = integrator_interval(delta_psi, self.theta_b_i[:, 0])
-        else:
-            d_psi_i = intervals_product(self.theta_b_i[:, 0], lane_psi - np.flip(psi_i, 0))
+        acc_max = np.array([[v.ACC_MAX] for v in vehicles])
+        dv_i = np.clip(dv_i, -acc_max, acc_max)
+        delta_psi = utils.wrap_to_pi(psi_i - lane_psi[:, np.newaxis])
+        d_psi_i = integrator_interval_batch(delta_psi, theta_b_i[:, :, 0])
         d_psi_i += b_i
 
         # Position interval
-        cos_i = [-1 if psi_i[0] <= np.pi <= psi_i[1] else min(map(np.cos, psi_i)),
-                 1 if psi_i[0] <= 0 <= psi_i[1] else max(map(np.cos, psi_i))]
-        sin_i = [-1 if psi_i[0] <= -np.pi/2 <= psi_i[1] else min(map(np.sin, psi_i)),
-                 1 if psi_i[0] <= np.pi/2 <= psi_i[1] else max(map(np.sin, psi_i))]
-        dx_i = intervals_product(v_i, cos_i)
-        dy_i = intervals_product(v_i, sin_i)
+        dx_i = intervals_product_batch(v_i, interval_cos_batch(psi_i))
+        dy_i = intervals_product_batch(v_i, interval_sin_batch(psi_i))
 
         # Interval dynamics integration
-        self.interval.speed += dv_i * dt
-        self.interval.heading += d_psi_i * dt
-        self.interval.position[:, 0] += dx_i * dt
-        self.interval.position[:, 1] += dy_i * dt
+        v_i = v_i + dv_i * dt
+        psi_i = psi_i + d_psi_i * dt
+        position_i = position_i + np.stack([dx_i, dy_i], axis=-1) * dt
 
         # Add noise
         noise = 1
-        self.interval.position[:, 0] += noise * dt * np.array([-1, 1])
-        self.interval.position[:, 1] += noise * dt * np.array([-1, 1])
-        self.interval.heading += noise * dt * np.array([-1, 1])
+        position_i += noise * dt * np.array([-1, 1])[:, np.newaxis]
+        psi_i += noise * dt * np.array([-1, 1])
+        return position_i, v_i, psi_i
 
     def predictor_step(self, dt: float) -> None:
         """
@@ -275,8 +297,7 @@ class IntervalVehicle(LinearVehicle):
     @staticmethod
     def parameter_box_to_polytope(parameter_box: np.ndarray, structure: Callable) -> Polytope:
         a, phi = structure()
-        a_theta = lambda params: a + np.tensordot(phi, params, axes=[0, 0])
-        return polytope(a_theta, parameter_box)
+        return affine_polytope(a, phi, parameter_box)
 
     def get_front_interval(self) -> "VehicleInterval":
         # TODO: For now, we assume the front vehicle follows the models' front vehicle
@@ -327,30 +348,41 @@ class IntervalVehicle(LinearVehicle):
         :param dt: timestep [s]
         :param alpha: ratio of the full interval that defines the boundaries
         """
+        IntervalVehicle.partial_observer_step_batch([self], dt, alpha)
+
+    @staticmethod
+    def partial_observer_step_batch(vehicles: List["IntervalVehicle"], dt: float, alpha: float = 0) -> None:
+        """
+            Step the boundary parts of the current state intervals of several vehicles at once.
+
+            The lower and upper intervals of all vehicles are propagated together, in a batch of size 2N.
+        :param vehicles: the interval vehicles
+        :param dt: timestep [s]
+        :param alpha: ratio of the full interval that defines the boundaries
+        """
+        if not vehicles:
+            return
+        n = len(vehicles)
+        position_i = np.array([v.interval.position for v in vehicles])
+        v_i = np.array([v.interval.speed for v in vehicles])
+        psi_i = np.array([v.interval.heading for v in vehicles])
+
         # 1. Split x_i(t) into two upper and lower intervals x_i_-(t) and x_i_+(t)
-        o = self.interval
-        v_minus = IntervalVehicle.create_from(self)
-        v_minus.interval = copy.deepcopy(self.interval)
-        v_minus.interval.position[1, :] = (1 - alpha) * o.position[0, :] + alpha * o.position[1, :]
-        v_minus.interval.speed[1] = (1 - alpha) * o.speed[0] + alpha * o.speed[1]
-        v_minus.interval.heading[1] = (1 - alpha) * o.heading[0] + alpha * o.heading[1]
-        v_plus = IntervalVehicle.create_from(self)
-        v_plus.interval = copy.deepcopy(self.interval)
-        v_plus.interval.position[0, :] = alpha * o.position[0, :] + (1 - alpha) * o.position[1, :]
-        v_plus.interval.speed[0] = alpha * o.speed[0] + (1 - alpha) * o.speed[1]
-        v_plus.interval.heading[0] = alpha * o.heading[0] + (1 - alpha) * o.heading[1]
+        position_i, v_i, psi_i = np.concatenate([position_i] * 2), np.concatenate([v_i] * 2), \
+            np.concatenate([psi_i] * 2)
+        for x_i in [position_i, v_i, psi_i]:
+            x_i_m, x_i_M = x_i[:n, 0].copy(), x_i[:n, 1].copy()
+            x_i[:n, 1] = (1 - alpha) * x_i_m + alpha * x_i_M
+            x_i[n:, 0] = alpha * x_i_m + (1 - alpha) * x_i_M
+
         # 2. Propagate their observer dynamics x_i_-(t+dt) and x_i_+(t+dt)
-        v_minus.road = copy.copy(v_minus.road)
-        v_minus.road.vehicles = [v if v is not self else v_minus for v in v_minus.road.vehicles]
-        v_plus.road = copy.copy(v_plus.road)
-        v_plus.road.vehicles = [v if v is not self else v_plus for v in v_plus.road.vehicles]
-        v_minus.observer_step(dt)
-        v_plus.observer_step(dt)
+        position_i, v_i, psi_i = IntervalVehicle._observer_integration(vehicles * 2, position_i, v_i, psi_i, dt)
+
         # 3. Merge the resulting intervals together to x_i(t+dt).
-        self.interval.position = np.array([v_minus.interval.position[0], v_plus.interval.position[1]])
-        self.interval.speed = np.array([v_minus.interval.speed[0], v_plus.interval.speed[1]])
-        self.interval.heading = np.array([min(v_minus.interval.heading[0], v_plus.interval.heading[0]),
-                                          max(v_minus.interval.heading[1], v_plus.interval.heading[1])])
+        for k, v in enumerate(vehicles):
+            v.interval.position = np.array([position_i[k, 0], position_i[n + k, 1]])
+            v.interval.speed = np.array([v_i[k, 0], v_i[n + k, 1]])
+            v.interval.heading = np.array([min(psi_i[k, 0], psi_i[n + k, 0]), max(psi_i[k, 1], psi_i[n + k, 1])])
 
     def store_trajectories(self) -> None:
         """
@@ -1,7 +1,9 @@
 import gym
+import numpy as np
 import pytest
 
 import highway_env
+from highway_env import counters
 
 envs = [
     "highway-v0",
@@ -27,3 +29,126 @@ def test_env_step(env_spec):
 
     assert env.observation_space.contains(obs)
 
+
+
+@pytest.mark.parametrize("env_spec", ["merge-v0", "roundabout-v0", "intersection-v0"])
+def test_scene_cache(env_spec):
+    env = gym.make(env_spec)
+    env.reset()
+    network = env.road.network
+    env.reset()
+    env.close()
+
+    assert env.road.network is network
+
+
+def test_traffic_cache():
+    env = gym.make("intersection-v0")
+    env.configure({"cache_traffic": True})
+    observations = []
+    for _ in range(2):
+        env.seed(42)
+        with counters.counting() as scope:
+            obs = env.reset()
+        obs, _, _, _ = env.step(1)
+        observations.append(obs)
+    env.close()
+
+    assert scope["scene_cache.traffic.hits"] == 1
+    assert (observations[0] == observations[1]).all()
+
+
+@pytest.mark.parametrize("order", ["sorted", "shuffled"])
+def test_replay(order, tmp_path):
+    from highway_env.envs.common.replay import TraceRecorder, EpisodeReplay, EpisodeTrace
+
+    env = gym.make("highway-v0")
+    env.configure({"vehicles_count": 10, "observation": {"type": "Kinematics", "order": order}})
+    env = TraceRecorder(env, checkpoint_period=4)
+    env.seed(3)
+    env.reset()
+    env.step(3)
+    env.reset()
+    positions = [env.unwrapped.vehicle.position.copy()]
+    for action in [0, 3, 1, 2, 4, 1, 1, 0, 3]:
+        env.step(action)
+        positions.append(env.unwrapped.vehicle.position.copy())
+    env.close()
+    trace = env.traces[-1]
+    assert len(trace) == 9 and sorted(trace.checkpoints) == [0, 4, 8]
+
+    replay = EpisodeReplay(trace)
+    for step in [9, 6, 0]:
+        assert (replay.env_at(step).vehicle.position == positions[step]).all()
+    path = str(tmp_path / "trace.pkl")
+    trace.save(path, checkpoints=False)
+    replay = EpisodeReplay(EpisodeTrace.load(path))
+    assert (replay.env_at(7).vehicle.position == positions[7]).all()
+    assert replay.skip_observations == (order == "sorted")
+
+
+def test_replay_parking():
+    from highway_env.envs.common.replay import TraceRecorder, EpisodeReplay
+
+    env = TraceRecorder(gym.make("parking-v0"))
+    env.seed(0)
+    env.reset()
+    for _ in range(3):
+        env.step(env.action_space.sample())
+    position = env.unwrapped.vehicle.position.copy()
+    env.close()
+
+    replay = EpisodeReplay(env.traces[-1])
+    assert (replay.env_at(3).vehicle.position == position).all()
+    assert not replay.skip_observations  # The parking rewards and terminal states read the observation
+
+
+@pytest.mark.parametrize("env_spec", envs)
+def test_profiling(env_spec):
+    env = gym.make(env_spec)
+    env.reset()
+    _, _, _, info = env.step(env.action_space.sample())
+    assert "profile" not in info and "counts" not in info and env.get_profile() == {}
+
+    env.configure({"profiling": True})
+    env.reset()
+    for _ in range(2):
+        _, _, _, info = env.step(env.action_space.sample())
+    env.close()
+    profile = env.get_profile()
+    assert {"simulate", "reward", "terminal", env.unwrapped.observe_phase} <= set(info["profile"])
+    assert isinstance(info["counts"], dict)
+    assert any(phase.startswith("simulate/step/") for phase in profile)
+    assert profile["simulate"]["calls"] == 2
+    assert profile["simulate"]["total"] >= info["profile"]["simulate"] > 0
+
+
+def test_simplified_kinematics():
+    env = gym.make("highway-v0")
+    env.configure({"observation": {"type": "SimplifiedKinematics", "lanes_count": 1, "normalize": False}})
+    env.seed(0)
+    obs = env.reset()
+    for _ in range(3):
+        obs, _, _, _ = env.step(env.action_space.sample())
+    env.close()
+    env = env.unwrapped
+    assert obs.shape == env.observation_space.shape
+
+    observation = obs.reshape((-1, 2))
+    ego = env.vehicle
+    assert np.array_equal(observation[0], [ego.lane_index[2], ego.velocity[0]])
+    lanes_count = len(env.road.network.all_side_lanes(ego.lane_index))
+    padding = env.observation.features_range["x"]
+    for k, lane in enumerate(range(ego.lane_index[2] - 1, ego.lane_index[2] + 2)):
+        lane = min(max(lane, 0), lanes_count - 1)
+        others = [v for v in env.road.vehicles if v is not ego and v.lane_index[2] == lane
+                  and np.linalg.norm(v.position - ego.position) < env.PERCEPTION_DISTANCE]
+        rear = [v for v in others if 0.8 * padding[0] + 0.2 < v.position[0] - ego.position[0] < 0]
+        front = [v for v in others if 0 < v.position[0] - ego.position[0] < 0.8 * padding[1] - 0.2]
+        for slot, vehicles, closest, pad in [(1 + 2 * k, rear, max, padding[0]), (2 + 2 * k, front, min, padding[1])]:
+            if vehicles:
+                v = closest(vehicles, key=lambda v: v.position[0])
+                assert observation[slot] == pytest.approx([v.position[0] - ego.position[0],
+                                                           v.velocity[0] - ego.velocity[0]])
+            else:
+                assert abs(observation[slot, 0] - 0.8 * pad) < 0.2
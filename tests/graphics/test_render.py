@@ -33,3 +33,204 @@ def test_obs_grayscale(env_spec):
     env.close()
     assert isinstance(obs, np.ndarray)
     assert obs.shape == (env.config["screen_width"], env.config["screen_height"], 4)
+
+
+@pytest.mark.parametrize("env_spec", envs)
+def test_road_layer_cache(env_spec):
+    import pygame
+    from highway_env.road.graphics import RoadGraphics
+
+    env = gym.make(env_spec)
+    env.configure({"offscreen_rendering": True})
+    env.render(mode="rgb_array")
+    surface = env.viewer.sim_surface
+    RoadGraphics.display(env.road, surface, cached=False)
+    drawn = pygame.surfarray.array3d(surface)
+    RoadGraphics.display(env.road, surface, cached=True)
+    cached = pygame.surfarray.array3d(surface)
+    env.close()
+    assert (drawn != cached).any(axis=-1).mean() < 1e-2
+
+
+@pytest.mark.parametrize("env_spec", envs)
+def test_obs_grayscale_headless(env_spec):
+    env = gym.make(env_spec)
+    env.configure({
+        "observation": {
+            "type": "GrayscaleObservation",
+            "weights": [0.2989, 0.5870, 0.1140],
+            "stack_size": 4,
+            "observation_shape": (84, 84),
+            "headless": True
+        }
+    })
+    obs = env.reset()
+    obs, _, _, _ = env.step(env.action_space.sample())
+    env.close()
+    assert env.viewer is None
+    assert obs.shape == (84, 84, 4)
+    assert len(np.unique(obs[..., -1])) > 2  # road, lines and vehicles
+
+
+@pytest.mark.parametrize("dtype", ["uint8", "float32"])
+def test_obs_grayscale_stack(dtype):
+    env = gym.make("highway-v0")
+    env.configure({
+        "observation": {
+            "type": "GrayscaleObservation",
+            "weights": [0.2989, 0.5870, 0.1140],
+            "stack_size": 4,
+            "observation_shape": (84, 84),
+            "headless": True,
+            "dtype": dtype
+        }
+    })
+    env.reset()
+    frames = []
+    for _ in range(6):
+        obs, _, _, _ = env.step(env.action_space.sample())
+        frames.append(env.observation.rasterizer.buffer.copy().reshape((84, 84)))
+    env.close()
+    assert obs.dtype == np.dtype(dtype)
+    assert env.observation_space.contains(obs)
+    assert np.array_equal(obs, np.stack(frames[-4:], axis=-1))
+
+
+def test_rasterizer_tiles_across_resets():
+    from highway_env import counters
+
+    env = gym.make("merge-v0")
+    env.configure({
+        "observation": {
+            "type": "GrayscaleObservation",
+            "weights": [0.2989, 0.5870, 0.1140],
+            "stack_size": 4,
+            "observation_shape": (84, 84),
+            "headless": True
+        }
+    })
+    env.seed(0)
+    env.reset()
+    with counters.counting() as scope:
+        env.reset()
+    env.close()
+    assert scope.get("rasterizer.tiles.hits", 0) > 0 and "rasterizer.tiles.misses" not in scope
+
+
+@pytest.mark.parametrize("view", [False, True])
+def test_obs_grayscale_view(view):
+    env = gym.make("highway-v0")
+    env.configure({
+        "observation": {
+            "type": "GrayscaleObservation",
+            "weights": [0.2989, 0.5870, 0.1140],
+            "stack_size": 4,
+            "observation_shape": (84, 84),
+            "headless": True,
+            "view": view
+        }
+    })
+    obs = env.reset()
+    kept = obs.copy()
+    for _ in range(2):
+        env.step(env.action_space.sample())
+    env.close()
+    assert np.shares_memory(obs, env.observation.frames) == view
+    assert np.array_equal(obs, kept) != view  # A view changes under the caller at the next step
+
+
+def test_vehicle_sprites_cache():
+    import pygame
+    from highway_env.vehicle.graphics import VehicleGraphics
+
+    env = gym.make("highway-v0")
+    env.configure({"offscreen_rendering": True})
+    env.render(mode="rgb_array")
+    surface = env.viewer.sim_surface
+    VehicleGraphics.sprites.clear()
+    VehicleGraphics.rotations.clear()
+    VehicleGraphics.display_batch(env.road.vehicles, surface, offscreen=True)
+    first = pygame.surfarray.array3d(surface)
+    sprites, rotations = len(VehicleGraphics.sprites), len(VehicleGraphics.rotations)
+    for vehicle in env.road.vehicles:
+        VehicleGraphics.display(vehicle, surface, offscreen=True)
+    second = pygame.surfarray.array3d(surface)
+    env.close()
+    assert 0 < sprites <= len(env.road.vehicles)
+    assert (sprites, rotations) == (len(VehicleGraphics.sprites), len(VehicleGraphics.rotations))
+    assert np.array_equal(first, second)
+
+
+def test_async_video_recorder(tmp_path):
+    from highway_env.envs.common.rasterizer import Rasterizer
+    from highway_env.envs.common.video import AsyncVideoRecorder
+
+    class Writer(object):
+        def __init__(self, path, frame_shape, fps):
+            self.path, self.frames, self.closed = path, [], False
+            writers.append(self)
+
+        def capture_frame(self, frame):
+            self.frames.append(frame)
+
+        def close(self):
+            self.closed = True
+
+    writers = []
+    env = gym.make("highway-v0")
+    env.configure({"vehicles_count": 10})
+    env.seed(0)
+    env = AsyncVideoRecorder(env, str(tmp_path), queue_size=4, make_writer=Writer)
+    env.reset()
+    expected = Rasterizer.from_env(env.unwrapped).render(env.unwrapped).copy()
+    for _ in range(2):
+        env.step(1)
+    env.reset()
+    env.close()
+    frames = env.unwrapped.config["simulation_frequency"] // env.unwrapped.config["policy_frequency"]
+    assert [len(w.frames) for w in writers] == [1 + 2 * frames, 1]
+    assert all(w.closed for w in writers) and writers[1].path.endswith("episode_00001.mp4")
+    assert np.array_equal(writers[0].frames[0], expected)
+    assert not np.array_equal(writers[0].frames[0], writers[0].frames[-1])
+
+
+def test_rendering_callbacks():
+    env = gym.make("highway-v0")
+    env.configure({"vehicles_count": 5})
+    env.reset()
+    calls = {"automatic": 0, "frame": 0}
+    env.unwrapped.automatic_rendering_callback = lambda: calls.update(automatic=calls["automatic"] + 1)
+    env.unwrapped.frame_callback = lambda: calls.update(frame=calls["frame"] + 1)
+    time = env.unwrapped.time
+    env.step(1)
+    env.close()
+    assert calls["automatic"] == 0  # Only called while a viewer is rendering
+    assert calls["frame"] == env.unwrapped.time - time > 0
+
+
+def test_tiled_viewer():
+    import pygame
+    from highway_env.envs.common.graphics import TiledEnvViewer
+    from highway_env.road.graphics import RoadGraphics, WorldSurface
+
+    envs = [gym.make(env_spec).unwrapped for env_spec in ["highway-v0", "merge-v0", "roundabout-v0"]]
+    for env in envs:
+        env.step(env.action_space.sample())
+    viewer = TiledEnvViewer(envs, columns=2)
+    viewer.display()
+    image = viewer.get_image()
+    width, height = envs[0].config["screen_width"], envs[0].config["screen_height"]
+    assert image.shape == (2 * height, 2 * width, 3)
+    assert not image[height:, width:].any()  # unused tile
+
+    tiles = viewer.get_images()
+    assert all(tile.base is tiles[0].base for tile in tiles)
+    for env, tile in zip(envs, tiles):
+        surface = WorldSurface((width, height), 0, pygame.Surface((width, height)))
+        surface.scaling, surface.centering_position = env.config["scaling"], env.config["centering_position"]
+        surface.move_display_window_to(env.vehicle.position)
+        RoadGraphics.display(env.road, surface)
+        RoadGraphics.display_road_objects(env.road, surface, offscreen=True)
+        RoadGraphics.display_traffic(env.road, surface, offscreen=True)
+        expected = np.moveaxis(pygame.surfarray.array3d(surface), 0, 1)
+        assert (tile != expected).any(axis=-1).mean() < 1e-2
@@ -1,6 +1,7 @@
+import numpy as np
 import pytest
 
-from highway_env.road.lane import StraightLane
+from highway_env.road.lane import StraightLane, SineLane, CircularLane
 from highway_env.road.road import Road, RoadNetwork
 from highway_env.vehicle.controller import ControlledVehicle
 
@@ -32,3 +33,76 @@ def test_network():
             lane_index = v.target_lane_index
             lane_changes += 1
     assert lane_changes >= 3
+
+
+LANES = [
+    StraightLane([0, 0], [10, 5]),
+    SineLane([0, 0], [50, 0], amplitude=3, pulsation=0.2, phase=0.5),
+    CircularLane([0, 0], radius=20, start_phase=0, end_phase=np.pi / 2),
+    CircularLane([0, 0], radius=20, start_phase=np.pi, end_phase=0, clockwise=False),
+]
+
+
+@pytest.mark.parametrize("lane", LANES)
+def test_local_coordinates_batch(lane):
+    positions = np.random.RandomState(0).uniform(-30, 30, size=(20, 2))
+    longitudinal, lateral = lane.local_coordinates_batch(positions)
+    expected = np.array([lane.local_coordinates(position) for position in positions])
+    assert np.allclose(longitudinal, expected[:, 0])
+    assert np.allclose(lateral, expected[:, 1])
+
+
+@pytest.mark.parametrize("lane", LANES)
+def test_position_batch(lane):
+    longitudinal, lateral = np.random.RandomState(0).uniform(-30, 30, size=(2, 20))
+    assert np.allclose(lane.position_batch(longitudinal, lateral),
+                       [lane.position(s, r) for s, r in zip(longitudinal, lateral)])
+    assert np.allclose(lane.heading_at_batch(longitudinal), [lane.heading_at(s) for s in longitudinal])
+
+
+def test_position_heading_along_route_batch():
+    net = RoadNetwork()
+    net.add_lane("a", "b", StraightLane([0, 0], [100, 0]))
+    net.add_lane("b", "c", CircularLane([100, 20], radius=20, start_phase=-np.pi / 2, end_phase=0))
+    net.add_lane("c", "d", StraightLane([120, 20], [120, 100]))
+    net.add_lane("c", "d", StraightLane([124, 20], [124, 100]))
+    route = [("a", "b", 0), ("b", "c", None), ("c", "d", 1)]
+    longitudinal = np.linspace(-10, 250, 50)
+    positions, headings = net.position_heading_along_route_batch(route, longitudinal, 1)
+    expected = [net.position_heading_along_route(route, s, 1) for s in longitudinal]
+    assert np.allclose(positions, [position for position, _ in expected])
+    assert np.allclose(headings, [heading for _, heading in expected])
+    assert net.route_lengths(route) is net.route_lengths(route)
+    net.add_lane("d", "e", StraightLane([120, 100], [120, 200]))
+    assert not net.route_lengths_cache
+
+    # The lane of an unspecified id on a multi-lane road is unknown
+    route = [("a", "b", 0), ("b", "c", None), ("c", "d", None)]
+    net.position_heading_along_route_batch(route, [100], 0)
+    with pytest.raises(TypeError):
+        net.position_heading_along_route_batch(route, [200], 0)
+
+
+def test_dump(tmp_path):
+    from highway_env.logger import ColumnarLogger
+    from highway_env.vehicle.behavior import IDMVehicle
+
+    road = Road(RoadNetwork.straight_road_network(2))
+    road.vehicles.extend([IDMVehicle(road, [0, 0], speed=20), IDMVehicle(road, [20, 0], speed=10)])
+    road.logger = ColumnarLogger(chunk_size=3)
+    for k in range(5):
+        road.act()
+        road.step(0.1)
+        road.dump(neighbours=(k == 4))
+    log = road.get_log()
+    assert len(log) == 10
+    assert np.array_equal(log["step"], np.repeat(np.arange(5), 2))
+    assert np.allclose(log["x"].iloc[-2:], [v.position[0] for v in road.vehicles])
+    assert log["front_distance"].isna().sum() == 9
+    path = str(tmp_path / "log.npz")
+    road.logger.save(path)
+    assert ColumnarLogger.load(path).equals(log)
+
+    road.vehicles[0].dump()
+    road.vehicles[0].dump(neighbours=True)
+    assert list(road.vehicles[0].get_log()["v"]) == [road.vehicles[0].speed] * 2
@@ -0,0 +1,30 @@
+import json
+
+import numpy as np
+import pytest
+
+from highway_env.benchmarks import envs
+
+
+def test_benchmark_envs():
+    results = envs.run(envs=["lane-keeping-v0"], observations=["default", "TimeToCollision"], steps=3, resets=1,
+                       verbose=False)
+    result, = results["results"]
+    assert set(envs.METRICS) <= set(result) and result["peak_memory_mb"] > 0
+    json.dumps(results, allow_nan=False)
+    assert envs.compare(results, results) == []
+    slower = {"results": [dict(result, steps_per_sec=result["steps_per_sec"] / 2)]}
+    assert len(envs.compare(results, slower)) == 1
+
+
+def test_benchmark_kernels():
+    from highway_env.benchmarks import kernels
+
+    results = kernels.run(sizes=[2, 4], repeat=1, verbose=False)
+    assert [r["kernel"] for r in results["results"]] == list(kernels.KERNELS)
+    assert all(len(r["durations_us"]) == 2 and np.isfinite(r["slope"]) for r in results["results"])
+    assert kernels.scaling_slope([1, 2, 4], [1, 4, 16]) == pytest.approx(2)
+    road_step = kernels.road_step(4, np.random.RandomState(0))
+    road = road_step.setup()
+    road_step(road)
+    assert not np.allclose(road.vehicles[0].position, road_step.setup().vehicles[0].position)
@@ -0,0 +1,64 @@
+import threading
+
+import gym
+import numpy as np
+import pytest
+
+import highway_env
+from highway_env import counters
+from highway_env.road.lane import StraightLane
+
+
+def test_counting():
+    lane = StraightLane([0, 0], [100, 0])
+    with counters.counting() as scope:
+        for _ in range(3):
+            lane.local_coordinates(np.array([10, 1]))
+        lane.local_coordinates_batch(np.zeros((10, 2)))
+    assert scope == {"local_coordinates": 3, "local_coordinates_batch": 1}
+    assert counters.hit_rate({"cache.hits": 3, "cache.misses": 1}, "cache") == pytest.approx(0.75)
+    assert np.isnan(counters.hit_rate({}, "cache"))
+
+
+def test_counting_disabled():
+    lane = StraightLane([0, 0], [100, 0])
+    enabled, counters.enabled = counters.enabled, False
+    try:
+        before = counters.snapshot()
+        lane.local_coordinates(np.array([10, 1]))
+        assert counters.since(before) == {}
+        with counters.counting():
+            assert counters.enabled
+        assert not counters.enabled
+    finally:
+        counters.enabled = enabled
+
+
+def test_concurrent_counting():
+    def work():
+        for _ in range(10000):
+            counters.increment("concurrent")
+
+    with counters.counting() as scope:
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert scope["concurrent"] == 40000
+
+
+def test_step_budget():
+    env = gym.make("highway-v0")
+    env.configure({"vehicles_count": 10, "profiling": True})
+    env.seed(0)
+    env.reset()
+    _, _, _, info = env.step(1)
+    env.close()
+    frames = env.config["simulation_frequency"] // env.config["policy_frequency"]
+    vehicles = len(env.road.vehicles)
+    assert info["counts"]["check_collision"] == frames * vehicles ** 2
+    assert info["counts"]["get_closest_lane_index"] <= frames * vehicles
+    assert info["counts"]["neighbour_vehicles"] <= 2 * frames * vehicles
+    assert info["counts"]["local_coordinates"] <= 40 * frames * vehicles
+    assert all(env.get_counts()[key] >= count for key, count in info["counts"].items())
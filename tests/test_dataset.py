@@ -0,0 +1,70 @@
+import gym
+import numpy as np
+import pytest
+
+import highway_env
+from highway_env.dataset import DatasetRecorder, DatasetReader
+
+
+def test_dataset(tmp_path):
+    env = gym.make("highway-v0")
+    env.configure({"vehicles_count": 5})
+    env = DatasetRecorder(env, str(tmp_path), shard_size=7, info_keys=["speed", "crashed"])
+    env.seed(0)
+    observations, actions, rewards = [], [], []
+    obs, done = env.reset(), False
+    for _ in range(20):
+        action = env.action_space.sample()
+        observations.append(obs)
+        actions.append(action)
+        obs, reward, done, info = env.step(action)
+        rewards.append(reward)
+        if done:
+            obs = env.reset()
+    env.close()
+
+    dataset = DatasetReader(str(tmp_path))
+    assert len(dataset) == 20
+    assert len(dataset.shards) == 3
+    batch = dataset[np.arange(20)]
+    assert np.array_equal(batch["observations"], np.array(observations, dtype=batch["observations"].dtype))
+    assert np.array_equal(batch["actions"], actions)
+    assert np.allclose(batch["rewards"], rewards)
+    continued = ~batch["dones"][:-1]
+    assert np.array_equal(batch["next_observations"][:-1][continued], batch["observations"][1:][continued])
+    slices = dataset.slice(5, 16)
+    assert [len(s["rewards"]) for s in slices] == [2, 7, 2]
+    assert np.shares_memory(slices[1]["observations"], dataset.shards[1]["observations"])
+    assert set(dataset.sample(8)) == set(dataset.fields)
+
+
+def test_dataset_grayscale(tmp_path):
+    env = gym.make("highway-v0")
+    env.configure({
+        "vehicles_count": 5,
+        "observation": {
+            "type": "GrayscaleObservation",
+            "weights": [0.2989, 0.5870, 0.1140],
+            "stack_size": 4,
+            "observation_shape": (84, 84),
+            "headless": True
+        }
+    })
+    env = DatasetRecorder(env, str(tmp_path), info_keys=["speed", "crashed"], info_dtypes={"crashed": "bool"})
+    env.seed(0)
+    env.reset()
+    for _ in range(5):
+        env.step(env.action_space.sample())
+    env.close()
+
+    batch = DatasetReader(str(tmp_path))[np.arange(5)]
+    assert np.array_equal(batch["observations"][1:], batch["next_observations"][:-1])
+    assert batch["info_crashed"].dtype == np.bool_ and batch["info_speed"].dtype == np.float64
+
+
+def test_dataset_info_dtypes(tmp_path):
+    env = DatasetRecorder(gym.make("highway-v0"), str(tmp_path), info_keys=["missing"],
+                          info_dtypes={"missing": "int64"})
+    env.reset()
+    with pytest.raises(ValueError):
+        env.step(env.action_space.sample())
@@ -1,6 +1,7 @@
 import numpy as np
 
-from highway_env.utils import rotated_rectangles_intersect
+from highway_env.utils import rotated_rectangles_intersect, confidence_ellipsoid, is_consistent_dataset, \
+    RecursiveLeastSquares
 
 
 def test_rotated_rectangles_intersect():
@@ -10,3 +11,22 @@ def test_rotated_rectangles_intersect():
     assert not rotated_rectangles_intersect(([0, 0], 2, 1, 0), ([0, 2.1], 2, 1, 0))
     assert not rotated_rectangles_intersect(([0, 0], 2, 1, 0), ([1, 1.1], 2, 1, 0))
     assert rotated_rectangles_intersect(([0, 0], 2, 1, np.pi/4), ([1, 1.1], 2, 1, 0))
+
+
+def test_recursive_least_squares():
+    rng = np.random.RandomState(0)
+    theta = np.array([0.3, -1.2, 2.0])
+    features = list(rng.randn(50, 3))
+    data = {"features": features, "outputs": [theta @ phi + 0.01 * rng.randn() for phi in features]}
+    box = np.array([[-3, -3, -3], [3, 3, 3]])
+    estimator = RecursiveLeastSquares.from_data(data)
+    for online, batch in zip(estimator.ellipsoid(), confidence_ellipsoid(data)):
+        assert np.allclose(online, batch)
+    assert np.allclose(estimator.theta, theta, atol=0.01)
+    assert is_consistent_dataset(dict(data, estimator=estimator), parameter_box=box) \
+        == is_consistent_dataset(data, parameter_box=box)
+
+    data["outputs"][-1] += 10
+    estimator = RecursiveLeastSquares.from_data(data)
+    assert not is_consistent_dataset(dict(data, estimator=estimator), parameter_box=box)
+    assert not is_consistent_dataset(data, parameter_box=box)
@@ -1,8 +1,11 @@
+import itertools
+
+import numpy as np
 import pytest
 
-from highway_env.road.lane import StraightLane
+from highway_env.road.lane import StraightLane, CircularLane
 from highway_env.road.road import Road, RoadNetwork
-from highway_env.vehicle.controller import ControlledVehicle
+from highway_env.vehicle.controller import ControlledVehicle, MDPVehicle
 
 FPS = 15
 
@@ -39,3 +42,21 @@ def test_speed_control():
     assert v.speed == pytest.approx(20 + v.DELTA_SPEED, abs=0.5)
     assert v.position[1] == pytest.approx(0)
     assert v.lane_index[2] == 0
+
+
+def test_predict_trajectories():
+    net = RoadNetwork()
+    for lane_id in range(2):
+        net.add_lane("a", "b", StraightLane([0, 4 * lane_id], [40, 4 * lane_id]))
+    net.add_lane("b", "c", CircularLane([40, 44], radius=40, start_phase=-np.pi / 2, end_phase=0))
+    road = Road(net, np_random=np.random.RandomState(0))
+    v = MDPVehicle(road=road, position=[5, 0], speed=22, heading=0.05)
+    sequences = [list(actions) for actions in itertools.product(["LANE_RIGHT", "IDLE", "FASTER", "SLOWER"], repeat=2)]
+    positions, headings, speeds = v.predict_trajectories(sequences, 1, 1/3, 1/FPS)
+    assert positions.shape == (len(sequences), 6, 2) and headings.shape == speeds.shape == (len(sequences), 6)
+    for k, actions in enumerate(sequences):
+        states = v.predict_trajectory(actions, 1, 1/3, 1/FPS)
+        assert np.allclose(positions[k], [state.position for state in states])
+        assert np.allclose(headings[k], [state.heading for state in states])
+        assert np.allclose(speeds[k], [state.speed for state in states])
+    assert v.position.tolist() == [5, 0] and v.target_lane_index == ("a", "b", 0)
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 
 from highway_env.road.road import Road, RoadNetwork
@@ -72,3 +73,49 @@ def test_collision():
 
     assert v4.crashed is False
     assert l.hit
+
+
+def test_create_random_vehicles():
+    def create(seed):
+        r = Road(RoadNetwork.straight_road_network(4), np_random=np.random.RandomState(seed))
+        r.vehicles.extend(Vehicle.create_random_vehicles(r, 10, spacing=30))
+        return r.vehicles
+
+    vehicles = create(seed=0)
+    assert len(vehicles) == 10
+    assert [v.position.tolist() for v in vehicles] == [v.position.tolist() for v in create(seed=0)]
+    assert [v.speed for v in vehicles] == [v.speed for v in create(seed=0)]
+    assert all(Vehicle.DEFAULT_SPEEDS[0] <= v.speed <= Vehicle.DEFAULT_SPEEDS[1] for v in vehicles)
+    assert np.all(np.diff([v.position[0] for v in vehicles]) > 0)
+
+
+def test_history():
+    r = Road(RoadNetwork.straight_road_network(1), record_history=True)
+    v = Vehicle(road=r, position=[0, 0], speed=20, heading=0)
+    assert v.history.buffer is None and v.history.positions.shape == (0, 2)
+    positions = []
+    for _ in range(Vehicle.HISTORY_SIZE + 5):
+        v.step(dt=1/FPS)
+        positions.append(v.position.copy())
+    assert len(v.history) == Vehicle.HISTORY_SIZE
+    assert np.allclose(v.history.positions, positions[::-1][:Vehicle.HISTORY_SIZE])
+    assert np.allclose(v.history.speeds, 20)
+    assert np.shares_memory(v.history.view(), v.history.buffer)
+
+
+def test_features_array():
+    r = Road(RoadNetwork.straight_road_network(4), np_random=np.random.RandomState(0))
+    vehicles = Vehicle.create_random_vehicles(r, 5, spacing=30)
+    vehicles[1].heading = 0.3
+    vehicles[2].route = [("0", "1", 3)]
+    objects = vehicles + [Obstacle(road=r, position=[10, 4], heading=0.5), Landmark(road=r, position=[20, 0])]
+    for origin in [None, vehicles[0]]:
+        for observe_intentions in [True, False]:
+            expected = [[o.to_dict(origin, observe_intentions)[f] for f in Vehicle.FEATURES] for o in objects]
+            features = Vehicle.features_array(objects, Vehicle.FEATURES, origin, observe_intentions)
+            assert features.shape == (len(objects), len(Vehicle.FEATURES))
+            assert np.allclose(features, expected)
+    assert np.allclose(Vehicle.features_array(objects, ["y", "x"]), [o.position[::-1] for o in objects])
+    assert Vehicle.features_array([], ["x"], vehicles[0]).shape == (0, 1)
+    with pytest.raises(ValueError):
+        Vehicle.features_array(objects, ["lane_index"])
@@ -1,4 +1,12 @@
+import copy
+
+import gym
+import numpy as np
+
+import highway_env
+from highway_env.interval import LPV, polytope, affine_polytope
 from highway_env.road.road import Road, RoadNetwork
+from highway_env.vehicle.uncertainty.estimation import MultipleModelVehicle
 from highway_env.vehicle.uncertainty.prediction import IntervalVehicle
 
 FPS = 15
@@ -22,3 +30,68 @@ def test_predictor():
         assert v.interval.position[0, 0] <= v.position[0] <= v.interval.position[1, 0]
         assert v.interval.position[0, 1] <= v.position[1] <= v.interval.position[1, 1]
         assert v.interval.heading[0] <= v.heading <= v.interval.heading[1]
+
+
+def test_partial_batch():
+    road = Road(RoadNetwork.straight_road_network(lanes=2))
+    vehicles = [IntervalVehicle(road, position=[15 * k, 4 * (k % 2)], speed=20 + k, heading=0.01 * k)
+                for k in range(4)]
+    road.vehicles.extend(vehicles)
+    batch_road = copy.deepcopy(road)
+    for _ in range(FPS):
+        for v in vehicles:
+            v.partial_observer_step(dt=1/FPS)
+        IntervalVehicle.partial_observer_step_batch(batch_road.vehicles, dt=1/FPS)
+    for v, batch_v in zip(vehicles, batch_road.vehicles):
+        assert np.allclose(v.interval.position, batch_v.interval.position)
+        assert np.allclose(v.interval.speed, batch_v.interval.speed)
+        assert np.allclose(v.interval.heading, batch_v.interval.heading)
+
+
+def test_lpv_discretization():
+    a0, da = [[0, 1], [-2, -3]], [[[0, 0], [0.1, 0]]]
+    lpv = LPV(x0=[1, 0], a0=a0, da=da, b=[[0], [1]], d=[[0], [1]], omega_i=[[-0.1], [0.1]], u=[[0.5]])
+    assert LPV(x0=[0, 1], a0=a0, da=da).coordinates is not lpv.coordinates
+    x_i = lpv.x_i_t
+    for _ in range(FPS):
+        if lpv.metzler:
+            x_i = lpv.step_interval_predictor(x_i, dt=1/FPS)
+        else:
+            x_i = lpv.step_naive_predictor(x_i, dt=1/FPS)
+        lpv.step(dt=1/FPS)
+        assert np.allclose(lpv.x_i_t, x_i)
+
+
+def test_affine_polytope():
+    a, phi = np.array([[0, 1], [0, 0]]), np.array([[[0, 0], [0, -1]], [[0, 0], [-1, 0]], [[0, 0], [0, -1]]])
+    box = np.array([[0.5, 1, 0.5], [1.5, 2, 0.5]])
+    a0, da = polytope(lambda params: a + np.tensordot(phi, params, axes=[0, 0]), box)
+    affine_a0, affine_da = affine_polytope(a, phi, box)
+    assert np.allclose(a0, affine_a0)
+    assert len(da) == len(affine_da) == 4
+    assert np.allclose(da, affine_da)
+    assert affine_polytope(a, phi, box)[0] is affine_a0
+    affine_da.clear()
+    assert len(affine_polytope(a, phi, box)[1]) == 4
+
+
+def test_multiple_model_hypotheses():
+    env = gym.make("intersection-v0")
+    env.configure({"other_vehicles_type": "highway_env.vehicle.uncertainty.estimation.MultipleModelVehicle"})
+    env.seed(0)
+    env.reset()
+    for _ in range(3):
+        env.step(1)
+    vehicles = [v for v in env.road.vehicles if isinstance(v, MultipleModelVehicle)]
+    assert any(len(v.data) > 1 for v in vehicles)
+    for v in vehicles:
+        for route, data in v.data:
+            for other_route, other_data in v.data:
+                assert (data is other_data) <= (route[0] == other_route[0])
+
+    MultipleModelVehicle.MAX_HYPOTHESES, max_hypotheses = 1, MultipleModelVehicle.MAX_HYPOTHESES
+    try:
+        env.step(1)
+        assert all(len(v.data) <= 1 for v in vehicles)
+    finally:
+        MultipleModelVehicle.MAX_HYPOTHESES = max_hypotheses